@@ -10,7 +10,7 @@ from import_export.admin import ImportExportModelAdmin
 from .models import (
     Department, Teacher, CoursePrototype, Grade, Class, ClassInstance,
     Student, UserProfile, CourseInstance, CourseSchedule, S_Grade,
-    Semester, PunishmentRecord, RewardRecord, SelectionBatch
+    Semester, PunishmentRecord, RewardRecord, SelectionBatch, Job
 )
 from django.contrib.auth.hashers import make_password
 from django.db import transaction
@@ -439,7 +439,7 @@ class CourseScheduleAdmin(admin.ModelAdmin):
 class CourseInstanceAdmin(ImportExportModelAdmin):
     resource_class = CourseInstanceResource
     list_display = ('id', 'get_course_name', 'get_semester_name', 'location', 'capacity',
-                    'get_teacher_username', 'is_finalized')
+                    'enrolled_count', 'get_teacher_username', 'is_finalized')
     search_fields = ('course_prototype__name', 'semester__name', 'location',
                      'teacher__user__username', 'teacher__user__first_name', 'teacher__user__last_name')
     list_filter = ('semester__name', 'is_finalized', 'teacher__user__username')
@@ -510,6 +510,14 @@ class S_GradeAdmin(ImportExportModelAdmin):
     get_course_instance.short_description = 'Course Instance ID'
 
 
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'owner', 'status', 'progress', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
+    search_fields = ('owner__username',)
+    readonly_fields = [f.name for f in Job._meta.fields]
+
+
 @admin.register(Class)
 class ClassAdmin(admin.ModelAdmin):
     list_display = ('id', 'name', 'grade', 'department')
@@ -0,0 +1,20 @@
+# backend/api/async_urls.py
+
+"""
+ASGI 入口下优先匹配的异步接口，路径和名称与 api/urls.py 中对应的同步接口相同
+"""
+
+from django.urls import path
+
+from . import async_views
+
+urlpatterns = [
+    path('course-instances/list_available_courses/', async_views.list_available_courses,
+         name='course-instance-list-available-courses'),
+    path('selection-batches/<str:pk>/available_courses/', async_views.batch_available_courses,
+         name='selection-batch-available-courses'),
+    path('s-grades/my_all_grades/', async_views.my_all_grades, name='s_grade-my-all-grades'),
+    path('s-grades/my_rankings/', async_views.my_rankings, name='s_grade-my-rankings'),
+    path('semesters/current/', async_views.current_semester, name='semester-current'),
+    path('user/current/', async_views.current_user, name='current-user'),
+]
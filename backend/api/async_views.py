@@ -0,0 +1,179 @@
+# backend/api/async_views.py
+
+"""
+异步只读接口（ASGI）
+
+选课日的并发瓶颈是 WSGI 的工作线程数：每个请求在等待数据库和缓存时都占着一个线程。
+这里用 Django 的异步视图和异步 ORM 重新实现最热的几个只读接口，URL 和 URL 名称与同步接口相同，
+只在 ASGI 入口生效（见 backend/asgi.py）；WSGI 部署仍走原来的 DRF 视图。
+
+响应内容、状态码和错误格式与同步接口一致，GET 以外的方法（如 PATCH user/current/）交给同步视图处理。
+认证在事件循环中完成（authentication.aauthenticate），权限只依赖令牌中的角色声明；
+序列化前按序列化器预加载全部关联（query_plans），序列化过程不会再访问数据库。
+"""
+
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import DatabaseError
+from django.db.models import F
+from django.http import HttpResponse, HttpResponseNotModified
+from django.urls import resolve
+from rest_framework.exceptions import APIException, NotAuthenticated, NotFound, PermissionDenied
+
+from .authentication import aauthenticate
+from .conditional import conditional_validators, not_modified, patch_conditional_headers
+from .current_term import aget_current_semester
+from .db_pool import is_pool_exhausted
+from .eligibility import aavailable_course_ids
+from .metrics import TimedJSONRenderer
+from .models import CourseInstance, S_Grade, SelectionBatch, Semester
+from .query_plans import plan_queryset
+from .rankings import astudent_rankings
+from .roles import aget_roles
+from .serializers import (
+    CourseInstanceCatalogSerializer, CourseInstanceSerializer, S_GradeSerializer, SemesterSerializer,
+    UserWithStudentSerializer
+)
+from .utils import custom_exception_handler
+from .viewsets import SemesterViewSet
+
+
+def _render(data, status=200):
+    return HttpResponse(TimedJSONRenderer().render(data), content_type='application/json', status=status)
+
+
+def _error_response(request, exc):
+    """
+    与同步接口相同的错误格式（utils.custom_exception_handler）
+    """
+    response = custom_exception_handler(exc, {'request': request})
+    result = _render(response.data, status=response.status_code)
+    for name, value in response.items():
+        if name.lower() != 'content-type':
+            result[name] = value
+    return result
+
+
+async def _sync_view(request, *args, **kwargs):
+    match = resolve(request.path_info, urlconf=settings.ROOT_URLCONF)
+    return await sync_to_async(match.func)(request, *match.args, **match.kwargs)
+
+
+def async_endpoint(require_student=False):
+    """
+    异步接口的公共部分：非 GET 请求交给同步视图，认证，学生权限检查，DRF 异常转换为错误响应。
+    被装饰的视图以 (request, user, roles, *args, **kwargs) 调用
+    """
+    def decorator(handler):
+        @wraps(handler)
+        async def view(request, *args, **kwargs):
+            if request.method != 'GET':
+                return await _sync_view(request, *args, **kwargs)
+            try:
+                authenticated = await aauthenticate(request)
+                if authenticated is None:
+                    raise NotAuthenticated()
+                request.user = user = authenticated[0]
+                roles = await aget_roles(user)
+                if require_student and not roles.is_student:
+                    raise PermissionDenied()
+                return await handler(request, user, roles, *args, **kwargs)
+            except APIException as exc:
+                return _error_response(request, exc)
+            except DatabaseError as exc:
+                if not is_pool_exhausted(exc):
+                    raise
+                return _error_response(request, exc)
+        return view
+    return decorator
+
+
+def _student_missing():
+    return _render({'detail': '学生信息不存在'}, status=400)
+
+
+def _listing_serializer_class(request):
+    # 与 viewsets.course_listing_serializer_class 相同，?view=catalog 时使用精简表示
+    if request.GET.get('view') == 'catalog':
+        return CourseInstanceCatalogSerializer
+    return CourseInstanceSerializer
+
+
+async def _course_listing(queryset, serializer_class):
+    courses = [course async for course in plan_queryset(queryset, serializer_class)]
+    return serializer_class(courses, many=True).data
+
+
+@async_endpoint(require_student=True)
+async def list_available_courses(request, user, roles):
+    if roles.student_id is None:
+        return _student_missing()
+    course_ids = await aavailable_course_ids(user.id, roles.student_class_id)
+    queryset = CourseInstance.objects.filter(id__in=course_ids).order_by('id')
+    return _render(await _course_listing(queryset, _listing_serializer_class(request)))
+
+
+@async_endpoint(require_student=True)
+async def batch_available_courses(request, user, roles, pk):
+    try:
+        selection_batch = await SelectionBatch.objects.filter(pk=pk).afirst()
+    except ValueError:
+        selection_batch = None
+    if selection_batch is None:
+        raise NotFound('选课批次不存在')
+    if roles.student_id is None:
+        return _student_missing()
+    course_ids = await aavailable_course_ids(user.id, roles.student_class_id, selection_batch.id)
+    queryset = CourseInstance.objects.filter(
+        id__in=course_ids,
+        enrolled_count__lt=F('capacity')
+    ).order_by('id')
+    return _render({'available_courses': await _course_listing(queryset, _listing_serializer_class(request))})
+
+
+@async_endpoint(require_student=True)
+async def my_all_grades(request, user, roles):
+    if roles.student_id is None:
+        return _student_missing()
+    queryset = plan_queryset(
+        S_Grade.objects.filter(
+            student=user,
+            course_instance__is_grades_published=True
+        ).order_by('course_instance__semester__start_date'),
+        S_GradeSerializer
+    )
+    grades = [grade async for grade in queryset]
+    return _render(S_GradeSerializer(grades, many=True).data)
+
+
+@async_endpoint()
+async def my_rankings(request, user, roles):
+    if roles.student_id is None:
+        return _student_missing()
+    return _render(await astudent_rankings(user))
+
+
+@async_endpoint()
+async def current_semester(request, user, roles):
+    etag, last_modified = await sync_to_async(conditional_validators)((Semester,), request, 'json')
+    if not_modified(request, etag, last_modified):
+        response = HttpResponseNotModified()
+    else:
+        semester = await aget_current_semester()
+        if semester is None:
+            return _render({'detail': '当前学期未设置'}, status=404)
+        response = _render(SemesterSerializer(semester).data)
+    patch_conditional_headers(
+        response, etag, last_modified, SemesterViewSet.cache_max_age, SemesterViewSet.proxy_max_age
+    )
+    return response
+
+
+@async_endpoint()
+async def current_user(request, user, roles):
+    # 无状态认证时 user 只带令牌中的几个字段，这里按序列化器一次取齐
+    instance = await plan_queryset(User.objects.filter(pk=user.pk), UserWithStudentSerializer).afirst()
+    return _render(UserWithStudentSerializer(instance).data)
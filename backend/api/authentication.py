@@ -0,0 +1,114 @@
+# backend/api/authentication.py
+
+"""
+基于令牌声明的 JWT 认证
+
+JWTAuthentication 每个请求都要加载 User，视图再查询组和档案。ClaimsJWTAuthentication
+先校验令牌的角色指纹（rv，见 tokens.py），再把声明中的角色挂到用户上，权限检查不再查询。
+JWT_STATELESS_AUTH 开启时连 User 也不加载：由声明构造一个只含 id、username、is_staff 等字段的
+User 实例，其余字段延迟加载，save() 也只会写回这几个字段。
+没有角色声明的旧令牌按原来的方式认证。
+
+aauthenticate 是供异步视图使用的同一套认证逻辑。
+
+FeedTokenAuthentication 用于日历订阅地址：日历客户端无法发送 Authorization 头，
+改为在查询参数 token 中携带签名的用户 ID 和密码指纹（见 calendar_feed.feed_token）。
+"""
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .calendar_feed import feed_token_user
+from .roles import attach_roles
+from .tokens import ROLE_VERSION_CLAIM, acurrent_role_version, current_role_version, roles_from_claims
+
+
+def claims_user(token):
+    """
+    用令牌声明构造用户对象，不访问数据库
+    """
+    values = {
+        'id': token[api_settings.USER_ID_CLAIM],
+        'username': token.get('username', ''),
+        'is_staff': token.get('is_staff', False),
+        'is_superuser': token.get('is_superuser', False),
+        'is_active': True,
+    }
+    # from_db 要求取值按模型字段顺序排列，未给出的字段延迟加载
+    field_names = [field.attname for field in User._meta.concrete_fields if field.attname in values]
+    return User.from_db('default', field_names, [values[name] for name in field_names])
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+
+    def get_user(self, validated_token):
+        if ROLE_VERSION_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('令牌中缺少用户标识')
+
+        # 用户停用、组或档案变化后指纹不再一致，客户端需要用刷新令牌重新换取访问令牌
+        if validated_token[ROLE_VERSION_CLAIM] != current_role_version(user_id):
+            raise InvalidToken('用户角色已变更，请重新获取令牌')
+
+        if settings.JWT_STATELESS_AUTH:
+            user = claims_user(validated_token)
+        else:
+            user = super().get_user(validated_token)
+        attach_roles(user, roles_from_claims(validated_token))
+        return user
+
+
+async def aauthenticate(request):
+    """
+    ClaimsJWTAuthentication.authenticate 的异步版本，返回 (user, token) 或 None。
+    令牌带角色指纹且开启 JWT_STATELESS_AUTH 时不访问数据库
+    """
+    authenticator = ClaimsJWTAuthentication()
+    header = authenticator.get_header(request)
+    if header is None:
+        return None
+    raw_token = authenticator.get_raw_token(header)
+    if raw_token is None:
+        return None
+    validated_token = authenticator.get_validated_token(raw_token)
+
+    if ROLE_VERSION_CLAIM not in validated_token:
+        return await sync_to_async(authenticator.get_user)(validated_token), validated_token
+    try:
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise InvalidToken('令牌中缺少用户标识')
+    if validated_token[ROLE_VERSION_CLAIM] != await acurrent_role_version(user_id):
+        raise InvalidToken('用户角色已变更，请重新获取令牌')
+
+    if settings.JWT_STATELESS_AUTH:
+        user = claims_user(validated_token)
+    else:
+        user = await sync_to_async(JWTAuthentication.get_user)(authenticator, validated_token)
+    attach_roles(user, roles_from_claims(validated_token))
+    return user, validated_token
+
+
+class FeedTokenAuthentication(BaseAuthentication):
+
+    def authenticate(self, request):
+        token = request.query_params.get('token')
+        if not token:
+            return None
+        try:
+            user = feed_token_user(token)
+        except signing.SignatureExpired:
+            raise AuthenticationFailed('订阅令牌已过期，请重新获取订阅地址')
+        except signing.BadSignature:
+            raise AuthenticationFailed('订阅令牌无效')
+        return user, None
@@ -0,0 +1,51 @@
+# backend/api/caching.py
+
+"""
+基于版本号的缓存失效工具。
+
+缓存键中带上版本号，数据变化时只需递增版本号，旧键自然失效并由缓存后端淘汰。
+版本号初始值取当前时间，即使版本键本身被淘汰，新版本也不会与旧缓存键重合。
+"""
+
+import time
+
+from django.core.cache import cache
+
+
+def _version_key(name):
+    return f'version:{name}'
+
+
+def get_version(name):
+    """
+    读取版本号，不存在时初始化
+    """
+    return cache.get_or_set(_version_key(name), time.time_ns(), timeout=None)
+
+
+async def aget_version(name):
+    return await cache.aget_or_set(_version_key(name), time.time_ns(), timeout=None)
+
+
+def bump_version(name):
+    """
+    递增版本号，使依赖它的缓存键全部失效
+    """
+    key = _version_key(name)
+    while True:
+        if cache.add(key, time.time_ns(), timeout=None):
+            return cache.get(key)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # add 和 incr 之间版本键被淘汰，重试
+            continue
+
+
+def reset_versions(names):
+    """
+    批量使版本号失效：直接删除版本键，下次读取时以当前时间重新初始化，
+    必然大于旧版本号，一次往返即可失效任意多个版本
+    """
+    if names:
+        cache.delete_many([_version_key(name) for name in names])
@@ -0,0 +1,173 @@
+# backend/api/calendar_feed.py
+
+"""
+iCalendar 课表订阅
+
+每条 CourseSchedule 生成一个按周重复的事件，不逐周展开：
+    DTSTART  第 start_week 周对应星期、对应节次的上课时间（第 1 周为 Semester.start_date 所在的那一周）
+    RRULE    FREQ=WEEKLY;INTERVAL=frequency;COUNT=上课次数（不超过学期总周数）
+    EXDATE   exceptions 中落在上课周上的那些周
+上课周的判断与 CourseSchedule.is_active_in_week 一致。时间不带时区（floating time），
+日历客户端按本地时间显示。
+
+生成结果与课表网格共用缓存和失效规则（见 timetable.py），并按内容计算 ETag，
+客户端带 If-None-Match 轮询时数据未变化直接返回 304。
+
+订阅令牌签入用户 ID 和密码哈希的指纹（与 Django 会话的 get_session_auth_hash 相同），
+修改密码即可吊销所有旧订阅地址；令牌超过 FEED_TOKEN_MAX_AGE 后失效，
+重新请求 /api/timetable/calendar-link/ 即可拿到新的订阅地址。
+"""
+
+import hashlib
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.models import User
+from django.core import signing
+from django.utils.crypto import constant_time_compare
+
+from .models import CourseSchedule
+from .schedule_index import DAYS
+from .timetable import cached_timetable, user_courses
+
+# 各节次的上下课时间
+PERIOD_TIMES = {
+    1: (time(8, 0), time(9, 40)),
+    2: (time(10, 0), time(11, 40)),
+    3: (time(14, 0), time(15, 40)),
+    4: (time(16, 0), time(17, 40)),
+    5: (time(19, 0), time(20, 40)),
+}
+
+FEED_TOKEN_SALT = 'api.calendar_feed'
+# 订阅令牌的有效期（秒）
+FEED_TOKEN_MAX_AGE = 180 * 24 * 3600
+
+
+def feed_token(user):
+    """
+    订阅地址中携带的签名令牌，日历客户端无法发送 Authorization 头
+    """
+    return signing.dumps([user.pk, user.get_session_auth_hash()], salt=FEED_TOKEN_SALT)
+
+
+def feed_token_user(token):
+    """
+    校验订阅令牌，返回对应的启用用户；签名无效、过期、用户已停用或已修改密码时抛出 signing.BadSignature
+    """
+    payload = signing.loads(token, salt=FEED_TOKEN_SALT, max_age=FEED_TOKEN_MAX_AGE)
+    try:
+        user_id, auth_hash = payload
+    except (TypeError, ValueError):
+        raise signing.BadSignature('订阅令牌格式无效')
+    user = User.objects.filter(id=user_id, is_active=True).first()
+    if user is None or not constant_time_compare(auth_hash, user.get_session_auth_hash()):
+        raise signing.BadSignature('订阅令牌已吊销')
+    return user
+
+
+def _escape(value):
+    return (
+        str(value).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+    )
+
+
+def _fold(line):
+    """
+    按 RFC 5545 把超过 75 字节的行折叠，续行以空格开头
+    """
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line
+    parts = []
+    while data:
+        limit = 75 if not parts else 74
+        cut = min(limit, len(data))
+        # 不在 UTF-8 多字节字符中间断开
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(data[:cut].decode('utf-8'))
+        data = data[cut:]
+    return '\r\n '.join(parts)
+
+
+def _format(value):
+    return value.strftime('%Y%m%dT%H%M%S')
+
+
+def schedule_event(schedule, semester, first_monday, dtstamp):
+    """
+    一条排课对应的 VEVENT 行；学期内没有上课周时返回空列表
+    """
+    if schedule.day not in DAYS or schedule.period not in PERIOD_TIMES or schedule.frequency < 1:
+        return []
+    # 上课周是从 start_week 起每 frequency 周一次的等差数列，恰好对应 RRULE 的 INTERVAL 和 COUNT
+    weeks = [
+        week for week in range(max(schedule.start_week, 1), min(schedule.end_week, semester.total_weeks) + 1)
+        if (week - schedule.start_week) % schedule.frequency == 0
+    ]
+    if not weeks:
+        return []
+
+    start_time, end_time = PERIOD_TIMES[schedule.period]
+
+    def occurrence(week, at):
+        day = first_monday + timedelta(weeks=week - 1, days=DAYS.index(schedule.day))
+        return datetime.combine(day, at)
+
+    course = schedule.course_instance
+    teacher = course.teacher.user.get_full_name() if course.teacher else ''
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:schedule-{schedule.id}@studentdb',
+        f'DTSTAMP:{dtstamp}',
+        f'DTSTART:{_format(occurrence(weeks[0], start_time))}',
+        f'DTEND:{_format(occurrence(weeks[0], end_time))}',
+        f'SUMMARY:{_escape(course.course_prototype.name)}',
+        f'LOCATION:{_escape(course.location)}',
+    ]
+    if len(weeks) > 1:
+        rule = f'RRULE:FREQ=WEEKLY;COUNT={len(weeks)}'
+        if schedule.frequency > 1:
+            rule += f';INTERVAL={schedule.frequency}'
+        lines.append(rule)
+    excluded = sorted(week for week in set(schedule.exceptions or []) if isinstance(week, int) and week in weeks)
+    if excluded:
+        lines.append('EXDATE:' + ','.join(_format(occurrence(week, start_time)) for week in excluded))
+    if teacher:
+        lines.append(f'DESCRIPTION:{_escape("教师: " + teacher)}')
+    lines.append('END:VEVENT')
+    return lines
+
+
+def build_calendar(roles, semester):
+    """
+    生成用户该学期课表的 iCalendar 文本，返回 (ETag, 内容)
+    """
+    schedules = CourseSchedule.objects.filter(
+        course_instance__in=user_courses(roles, semester).values('id')
+    ).select_related(
+        'course_instance__course_prototype', 'course_instance__teacher__user'
+    ).order_by('course_instance_id', 'id')
+
+    first_monday = semester.start_date - timedelta(days=semester.start_date.weekday())
+    # DTSTAMP 取固定值，数据不变时内容和 ETag 都不变
+    dtstamp = _format(datetime.combine(semester.start_date, time())) + 'Z'
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//StudentDB//Timetable//ZH',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escape(semester.name + " 课表")}',
+    ]
+    for schedule in schedules:
+        lines.extend(schedule_event(schedule, semester, first_monday, dtstamp))
+    lines.append('END:VCALENDAR')
+
+    body = '\r\n'.join(_fold(line) for line in lines) + '\r\n'
+    etag = '"' + hashlib.sha256(body.encode('utf-8')).hexdigest()[:32] + '"'
+    return etag, body
+
+
+def get_calendar(roles, semester):
+    return cached_timetable(roles, semester, 'ics', build_calendar)
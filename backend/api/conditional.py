@@ -0,0 +1,143 @@
+# backend/api/conditional.py
+
+"""
+基础数据接口的条件请求
+
+院系、年级、班级、课程原型、学期一年只变几次，前端却几乎每个页面都要重新获取。
+每个模型维护一个变更版本号（model:<app_label.Model>，见 caching.py），
+post_save / post_delete / m2m_changed 时在事务提交后递增（见 signal.py），并记下变更时间。
+
+ConditionalViewMixin 在认证和权限检查之后、查询之前计算 ETag：
+
+    W/"sha256(各依赖模型的版本号, 请求路径和查询参数, 渲染格式)"
+
+客户端带 If-None-Match（或 If-Modified-Since）且数据未变化时直接返回 304，不查询也不序列化。
+响应按视图的 cache_max_age / proxy_max_age 设置 Cache-Control，并带 Vary: Authorization，
+反向代理只会把缓存的响应返回给带同一令牌的请求。
+"""
+
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from .caching import bump_version, get_version
+
+CONDITIONAL_METHODS = ('GET', 'HEAD')
+
+
+def model_version_name(model):
+    return f'model:{model._meta.label}'
+
+
+def _changed_at_key(model):
+    return f'changed_at:{model._meta.label}'
+
+
+def _bump(models):
+    now = time.time()
+    for model in models:
+        bump_version(model_version_name(model))
+    cache.set_many({_changed_at_key(model): now for model in models}, timeout=None)
+
+
+def model_changed(*models):
+    """
+    模型数据变化后递增版本号（事务提交后生效），bulk_create / update 等不触发信号的写入需要手动调用
+    """
+    transaction.on_commit(lambda: _bump(models))
+
+
+def model_state(models):
+    """
+    返回 (各模型版本号, 最近变更时间)；变更时间未知时（缓存被清空）取当前时间
+    """
+    versions = [get_version(model_version_name(model)) for model in models]
+    now = time.time()
+    changed = [cache.get_or_set(_changed_at_key(model), now, timeout=None) for model in models]
+    return versions, max(changed, default=now)
+
+
+class NotModified(Exception):
+    pass
+
+
+def _etag_matches(etag, header):
+    # If-None-Match 使用弱比较
+    tags = parse_etags(header)
+    return '*' in tags or etag.removeprefix('W/') in {tag.removeprefix('W/') for tag in tags}
+
+
+def conditional_validators(models, request, renderer_format):
+    """
+    返回 (ETag, Last-Modified 时间戳)
+    """
+    versions, changed_at = model_state(models)
+    stamp = repr((versions, request.get_full_path(), renderer_format))
+    return 'W/"' + hashlib.sha256(stamp.encode()).hexdigest()[:32] + '"', int(changed_at)
+
+
+def not_modified(request, etag, last_modified):
+    """
+    按 If-None-Match（优先）或 If-Modified-Since 判断客户端缓存是否仍然有效
+    """
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        return _etag_matches(etag, if_none_match)
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return if_modified_since is not None and last_modified <= if_modified_since
+
+
+def patch_conditional_headers(response, etag, last_modified, cache_max_age, proxy_max_age):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    if proxy_max_age is None:
+        patch_cache_control(response, private=True, max_age=cache_max_age)
+    else:
+        patch_cache_control(response, public=True, max_age=cache_max_age, s_maxage=proxy_max_age)
+    if not cache_max_age:
+        patch_cache_control(response, no_cache=True)
+    patch_vary_headers(response, ('Authorization',))
+
+
+class ConditionalViewMixin:
+    """
+    etag_models            序列化结果依赖的模型（包括 __str__ 和嵌套序列化器用到的关联模型）
+    conditional_actions    走条件请求的 action
+    cache_max_age          浏览器缓存秒数，0 表示每次都向服务器验证
+    proxy_max_age          反向代理缓存秒数（s-maxage），None 表示不允许共享缓存
+    """
+    etag_models = ()
+    conditional_actions = ('list', 'retrieve')
+    cache_max_age = 0
+    proxy_max_age = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.conditional_etag = None
+        if request.method not in CONDITIONAL_METHODS or getattr(self, 'action', None) not in self.conditional_actions:
+            return
+        self.conditional_etag, self.conditional_last_modified = conditional_validators(
+            self.etag_models, request, request.accepted_renderer.format
+        )
+        if not_modified(request, self.conditional_etag, self.conditional_last_modified):
+            raise NotModified
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, 'conditional_etag', None) and response.status_code in (200, 304):
+            patch_conditional_headers(
+                response, self.conditional_etag, self.conditional_last_modified,
+                self.cache_max_age, self.proxy_max_age
+            )
+        return response
@@ -0,0 +1,101 @@
+# backend/api/current_term.py
+
+"""
+当前学期与当前选课批次
+
+几乎每个页面都会取当前学期，选课相关接口还要取当前选课批次。两者很少变化，按两级缓存：
+
+    进程内      LOCAL_TTL 秒内直接返回，不访问缓存后端
+    共享缓存    current_term:<名称>:<版本>，学期 / 选课批次写入时递增版本号（见 signal.py）
+
+选课批次缓存的是构建时尚未结束的所有批次，当前批次在内存中按时间判断，
+开始、结束时间到达时当前批次随之变化，不需要失效缓存或查询数据库。
+多进程部署时，其他进程最迟 LOCAL_TTL 秒后看到变化。
+返回的模型实例在请求间共享，只能读取，不要修改。
+"""
+
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .caching import bump_version, get_version
+from .models import SelectionBatch, Semester
+
+LOCAL_TTL = 5
+SHARED_CACHE_TIMEOUT = 60 * 60
+
+SEMESTER = 'current_term:semester'
+BATCHES = 'current_term:batches'
+
+_local = {}
+
+
+def _cached(name, load):
+    now = time.monotonic()
+    entry = _local.get(name)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+    key = f'{name}:{get_version(name)}'
+    # 包一层元组，区分“没有当前学期”与缓存未命中
+    wrapped = cache.get(key)
+    if wrapped is None:
+        wrapped = (load(),)
+        cache.set(key, wrapped, SHARED_CACHE_TIMEOUT)
+    _local[name] = (now + LOCAL_TTL, wrapped[0])
+    return wrapped[0]
+
+
+def _load_batches():
+    return list(SelectionBatch.objects.filter(end_selection_date__gte=timezone.now()).order_by('id'))
+
+
+def get_current_semester():
+    """
+    当前学期，未设置时为 None
+    """
+    return _cached(SEMESTER, lambda: Semester.objects.filter(is_current=True).first())
+
+
+def get_active_selection_batch(now=None):
+    """
+    开始、结束时间包含 now（默认当前时间）的选课批次，有多个时取 ID 最小的，没有时为 None
+    """
+    now = now or timezone.now()
+    for batch in _cached(BATCHES, _load_batches):
+        if batch.start_selection_date <= now <= batch.end_selection_date:
+            return batch
+    return None
+
+
+async def aget_current_semester():
+    """
+    异步视图中使用：进程内缓存命中时不离开事件循环
+    """
+    entry = _local.get(SEMESTER)
+    if entry is not None and entry[0] > time.monotonic():
+        return entry[1]
+    return await sync_to_async(get_current_semester)()
+
+
+def _invalidate(name):
+    _local.pop(name, None)
+    bump_version(name)
+
+
+def invalidate_current_term(name):
+    """
+    立即失效，事务提交后再失效一次：避免提交前其他请求把旧数据写入新版本的缓存
+    """
+    _invalidate(name)
+    transaction.on_commit(lambda: _invalidate(name))
+
+
+def invalidate_current_semester():
+    invalidate_current_term(SEMESTER)
+
+
+def invalidate_selection_batches():
+    invalidate_current_term(BATCHES)
@@ -0,0 +1,71 @@
+# backend/api/db_pool.py
+
+"""
+数据库连接池
+
+选课高峰时大量请求同时到达，每个请求各自建立数据库连接会造成连接风暴。开启 DB_POOL 时
+（PostgreSQL + psycopg 3，见 backend/settings.py），Django 使用 psycopg_pool.ConnectionPool：
+请求结束时连接归还连接池而不是关闭，连接池最多增长到 max_size，超出的请求排队等待。
+
+    DB_POOL_SIZE          常驻连接数（min_size）
+    DB_POOL_MAX_OVERFLOW  高峰时最多额外打开的连接数（max_size = SIZE + OVERFLOW），空闲 DB_POOL_MAX_IDLE 秒后关闭
+    DB_POOL_MAX_LIFETIME  连接最长使用时间（秒），到期后替换
+    DB_POOL_TIMEOUT       等待可用连接的最长秒数
+    DB_POOL_MAX_WAITING   排队等待连接的请求数上限，超出时立即拒绝（0 表示不限）
+    DB_CONN_HEALTH_CHECKS 取出连接时先检查连接是否可用（ConnectionPool.check_connection）
+
+等待超时或排队已满时接口返回 503 和 Retry-After（见 utils.custom_exception_handler）。
+连接池统计由 /api/_metrics/ 导出：psycopg_pool 的 get_stats() 加上使用中连接数和饱和度
+（使用中连接数 / max_size）。连接池和统计都只属于当前进程。
+"""
+
+from django.db import connections
+
+# 直接导出的 get_stats() 计数，其余为瞬时值
+COUNTERS = (
+    'requests_num', 'requests_queued', 'requests_wait_ms', 'requests_errors', 'usage_ms',
+    'returns_bad', 'connections_num', 'connections_ms', 'connections_errors', 'connections_lost',
+)
+GAUGES = ('pool_min', 'pool_max', 'pool_size', 'pool_available', 'requests_waiting')
+
+
+def _pools():
+    for connection in connections.all():
+        pool = getattr(connection, 'pool', None)
+        if pool is not None:
+            yield connection.alias, pool
+
+
+def pool_stats():
+    """
+    {数据库别名: 统计}，未使用连接池时为空字典
+    """
+    stats = {}
+    for alias, pool in _pools():
+        values = {name: 0 for name in (*GAUGES, *COUNTERS)}
+        values.update(pool.get_stats())
+        values['in_use'] = values['pool_size'] - values['pool_available']
+        values['saturation'] = values['in_use'] / values['pool_max'] if values['pool_max'] else 0.0
+        values['wait_ms_avg'] = values['requests_wait_ms'] / values['requests_num'] if values['requests_num'] else 0.0
+        stats[alias] = values
+    return stats
+
+
+def reset_pool_stats():
+    for _, pool in _pools():
+        pool.pop_stats()
+
+
+def is_pool_exhausted(exc):
+    """
+    异常是否由等待连接超时或排队已满引起（Django 把它们包装成 OperationalError）
+    """
+    try:
+        from psycopg_pool import PoolTimeout, TooManyRequests
+    except ImportError:
+        return False
+    while exc is not None:
+        if isinstance(exc, (PoolTimeout, TooManyRequests)):
+            return True
+        exc = exc.__cause__
+    return False
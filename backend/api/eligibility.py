@@ -0,0 +1,87 @@
+# backend/api/eligibility.py
+
+"""
+按 (选课批次, 班级) 缓存可选课程集合
+
+缓存内容为 {课程实例 ID: 选课截止时间}。截止时间过滤、学生已选课程的排除都在内存中完成，
+刷新选课页面时只剩一次按学生过滤的中间表查询和一次按主键取课程的查询。
+eligible_classes 变化或课程实例保存/删除时整体失效。
+带 a 前缀的函数是供异步视图使用的同一套逻辑。
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .caching import aget_version, bump_version, get_version
+from .models import CourseInstance
+
+ELIGIBILITY_CACHE_TIMEOUT = 10 * 60
+
+Enrollment = CourseInstance.selected_students.through
+
+
+def _eligibility_key(version, student_class_id, selection_batch_id):
+    return f'eligibility:{version}:{selection_batch_id or "all"}:{student_class_id}'
+
+
+def _eligible_queryset(student_class_id, selection_batch_id):
+    queryset = CourseInstance.objects.filter(eligible_classes=student_class_id)
+    if selection_batch_id:
+        queryset = queryset.filter(selection_batch_id=selection_batch_id)
+    return queryset.values_list('id', 'selection_deadline')
+
+
+def _open_courses(courses):
+    now = timezone.now()
+    return {course_id for course_id, deadline in courses.items() if deadline >= now}
+
+
+def eligible_courses(student_class_id, selection_batch_id=None):
+    """
+    返回该班级（在指定选课批次内）有资格选的课程 {课程实例 ID: 选课截止时间}
+    """
+    key = _eligibility_key(get_version('eligibility'), student_class_id, selection_batch_id)
+    courses = cache.get(key)
+    if courses is None:
+        courses = dict(_eligible_queryset(student_class_id, selection_batch_id))
+        cache.set(key, courses, ELIGIBILITY_CACHE_TIMEOUT)
+    return courses
+
+
+async def aeligible_courses(student_class_id, selection_batch_id=None):
+    key = _eligibility_key(await aget_version('eligibility'), student_class_id, selection_batch_id)
+    courses = await cache.aget(key)
+    if courses is None:
+        courses = {course_id: deadline async for course_id, deadline in _eligible_queryset(student_class_id, selection_batch_id)}
+        await cache.aset(key, courses, ELIGIBILITY_CACHE_TIMEOUT)
+    return courses
+
+
+def available_course_ids(user, student, selection_batch_id=None):
+    """
+    学生当前可选（未截止、未选过）的课程实例 ID 集合
+    """
+    candidates = _open_courses(eligible_courses(student.student_class_id, selection_batch_id))
+    if not candidates:
+        return candidates
+    selected = set(Enrollment.objects.filter(user_id=user.id).values_list('courseinstance_id', flat=True))
+    return candidates - selected
+
+
+async def aavailable_course_ids(user_id, student_class_id, selection_batch_id=None):
+    candidates = _open_courses(await aeligible_courses(student_class_id, selection_batch_id))
+    if not candidates:
+        return candidates
+    selected = {
+        course_id async for course_id in Enrollment.objects.filter(user_id=user_id).values_list('courseinstance_id', flat=True)
+    }
+    return candidates - selected
+
+
+def invalidate_eligibility():
+    """
+    立即失效，事务提交后再失效一次：避免提交前其他请求把旧的资格集合写入新版本的缓存
+    """
+    bump_version('eligibility')
+    transaction.on_commit(lambda: bump_version('eligibility'))
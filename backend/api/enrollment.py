@@ -0,0 +1,129 @@
+# backend/api/enrollment.py
+
+"""
+选课引擎
+
+CourseInstance.enrolled_count 是已选人数的冗余计数器。抢座只需要一条条件 UPDATE：
+
+    UPDATE api_courseinstance SET enrolled_count = enrolled_count + 1
+    WHERE id = %s AND enrolled_count < capacity
+
+资格检查和时间冲突检查（基于 api.schedule_index 的占用位图）都在抢座之前完成，
+整个过程中不持有行锁，也不再对 selected_students 中间表做 COUNT。
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.dispatch import Signal
+from django.utils import timezone
+from rest_framework import status
+
+from .models import CourseInstance
+from .schedule_index import has_schedule_conflict, invalidate_student_union
+from .timetable import invalidate_timetable
+
+# selected_students 的中间表，直接写入它不会触发 m2m_changed
+Enrollment = CourseInstance.selected_students.through
+
+# 课程已选人数变化后发出，参数 course_ids；选课引擎和 m2m_changed 同步逻辑都会发送
+seats_changed = Signal()
+
+
+class EnrollmentError(Exception):
+    """
+    选课/退课失败，detail 和 status_code 直接用于构造 Response
+    """
+
+    def __init__(self, detail, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+def claim_seat(course_id):
+    """
+    原子地占用一个座位，课程已满时返回 False
+    """
+    return CourseInstance.objects.filter(
+        id=course_id,
+        enrolled_count__lt=F('capacity')
+    ).update(enrolled_count=F('enrolled_count') + 1) == 1
+
+
+def release_seat(course_id):
+    """
+    原子地释放一个座位
+    """
+    CourseInstance.objects.filter(
+        id=course_id,
+        enrolled_count__gt=0
+    ).update(enrolled_count=F('enrolled_count') - 1)
+
+
+def recount_enrolled(course_ids):
+    """
+    按中间表重新统计已选人数，供绕过选课引擎的写入路径（admin、set()、clear() 等）使用
+    """
+    counts = Enrollment.objects.filter(
+        courseinstance_id=OuterRef('pk')
+    ).values('courseinstance_id').annotate(n=Count('id')).values('n')
+    CourseInstance.objects.filter(id__in=course_ids).update(
+        enrolled_count=Coalesce(Subquery(counts), 0)
+    )
+
+
+def enroll_student(user, student, course_instance, semester):
+    """
+    为学生选课。失败时抛出 EnrollmentError；
+    学生已选过该课程时不占用座位，与原先 selected_students.add() 的幂等语义一致。
+    """
+    # 检查选课时间是否已过
+    if timezone.now() > course_instance.selection_deadline or course_instance.is_finalized:
+        raise EnrollmentError('选课时间已截止')
+
+    # 乐观预检：用已加载的计数器快速拒绝已满的课程，不产生查询
+    if course_instance.enrolled_count >= course_instance.capacity:
+        raise EnrollmentError('课程容量已满')
+
+    # 检查学生是否符合选课条件
+    if not course_instance.eligible_classes.filter(id=student.student_class_id).exists():
+        raise EnrollmentError('您所在班级无法选此课程', status.HTTP_403_FORBIDDEN)
+
+    # 检查时间冲突
+    if has_schedule_conflict(user, course_instance, semester):
+        raise EnrollmentError('课程时间与已选课程冲突')
+
+    try:
+        with transaction.atomic():
+            if not claim_seat(course_instance.id):
+                raise EnrollmentError('课程容量已满')
+            Enrollment.objects.create(courseinstance_id=course_instance.id, user_id=user.id)
+    except IntegrityError:
+        # 中间表唯一约束冲突说明已经选过，事务回滚后座位也随之归还
+        return False
+    invalidate_student_union(user.id, course_instance.semester_id)
+    invalidate_timetable(user.id, course_instance.semester_id)
+    seats_changed.send(sender=CourseInstance, course_ids=[course_instance.id])
+    return True
+
+
+def drop_student(user, course_instance):
+    """
+    为学生退课，失败时抛出 EnrollmentError
+    """
+    # 检查选课时间是否已过
+    if timezone.now() > course_instance.selection_deadline or course_instance.is_finalized:
+        raise EnrollmentError('选课时间已截止，无法退课')
+
+    with transaction.atomic():
+        deleted, _ = Enrollment.objects.filter(
+            courseinstance_id=course_instance.id,
+            user_id=user.id
+        ).delete()
+        if not deleted:
+            raise EnrollmentError('您未选此课程')
+        release_seat(course_instance.id)
+    invalidate_student_union(user.id, course_instance.semester_id)
+    invalidate_timetable(user.id, course_instance.semester_id)
+    seats_changed.send(sender=CourseInstance, course_ids=[course_instance.id])
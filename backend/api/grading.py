@@ -0,0 +1,136 @@
+# backend/api/grading.py
+
+"""
+成绩批量写入
+
+批量录入成绩时不再逐条 get_or_create + save()：学生 ID 一次查询校验，
+total_score 用已加载的课程权重在内存中计算（与 S_Grade.save() 的公式一致），
+所有成绩用一条 INSERT ... ON CONFLICT (student, course_instance, attempt) DO UPDATE 写入。
+课程成绩占比变化后，total_score 用一条（或按主键区间分批的）UPDATE 重新计算。
+这两条路径都不触发 post_save，写入后需要显式使物化排名和报表缓存失效。
+"""
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F, Max, Min
+
+from .models import S_Grade
+from .rankings import invalidate_course_ranks
+from .report_cache import invalidate_course_reports, invalidate_reports
+
+GRADE_BATCH_SIZE = 500
+# 重算总分时单条 UPDATE 覆盖的最大主键区间，避免超大课程长时间锁表
+RECOMPUTE_CHUNK_SIZE = 10000
+
+ATTEMPTS = {attempt for attempt, _ in S_Grade.ATTEMPT_CHOICES}
+
+
+def compute_total_score(daily_score, final_score, daily_weight, final_weight):
+    """
+    与 S_Grade.save() 相同的总分公式
+    """
+    return daily_score * (daily_weight / 100.0) + final_score * (final_weight / 100.0)
+
+
+def _parse_entry(entry):
+    """
+    解析单个成绩条目，返回 (student_id, attempt, daily_score, final_score)，不合法时抛出 ValueError
+    """
+    if not isinstance(entry, dict):
+        raise ValueError('每个条目必须是对象')
+    student_id = entry.get('student_id')
+    daily_score = entry.get('daily_score')
+    final_score = entry.get('final_score')
+    if any(x is None for x in [student_id, daily_score, final_score]):
+        raise ValueError('student_id / daily_score / final_score 为必填字段')
+    try:
+        daily_score = float(daily_score)
+        final_score = float(final_score)
+    except (TypeError, ValueError):
+        raise ValueError('daily_score / final_score 必须为数字')
+    try:
+        attempt = int(entry.get('attempt', 1))  # 若前端没传，默认为首考(1)
+    except (TypeError, ValueError):
+        attempt = None
+    if attempt not in ATTEMPTS:
+        raise ValueError('attempt 不是有效的考试轮次')
+    try:
+        student_id = int(student_id)
+    except (TypeError, ValueError):
+        raise ValueError('用户不存在或不是学生')
+    return student_id, attempt, daily_score, final_score
+
+
+def bulk_upsert_grades(course_instance, entries):
+    """
+    批量创建/更新一门课程实例的成绩。
+
+    返回 (成绩对象列表, 错误列表)，错误格式为 {'student_id': ..., 'detail': ...}。
+    同一 (学生, 考试轮次) 出现多次时以最后一条为准，与逐条保存的结果一致。
+    返回的成绩对象已挂好 student 和 course_instance，序列化时不再产生查询。
+    """
+    errors = {}
+    parsed = {}
+    for index, entry in enumerate(entries):
+        try:
+            parsed[index] = _parse_entry(entry)
+        except ValueError as e:
+            student_id = entry.get('student_id') if isinstance(entry, dict) else None
+            errors[index] = {'student_id': student_id, 'detail': str(e)}
+
+    students = User.objects.filter(
+        id__in={row[0] for row in parsed.values()},
+        groups__name='Student'
+    ).only('id', 'username').in_bulk()
+
+    rows = {}
+    for index, (student_id, attempt, daily_score, final_score) in parsed.items():
+        if student_id not in students:
+            errors[index] = {'student_id': entries[index].get('student_id'), 'detail': '用户不存在或不是学生'}
+            continue
+        rows[(student_id, attempt)] = (daily_score, final_score)
+
+    grades = [
+        S_Grade(
+            student=students[student_id],
+            course_instance=course_instance,
+            attempt=attempt,
+            daily_score=daily_score,
+            final_score=final_score,
+            total_score=compute_total_score(
+                daily_score, final_score, course_instance.daily_weight, course_instance.final_weight
+            )
+        )
+        for (student_id, attempt), (daily_score, final_score) in rows.items()
+    ]
+    if grades:
+        with transaction.atomic():
+            S_Grade.objects.bulk_create(
+                grades,
+                batch_size=GRADE_BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=['student', 'course_instance', 'attempt'],
+                update_fields=['daily_score', 'final_score', 'total_score']
+            )
+            invalidate_course_ranks(course_instance.id)
+            invalidate_reports(student_ids={student_id for student_id, _ in rows}, course_ids=[course_instance.id])
+    return grades, [errors[index] for index in sorted(errors)]
+
+
+def recompute_total_scores(course_instance, chunk_size=RECOMPUTE_CHUNK_SIZE):
+    """
+    按课程当前的成绩占比重算该课程所有成绩的 total_score，返回更新的行数
+    """
+    grades = S_Grade.objects.filter(course_instance_id=course_instance.id)
+    bounds = grades.aggregate(low=Min('id'), high=Max('id'))
+    if bounds['low'] is None:
+        return 0
+    total_score = compute_total_score(
+        F('daily_score'), F('final_score'), course_instance.daily_weight, course_instance.final_weight
+    )
+    updated = 0
+    for start in range(bounds['low'], bounds['high'] + 1, chunk_size):
+        updated += grades.filter(id__gte=start, id__lt=start + chunk_size).update(total_score=total_score)
+    invalidate_course_ranks(course_instance.id)
+    invalidate_course_reports(course_instance.id)
+    return updated
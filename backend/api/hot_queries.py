@@ -0,0 +1,87 @@
+# backend/api/hot_queries.py
+
+"""
+热点查询及其预期索引。explain_hot_queries 命令和 tests/test_hot_queries.py 对这些查询执行 EXPLAIN，
+确认每条查询都走了预期的索引；预期索引按前导列给出，从数据库的实际索引中查找名称后在计划中匹配。
+"""
+
+from django.db import connection
+from django.db.models import F, Window
+from django.db.models.functions import Rank
+from django.utils import timezone
+
+from .models import CourseInstance, S_Grade, SelectionBatch, Semester, Student
+
+
+def hot_queries():
+    """
+    (名称, 模型, 预期索引的前导列, 查询集)；查询形状与调用处保持一致
+    """
+    now = timezone.now()
+    return [
+        # viewsets：选课、课表、选课结果等取当前学期
+        ('current_semester', Semester, ['is_current'], Semester.objects.filter(is_current=True)),
+        # viewsets.SelectionBatchViewSet：当前选课批次
+        ('current_batch', SelectionBatch, ['start_selection_date', 'end_selection_date'], SelectionBatch.objects.filter(
+            start_selection_date__lte=now, end_selection_date__gte=now
+        )),
+        # schedule_index：学期内课程的排课位图重建
+        ('semester_courses', CourseInstance, ['semester_id', 'is_finalized'], CourseInstance.objects.filter(
+            semester=0
+        ).values_list('id', 'schedule_bitmap')),
+        # schedule_index.student_union_bitmap：学生已选且未最终化课程的位图之并；
+        # 空表上 PostgreSQL 认为 semester 外键索引与 (semester, is_finalized) 组合索引代价相同，两者都接受
+        ('student_union', CourseInstance, ['semester_id'], CourseInstance.objects.filter(
+            selected_students=0, is_finalized=False, semester=0
+        ).values_list('schedule_bitmap', flat=True)),
+        # eligibility.eligible_courses：批次内班级可选课程及截止时间
+        ('batch_eligibility', CourseInstance, ['selection_batch_id', 'selection_deadline'], CourseInstance.objects.filter(
+            eligible_classes=0, selection_batch_id=0
+        ).values_list('id', 'selection_deadline')),
+        # seat_feed.seat_snapshot：批次剩余座位快照
+        ('batch_seats', CourseInstance, ['selection_batch_id'], CourseInstance.objects.filter(
+            selection_batch_id=0
+        ).values_list('id', 'capacity', 'enrolled_count')),
+        # rankings.ranked_grades：按课程、考试轮次、总分排名
+        ('course_ranking', S_Grade, ['course_instance_id', 'attempt', 'total_score'], S_Grade.objects.filter(
+            course_instance_id=0
+        ).annotate(
+            rank=Window(expression=Rank(), partition_by=[F('attempt')], order_by=F('total_score').desc())
+        ).values_list('id', 'rank')),
+        # viewsets.S_GradeViewSet.my_all_grades：学生已发布的成绩
+        ('published_grades', S_Grade, ['student_id'], S_Grade.objects.filter(
+            student=0, course_instance__is_grades_published=True
+        ).order_by('course_instance__semester__start_date')),
+        # viewsets.StudentViewSet：教师所在院系的学生
+        ('department_students', Student, ['department_id'], Student.objects.filter(department_id__in=[0, 1])),
+    ]
+
+
+def index_names(model, columns):
+    """
+    数据库中以 columns 为前导列的索引（含唯一约束）名称
+    """
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+    return {
+        name for name, info in constraints.items()
+        if (info['index'] or info['unique']) and info['columns'][:len(columns)] == columns
+    }
+
+
+def disable_seqscan():
+    """
+    空表上顺序扫描总是最便宜的，检查索引是否可用时禁止 PostgreSQL 规划器选择顺序扫描
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = off')
+
+
+def used_indexes(model, columns, queryset):
+    """
+    执行 EXPLAIN，返回 (执行计划, 预期索引名称集合, 计划中用到的预期索引)
+    """
+    plan = queryset.explain()
+    names = index_names(model, columns)
+    return plan, names, sorted(name for name in names if name in plan)
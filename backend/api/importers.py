@@ -0,0 +1,420 @@
+# backend/api/importers.py
+
+"""
+CSV 批量导入
+
+上传文件按行流式解码，不一次性读入内存；外键通过预加载的 ID 集合在内存中校验，
+校验通过的行按批写入，每批在一个事务中完成，内存占用只与批大小有关：
+
+- 课程实例在 PostgreSQL 上先从主键序列一次取出整批 ID，再用 COPY 写入；
+  SQLite 用参数化的多行 INSERT ... RETURNING 取回主键（需要 SQLite 3.35+）；
+- eligible_* 中间表和排课表在 PostgreSQL 上用 COPY，其余数据库用参数化的 executemany，
+  不再为每行构造模型实例。
+
+某批写入失败时对半拆开重试，最终只把出错的行记为失败。
+批量写入不触发 post_save / m2m_changed，导入课程实例时在这里直接计算排课占用位图，
+并在结束时使可选课程、涉及学期的位图之并和课表缓存失效。
+"""
+
+import csv
+import io
+import logging
+from functools import lru_cache, partial
+
+from django.core.exceptions import ValidationError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from .conditional import model_changed
+from .eligibility import invalidate_eligibility
+from .jobs import register_job
+from .models import (
+    Class, CourseInstance, CoursePrototype, CourseSchedule, Department, Grade, Semester, Teacher
+)
+from .schedule_index import DAYS, PERIODS, build_bitmap, encode, invalidate_semester_unions
+from .timetable import invalidate_semester_timetables
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = 1000
+# 响应中最多返回的错误行数，其余只计数
+MAX_REPORTED_ERRORS = 100
+PARSE_CACHE_SIZE = 1024
+
+
+class ImportResult:
+    """
+    导入结果：成功行数、错误行（最多 MAX_REPORTED_ERRORS 条）和错误总数
+    """
+
+    def __init__(self):
+        self.created = 0
+        self.errors = []
+        self.error_count = 0
+
+    def add_error(self, line, row, error):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'row': row, 'error': str(error)})
+
+    def as_dict(self):
+        return {'created': self.created, 'errors': self.errors, 'error_count': self.error_count}
+
+
+def iter_csv_rows(uploaded_file):
+    """
+    流式读取上传的（或已落盘的）UTF-8 CSV 文件，逐行产出 (文件行号, 行字典)
+    """
+    uploaded_file.seek(0)
+    raw = getattr(uploaded_file, 'file', uploaded_file)
+    text = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+    try:
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+    finally:
+        # 不让包装器关闭上传文件本身
+        text.detach()
+
+
+def _split(value, sep):
+    return [item.strip() for item in value.split(sep) if item.strip()] if value else []
+
+
+def _run_batches(rows, build_row, write_batch, result, progress=None):
+    """
+    逐行校验 build_row(row) -> 待写入对象，每满一批调用 write_batch(batch) 写入
+    """
+    batch = []
+    processed = 0
+
+    def write(items):
+        try:
+            with transaction.atomic():
+                write_batch([item for _, _, item in items])
+            result.created += len(items)
+        except Exception as e:
+            # 预校验已覆盖外键和格式，这里只剩数据库层面的意外错误；
+            # 对半拆开分别重试，只有单独写入仍失败的行记为失败
+            if len(items) == 1:
+                line, row, _ = items[0]
+                result.add_error(line, row, e)
+                return
+            middle = len(items) // 2
+            write(items[:middle])
+            write(items[middle:])
+
+    def flush():
+        if not batch:
+            return
+        write(batch)
+        batch.clear()
+        if progress:
+            progress(processed, result)
+
+    for line, row in rows:
+        processed += 1
+        try:
+            batch.append((line, row, build_row(row)))
+        except (KeyError, ValueError, TypeError, ValidationError) as e:
+            result.add_error(line, row, f'缺少字段 {e}' if isinstance(e, KeyError) else e)
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            flush()
+    flush()
+    logger.info('导入完成：处理 %d 行，成功 %d 行，失败 %d 行', processed, result.created, result.error_count)
+    return result
+
+
+def _require(ids, value, label):
+    """
+    把 ID 字符串转成整数并检查其存在
+    """
+    try:
+        pk = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{label} ID 无效: {value}')
+    if pk not in ids:
+        raise ValueError(f'{label} 不存在: {value}')
+    return pk
+
+
+# COPY 文本格式需要转义的字符
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def _copy_text(value, jsonb):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, jsonb):
+        value = value.dumps(value.adapted)
+    return str(value).translate(_COPY_ESCAPES)
+
+
+def _copy_rows(cursor, table, columns, rows):
+    """
+    PostgreSQL 用 COPY ... FROM STDIN 写入：一次数据流代替逐行执行 INSERT
+    """
+    from django.db.backends.postgresql.psycopg_any import Jsonb, is_psycopg3
+
+    sql = f'COPY {table} ({columns}) FROM STDIN'
+    if is_psycopg3:
+        with cursor.cursor.copy(sql) as copy:
+            for row in rows:
+                copy.write_row(row)
+        return
+    data = io.StringIO()
+    for row in rows:
+        data.write('\t'.join(_copy_text(value, Jsonb) for value in row))
+        data.write('\n')
+    data.seek(0)
+    cursor.cursor.copy_expert(sql, data)
+
+
+# build_row 已把这些类型的列转换为 Python 原生值，驱动可以直接接收，不再逐值调用 get_db_prep_save
+NATIVE_COLUMN_TYPES = {
+    'AutoField', 'BigAutoField', 'SmallAutoField', 'IntegerField', 'BigIntegerField', 'SmallIntegerField',
+    'PositiveIntegerField', 'PositiveBigIntegerField', 'PositiveSmallIntegerField', 'CharField', 'TextField',
+}
+
+
+def _column_preparers(fields, connection):
+    preparers = []
+    for field in fields:
+        target = field.target_field if field.is_relation else field
+        if target.get_internal_type() in NATIVE_COLUMN_TYPES:
+            preparers.append(None)
+        else:
+            preparers.append(partial(field.get_db_prep_save, connection=connection))
+    return preparers
+
+
+def _prepared_rows(connection, fields, rows):
+    preparers = _column_preparers(fields, connection)
+    return (
+        [value if prepare is None else prepare(value) for prepare, value in zip(preparers, row)] for row in rows
+    )
+
+
+def _insert_rows(model, field_names, rows):
+    """
+    批量写入只含简单列的行（按 field_names 顺序的值元组）。
+    PostgreSQL 用 COPY，其余用参数化的 executemany；表名和列名取自模型元数据，值一律作为参数传入
+    """
+    if not rows:
+        return
+    # 直接使用连接对象，避免每个值都经过 django.db.connection 代理查找
+    connection = connections[DEFAULT_DB_ALIAS]
+    fields = [model._meta.get_field(name) for name in field_names]
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    columns = ', '.join(quote(field.column) for field in fields)
+    prepared = _prepared_rows(connection, fields, rows)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            _copy_rows(cursor, table, columns, prepared)
+        else:
+            placeholders = ', '.join(['%s'] * len(fields))
+            cursor.executemany(f'INSERT INTO {table} ({columns}) VALUES ({placeholders})', list(prepared))
+
+
+def _insert_instances(model, instances):
+    """
+    批量写入模型实例并把主键写回。PostgreSQL 从主键序列一次取出整批 ID 后用 COPY 写入；
+    SQLite 用参数化的多行 INSERT ... RETURNING，按数据库参数个数上限分段
+    """
+    if not instances:
+        return
+    connection = connections[DEFAULT_DB_ALIAS]
+    opts = model._meta
+    quote = connection.ops.quote_name
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)',
+                [quote(opts.db_table), opts.pk.column, len(instances)]
+            )
+            for instance, (pk,) in zip(instances, cursor.fetchall()):
+                instance.pk = pk
+        fields = opts.concrete_fields
+        _insert_rows(model, [field.name for field in fields], [
+            [field.pre_save(instance, True) for field in fields] for instance in instances
+        ])
+    else:
+        fields = [field for field in opts.concrete_fields if not field.primary_key]
+        table = quote(opts.db_table)
+        columns = ', '.join(quote(field.column) for field in fields)
+        row_sql = '({})'.format(', '.join(['%s'] * len(fields)))
+        size = connection.ops.bulk_batch_size(fields, instances)
+        rows = list(_prepared_rows(connection, fields, (
+            [field.pre_save(instance, True) for field in fields] for instance in instances
+        )))
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), size):
+                chunk = rows[start:start + size]
+                cursor.execute(
+                    f'INSERT INTO {table} ({columns}) VALUES {", ".join([row_sql] * len(chunk))} '
+                    f'RETURNING {quote(opts.pk.column)}',
+                    [value for row in chunk for value in row]
+                )
+                for instance, (pk,) in zip(instances[start:start + size], cursor.fetchall()):
+                    instance.pk = pk
+    for instance in instances:
+        instance._state.adding = False
+        instance._state.db = connection.alias
+
+
+def _parse_datetime(field, value):
+    parsed = field.to_python(value)
+    if parsed is None:
+        raise ValueError(f'{field.name} 不能为空')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def import_course_prototypes(rows, progress=None):
+    """
+    导入课程原型，CSV 列：name, description, department_id, credits
+    """
+    departments = set(Department.objects.values_list('id', flat=True))
+
+    def build_row(row):
+        return CoursePrototype(
+            name=row['name'],
+            description=row['description'],
+            department_id=_require(departments, row['department_id'], '院系'),
+            credits=int(row['credits'])
+        )
+
+    def write_batch(prototypes):
+        CoursePrototype.objects.bulk_create(prototypes)
+        # bulk_create 不触发 post_save，课程原型接口的 ETag 需要手动更新
+        model_changed(CoursePrototype)
+
+    return _run_batches(rows, build_row, write_batch, ImportResult(), progress)
+
+
+def import_course_instances(rows, progress=None):
+    """
+    导入课程实例。CSV 列：course_prototype_id, semester_id, teacher_id(可选), location, capacity,
+    selection_deadline, department_id, daily_weight, final_weight, is_finalized(可选)，
+    eligible_departments / eligible_grades / eligible_classes 为分号分隔的 ID，
+    schedules 为竖线分隔的 星期-节次（如 Monday-1|Wednesday-3）
+    """
+    prototypes = set(CoursePrototype.objects.values_list('id', flat=True))
+    semesters = dict(Semester.objects.values_list('id', 'total_weeks'))
+    teachers = set(Teacher.objects.values_list('id', flat=True))
+    departments = set(Department.objects.values_list('id', flat=True))
+    grades = set(Grade.objects.values_list('id', flat=True))
+    classes = set(Class.objects.values_list('id', flat=True))
+
+    deadline_field = CourseInstance._meta.get_field('selection_deadline')
+    finalized_field = CourseInstance._meta.get_field('is_finalized')
+
+    # 同一份文件里截止时间和排课组合重复度很高，解析结果按原始字符串缓存
+    @lru_cache(maxsize=PARSE_CACHE_SIZE)
+    def parse_deadline(value):
+        return _parse_datetime(deadline_field, value)
+
+    @lru_cache(maxsize=PARSE_CACHE_SIZE)
+    def parse_schedules(value, total_weeks):
+        slots = {}
+        for item in _split(value, '|'):
+            day, _, period = item.partition('-')
+            if day not in DAYS or not period.isdigit() or int(period) not in PERIODS:
+                raise ValueError(f'排课格式无效: {item}')
+            slots[(day, int(period))] = CourseSchedule(day=day, period=int(period))
+        return list(slots), encode(build_bitmap(slots.values(), total_weeks))
+
+    def build_row(row):
+        semester_id = _require(semesters, row['semester_id'], '学期')
+        daily_weight = int(row['daily_weight'])
+        final_weight = int(row['final_weight'])
+        if daily_weight + final_weight != 100:
+            raise ValueError('平时分和期末分的总和必须为100%')
+        capacity = int(row['capacity'])
+        if capacity < 0:
+            raise ValueError('capacity 不能为负数')
+        slots, bitmap = parse_schedules(row.get('schedules') or '', semesters[semester_id])
+
+        # 未出现在 CSV 中的列（enrolled_count、is_grades_published 等）取模型默认值
+        course_instance = CourseInstance(
+            course_prototype_id=_require(prototypes, row['course_prototype_id'], '课程原型'),
+            semester_id=semester_id,
+            location=row['location'],
+            capacity=capacity,
+            selection_deadline=parse_deadline(row['selection_deadline']),
+            department_id=_require(departments, row['department_id'], '院系'),
+            daily_weight=daily_weight,
+            final_weight=final_weight,
+            teacher_id=_require(teachers, row['teacher_id'], '教师') if row.get('teacher_id') else None,
+            is_finalized=finalized_field.to_python(row.get('is_finalized') or False),
+            schedule_bitmap=bitmap
+        )
+        eligible = (
+            {_require(departments, pk, '院系') for pk in _split(row.get('eligible_departments'), ';')},
+            {_require(grades, pk, '年级') for pk in _split(row.get('eligible_grades'), ';')},
+            {_require(classes, pk, '班级') for pk in _split(row.get('eligible_classes'), ';')},
+        )
+        return course_instance, eligible, slots
+
+    eligible_fields = [
+        CourseInstance._meta.get_field(name)
+        for name in ('eligible_departments', 'eligible_grades', 'eligible_classes')
+    ]
+    # 导入的排课只有星期和节次，其余列取模型默认值
+    schedule_defaults = [
+        CourseSchedule._meta.get_field(name).get_default()
+        for name in ('start_week', 'end_week', 'frequency', 'exceptions')
+    ]
+
+    semester_ids = set()
+
+    def write_batch(items):
+        # 写入后主键已写回这些实例
+        _insert_instances(CourseInstance, [course_instance for course_instance, _, _ in items])
+        semester_ids.update(course_instance.semester_id for course_instance, _, _ in items)
+        links = [[] for _ in eligible_fields]
+        schedules = []
+        for course_instance, eligible, slots in items:
+            course_id = course_instance.pk
+            for link_rows, ids in zip(links, eligible):
+                link_rows.extend((course_id, pk) for pk in ids)
+            schedules.extend((course_id, day, period, *schedule_defaults) for day, period in slots)
+        for field, link_rows in zip(eligible_fields, links):
+            _insert_rows(
+                field.remote_field.through,
+                [field.m2m_field_name(), field.m2m_reverse_field_name()],
+                link_rows
+            )
+        _insert_rows(
+            CourseSchedule,
+            ['course_instance', 'day', 'period', 'start_week', 'end_week', 'frequency', 'exceptions'],
+            schedules
+        )
+
+    try:
+        return _run_batches(rows, build_row, write_batch, ImportResult(), progress)
+    finally:
+        invalidate_eligibility()
+        for semester_id in semester_ids:
+            invalidate_semester_unions(semester_id)
+        invalidate_semester_timetables(semester_ids)
+
+
+def _run_import_job(importer):
+    def run(context):
+        with open(context.input_path, 'rb') as f:
+            result = importer(iter_csv_rows(f), progress=lambda processed, _: context.progress(processed))
+        return result.as_dict()
+    return run
+
+
+IMPORT_JOB_KINDS = {
+    'import_course_prototypes': import_course_prototypes,
+    'import_course_instances': import_course_instances,
+}
+for _kind, _importer in IMPORT_JOB_KINDS.items():
+    register_job(_kind)(_run_import_job(_importer))
@@ -0,0 +1,213 @@
+# backend/api/jobs.py
+
+"""
+后台任务
+
+大批量导入和报表生成通过 submit_job 提交，请求立即返回任务 ID，
+任务在进程内的线程池（settings.JOB_WORKERS）中执行，不需要额外的消息队列。
+各模块用 register_job 注册任务类型的处理函数：
+
+    @register_job('report')
+    def run_report_job(context, **params):
+        ...
+
+处理函数的返回值保存为 Job.result，文件结果通过 context.open_result 写入 JOB_RESULT_DIR/<任务 ID>/。
+取消是协作式的：等待中的任务直接取消，执行中的任务在下次 context.progress 时中止，
+任务结束时若已请求取消则丢弃结果。
+
+注意线程池只存在于当前进程：进程重启时尚未完成的任务不会自动恢复。
+等待中的任务可用 manage.py resume_jobs（resume_pending_jobs）重新认领执行，执行中断的任务会一直停留在执行状态。
+"""
+
+import logging
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class JobCancelled(Exception):
+    """
+    任务已被请求取消，由 JobContext.progress 抛出
+    """
+
+
+def register_job(kind):
+    """
+    注册任务类型的处理函数 handler(context, **params)
+    """
+    def decorator(handler):
+        _handlers[kind] = handler
+        return handler
+    return decorator
+
+
+def job_dir(job_id):
+    return os.path.join(settings.JOB_RESULT_DIR, str(job_id))
+
+
+def remove_job_files(job_id):
+    shutil.rmtree(job_dir(job_id), ignore_errors=True)
+
+
+class JobContext:
+    """
+    传给处理函数的执行上下文
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self.owner = job.owner
+        self.input_path = os.path.join(job_dir(job.id), 'input')
+
+    def progress(self, processed):
+        """
+        记录进度；任务已被请求取消时抛出 JobCancelled
+        """
+        if Job.objects.filter(id=self.job.id, cancel_requested=True).exists():
+            raise JobCancelled
+        Job.objects.filter(id=self.job.id).update(progress=processed)
+
+    @contextmanager
+    def open_result(self, filename, content_type):
+        """
+        打开结果文件用于写入，任务成功后可通过 /api/jobs/<id>/result/ 下载
+        """
+        os.makedirs(job_dir(self.job.id), exist_ok=True)
+        path = os.path.join(job_dir(self.job.id), 'result')
+        with open(path, 'wb') as output:
+            yield output
+        self.job.result_file = path
+        self.job.result_filename = filename
+        self.job.result_content_type = content_type
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=settings.JOB_WORKERS, thread_name_prefix='job')
+    return _executor
+
+
+def submit_job(kind, owner, params=None, input_file=None):
+    """
+    创建任务并在当前事务提交后交给线程池执行。input_file 为上传文件时先落盘，任务中通过 context.input_path 读取
+    """
+    if kind not in _handlers:
+        raise ValueError(f'未知的任务类型: {kind}')
+    job = Job.objects.create(kind=kind, owner=owner, params=params or {})
+    if input_file is not None:
+        os.makedirs(job_dir(job.id), exist_ok=True)
+        with open(os.path.join(job_dir(job.id), 'input'), 'wb') as f:
+            for chunk in input_file.chunks():
+                f.write(chunk)
+    transaction.on_commit(lambda: get_executor().submit(run_job, job.id))
+    return job
+
+
+def cancel_job(job):
+    """
+    取消任务，返回是否已请求取消（已结束的任务无法取消）
+    """
+    now = timezone.now()
+    if Job.objects.filter(id=job.id, status=Job.PENDING).update(
+        status=Job.CANCELLED, cancel_requested=True, finished_at=now
+    ):
+        remove_job_files(job.id)
+        return True
+    return Job.objects.filter(id=job.id, status=Job.RUNNING).update(cancel_requested=True) > 0
+
+
+def _finish(job_id, status, **fields):
+    Job.objects.filter(id=job_id).update(status=status, finished_at=timezone.now(), **fields)
+
+
+def run_job(job_id):
+    """
+    在工作线程中执行一个任务
+    """
+    # 只有仍在等待中的任务才会开始执行，提交后立即取消或已被 resume_pending_jobs 认领的任务在这里被跳过
+    if Job.objects.filter(id=job_id, status=Job.PENDING).update(status=Job.RUNNING, started_at=timezone.now()):
+        _execute(job_id)
+    else:
+        connections.close_all()
+
+
+def resume_pending_jobs(older_than, limit=100):
+    """
+    认领创建时间早于 older_than 之前、仍在等待中的任务（提交它们的进程已退出），交给当前进程的线程池执行，
+    返回认领的任务 ID。支持 SKIP LOCKED 的数据库（PostgreSQL）上多个进程同时恢复时各自认领不同的任务，互不等待
+    """
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    with transaction.atomic():
+        job_ids = list(
+            Job.objects.select_for_update(skip_locked=skip_locked).filter(
+                status=Job.PENDING, created_at__lt=timezone.now() - older_than
+            ).order_by('created_at').values_list('id', flat=True)[:limit]
+        )
+        Job.objects.filter(id__in=job_ids).update(status=Job.RUNNING, started_at=timezone.now())
+    executor = get_executor()
+    for job_id in job_ids:
+        executor.submit(_execute, job_id)
+    return job_ids
+
+
+def _execute(job_id):
+    """
+    执行已标记为执行中的任务
+    """
+    try:
+        job = Job.objects.select_related('owner').get(id=job_id)
+        context = JobContext(job)
+        try:
+            result = _handlers[job.kind](context, **job.params)
+        except JobCancelled:
+            _finish(job_id, Job.CANCELLED)
+            remove_job_files(job_id)
+            return
+        except Exception as e:
+            logger.exception('任务 %s (%s) 执行失败', job_id, job.kind)
+            _finish(job_id, Job.FAILED, error=str(getattr(e, 'detail', e)))
+            return
+
+        if Job.objects.filter(id=job_id, cancel_requested=True).exists():
+            _finish(job_id, Job.CANCELLED)
+            remove_job_files(job_id)
+            return
+        _finish(
+            job_id, Job.SUCCEEDED,
+            result=result,
+            result_file=context.job.result_file,
+            result_filename=context.job.result_filename,
+            result_content_type=context.job.result_content_type
+        )
+    finally:
+        input_path = os.path.join(job_dir(job_id), 'input')
+        if os.path.exists(input_path):
+            os.remove(input_path)
+        # 工作线程的数据库连接不会被请求结束信号关闭，这里主动关闭
+        connections.close_all()
+
+
+def wants_async(request):
+    """
+    请求是否要求以后台任务方式执行（?async=1 或请求体中 async=true）
+    """
+    value = request.query_params.get('async', request.data.get('async'))
+    return str(value).lower() in ('1', 'true', 'yes')
@@ -0,0 +1,136 @@
+# backend/api/management/commands/_bench.py
+
+"""
+基准测试命令的公共工具。所有基准都在一次性的测试数据库中运行，不会触碰正式数据。
+"""
+
+import asyncio
+import contextlib
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection, connections
+
+
+@contextlib.contextmanager
+def scratch_database(verbosity=0):
+    """
+    创建并在结束时销毁一个测试数据库
+    """
+    old_name = connection.settings_dict['NAME']
+    tmpdir = None
+    if connection.vendor == 'sqlite':
+        # 多线程并发写需要基于文件的数据库，内存库的共享缓存模式遇到写冲突会直接报错
+        tmpdir = tempfile.mkdtemp(prefix='studentdb-bench-')
+        connection.settings_dict['TEST']['NAME'] = os.path.join(tmpdir, 'bench.sqlite3')
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def percentile(samples, pct):
+    """
+    最近秩法求百分位数，samples 为空时返回 0
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100.0 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_concurrently(func, jobs, threads):
+    """
+    用线程池并发执行 func(*job)，返回 (每个调用的结果, 每个调用的耗时秒数, 总耗时秒数)。
+    调用抛出的异常记为结果 'error:<异常类名>'。
+    """
+    def timed(job):
+        start = time.perf_counter()
+        try:
+            outcome = func(*job)
+        except Exception as e:
+            outcome = f'error:{type(e).__name__}'
+        finally:
+            # 每个工作线程用完即关闭自己的连接，避免测试库销毁时仍有连接占用
+            connections.close_all()
+        return outcome, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(timed, jobs))
+    wall = time.perf_counter() - start
+    return [r[0] for r in results], [r[1] for r in results], wall
+
+
+def format_latency_report(name, latencies, wall):
+    """
+    生成一行吞吐量与延迟摘要
+    """
+    throughput = len(latencies) / wall if wall else 0.0
+    return (
+        f"{name:<10} calls={len(latencies):<6} wall={wall:.3f}s "
+        f"throughput={throughput:.1f}/s "
+        f"p50={percentile(latencies, 50) * 1000:.1f}ms "
+        f"p99={percentile(latencies, 99) * 1000:.1f}ms"
+    )
+
+
+async def _http_worker(host, port, requests, deadline, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        index = 0
+        while time.perf_counter() < deadline:
+            path, headers = requests[index % len(requests)]
+            index += 1
+            lines = [f'GET {path} HTTP/1.1', f'Host: {host}', *(f'{k}: {v}' for k, v in headers.items()), '', '']
+            start = time.perf_counter()
+            writer.write('\r\n'.join(lines).encode())
+            status_line = await reader.readline()
+            length, chunked = 0, False
+            while (line := await reader.readline()) not in (b'\r\n', b''):
+                name, _, value = line.decode('latin-1').partition(':')
+                name = name.strip().lower()
+                if name == 'content-length':
+                    length = int(value)
+                elif name == 'transfer-encoding' and 'chunked' in value.lower():
+                    chunked = True
+            if chunked:
+                while (size := int((await reader.readline()).split(b';')[0], 16)):
+                    await reader.readexactly(size + 2)
+                await reader.readline()
+            else:
+                await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            status = int(status_line.split()[1])
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+def http_load(host, port, requests, connections, duration):
+    """
+    用 connections 个 keep-alive 连接循环发送 GET 请求 duration 秒。
+    requests 为 [(路径, 请求头字典)]，各连接依次轮流使用。
+    返回 (每个请求的耗时秒数, {状态码: 次数}, 总耗时秒数)。
+
+    只依赖标准库，可在 spawn 出的子进程中运行，避免压测客户端与被测服务器争抢 GIL。
+    """
+    latencies, statuses = [], {}
+
+    async def main():
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(
+            _http_worker(host, port, requests[i::connections] or requests, deadline, latencies, statuses)
+            for i in range(connections)
+        ))
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    return latencies, statuses, time.perf_counter() - start
@@ -0,0 +1,203 @@
+# backend/api/management/commands/benchmark_asgi.py
+
+"""
+ASGI 基准：在 uvicorn 下对比热点只读接口的同步（WSGI）与异步（ASGI）实现的吞吐量和延迟。
+
+    python manage.py benchmark_asgi --students 500 --connections 64 --duration 10
+
+两种入口用同一个 uvicorn 服务器在本进程的线程中运行：
+    wsgi    uvicorn --interface wsgi backend.wsgi:application（固定大小的工作线程池）
+    asgi    uvicorn backend.asgi:application（api/async_views.py）
+压测客户端在独立的子进程中运行，每个连接轮流使用不同学生的令牌。
+"""
+
+import multiprocessing
+import random
+import socket
+import threading
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from api.models import (
+    Class, CourseInstance, CoursePrototype, CourseSchedule, Department, Grade, S_Grade, SelectionBatch,
+    Semester, Student
+)
+from api.rankings import materialize_course_ranks
+from api.roles import STUDENT_GROUP
+from api.schedule_index import DAYS, PERIODS
+from api.tokens import RoleRefreshToken
+
+from ._bench import http_load, percentile, scratch_database
+
+ENDPOINTS = {
+    'available': '/api/course-instances/list_available_courses/',
+    'grades': '/api/s-grades/my_all_grades/',
+    'rankings': '/api/s-grades/my_rankings/',
+    'semester': '/api/semesters/current/',
+    'me': '/api/user/current/',
+}
+
+
+def _build_fixture(students, courses, graded, seed):
+    rng = random.Random(seed)
+    department = Department.objects.create(name='基准学院')
+    grade = Grade.objects.create(name='基准级', department=department)
+    student_class = Class.objects.create(name='基准班', grade=grade, department=department)
+    now = timezone.now()
+    past = Semester.objects.create(
+        name='上学期', start_date=date.today() - timedelta(weeks=30), end_date=date.today() - timedelta(weeks=10)
+    )
+    semester = Semester.objects.create(
+        name='基准学期', start_date=date.today(), end_date=date.today() + timedelta(weeks=20), is_current=True
+    )
+    batch = SelectionBatch.objects.create(
+        name='基准批次', semester=semester,
+        start_selection_date=now - timedelta(days=1), end_selection_date=now + timedelta(days=7)
+    )
+
+    open_courses = []
+    for i in range(courses):
+        prototype = CoursePrototype.objects.create(name=f'基准课程{i}', description='', department=department)
+        course = CourseInstance.objects.create(
+            course_prototype=prototype, semester=semester, location='A101', capacity=students,
+            selection_deadline=now + timedelta(days=7), department=department, selection_batch=batch
+        )
+        course.eligible_classes.add(student_class)
+        CourseSchedule.objects.create(
+            course_instance=course, day=DAYS[i // len(PERIODS) % len(DAYS)], period=PERIODS[i % len(PERIODS)],
+            start_week=1, end_week=16
+        )
+        open_courses.append(course)
+    graded_courses = [
+        CourseInstance.objects.create(
+            course_prototype=open_courses[i % courses].course_prototype, semester=past, location='A101',
+            capacity=students, selection_deadline=now - timedelta(weeks=20), department=department,
+            is_finalized=True, is_grades_published=True
+        )
+        for i in range(graded)
+    ]
+
+    users = User.objects.bulk_create(
+        [User(username=f'bench{i}', password='!') for i in range(students)]
+    )
+    Student.objects.bulk_create([
+        Student(user=u, department=department, student_class=student_class, grade=grade,
+                age=20, gender='Other', id_number=f'B{i:017d}')
+        for i, u in enumerate(users)
+    ])
+    group = Group.objects.get_or_create(name=STUDENT_GROUP)[0]
+    User.groups.through.objects.bulk_create([User.groups.through(user=u, group=group) for u in users])
+    grades = []
+    for course in graded_courses:
+        for user in users:
+            daily, final = rng.randint(40, 100), rng.randint(0, 100)
+            grades.append(S_Grade(
+                student_id=user.id, course_instance_id=course.id,
+                daily_score=daily, final_score=final, total_score=daily * 0.5 + final * 0.5
+            ))
+    S_Grade.objects.bulk_create(grades, batch_size=5000)
+    for course in graded_courses:
+        materialize_course_ranks(course.id)
+    return users
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class _Server:
+    """
+    在后台线程中运行的 uvicorn 服务器
+    """
+
+    def __init__(self, app, interface):
+        import uvicorn
+
+        self.port = _free_port()
+        config = uvicorn.Config(
+            app, host='127.0.0.1', port=self.port, interface=interface,
+            lifespan='off', log_level='warning', access_log=False
+        )
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        deadline = time.monotonic() + 10
+        while not self.server.started:
+            if not self.thread.is_alive() or time.monotonic() > deadline:
+                raise CommandError('uvicorn 启动失败')
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.should_exit = True
+        self.thread.join()
+        connections.close_all()
+
+
+def _report(name, latencies, statuses, wall):
+    throughput = len(latencies) / wall if wall else 0.0
+    codes = ' '.join(f'{code}:{count}' for code, count in sorted(statuses.items()))
+    return (
+        f"{name:<18} requests={len(latencies):<7} rps={throughput:<8.1f} "
+        f"p50={percentile(latencies, 50) * 1000:.1f}ms "
+        f"p99={percentile(latencies, 99) * 1000:.1f}ms status={codes}"
+    )
+
+
+class Command(BaseCommand):
+    help = 'ASGI 基准：uvicorn 下对比热点只读接口的 WSGI 与 ASGI 实现'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=500, help='学生数（令牌数）')
+        parser.add_argument('--courses', type=int, default=30, help='本学期可选课程数')
+        parser.add_argument('--graded', type=int, default=10, help='每名学生已出成绩的课程数')
+        parser.add_argument('--connections', type=int, default=64, help='并发 keep-alive 连接数')
+        parser.add_argument('--duration', type=float, default=10.0, help='每个接口的压测秒数')
+        parser.add_argument('--warmup', type=float, default=2.0, help='每个接口正式计时前的预热秒数')
+        parser.add_argument(
+            '--endpoints', nargs='+', choices=sorted(ENDPOINTS), default=sorted(ENDPOINTS), help='压测的接口'
+        )
+        parser.add_argument('--seed', type=int, default=0, help='随机成绩的种子')
+
+    def handle(self, *args, **options):
+        try:
+            import uvicorn  # noqa: F401
+        except ImportError:
+            raise CommandError('需要安装 uvicorn')
+        from backend.asgi import application as asgi_application
+
+        # DEBUG 下每条查询都会被记录，与生产环境差距太大
+        settings.DEBUG = False
+        with scratch_database():
+            start = time.perf_counter()
+            users = _build_fixture(options['students'], options['courses'], options['graded'], options['seed'])
+            self.stdout.write(f"fixture    students={len(users)} built in {time.perf_counter() - start:.1f}s")
+            headers = [
+                {'Authorization': f'Bearer {RoleRefreshToken.for_user(user).access_token}'} for user in users
+            ]
+            connections.close_all()
+
+            load = multiprocessing.get_context('spawn').Pool(1)
+            try:
+                for name, interface, app in (('wsgi', 'wsgi', WSGIHandler()), ('asgi', 'asgi3', asgi_application)):
+                    with _Server(app, interface) as server:
+                        for endpoint in options['endpoints']:
+                            requests = [(ENDPOINTS[endpoint], h) for h in headers]
+                            args = ('127.0.0.1', server.port, requests, options['connections'])
+                            load.apply(http_load, (*args, options['warmup']))
+                            latencies, statuses, wall = load.apply(http_load, (*args, options['duration']))
+                            self.stdout.write(_report(f'{name} {endpoint}', latencies, statuses, wall))
+            finally:
+                load.close()
+                load.join()
@@ -0,0 +1,152 @@
+# backend/api/management/commands/benchmark_rankings.py
+
+"""
+成绩排名基准：对比原先每行一个关联子查询的 my_rankings 与物化排名引擎。
+
+    python manage.py benchmark_rankings --students 10000 --courses 50 --sample 20
+"""
+
+import random
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from api.models import CourseInstance, CoursePrototype, Department, S_Grade, Semester
+from api.rankings import materialize_course_ranks, student_rankings
+
+from ._bench import percentile, scratch_database
+
+GRADE_BATCH_SIZE = 5000
+
+
+def _build_fixture(students, courses, seed):
+    rng = random.Random(seed)
+    department = Department.objects.create(name='基准学院')
+    semester = Semester.objects.create(
+        name='基准学期', start_date=date.today(), end_date=date.today() + timedelta(weeks=20), is_current=True
+    )
+    course_ids = []
+    for i in range(courses):
+        prototype = CoursePrototype.objects.create(name=f'基准课程{i}', description='', department=department)
+        course = CourseInstance.objects.create(
+            course_prototype=prototype, semester=semester, location='A101', capacity=students,
+            selection_deadline=timezone.now(), department=department,
+            is_finalized=True, is_grades_published=True
+        )
+        course_ids.append(course.id)
+
+    users = User.objects.bulk_create(
+        [User(username=f'bench{i}', password='!') for i in range(students)], batch_size=GRADE_BATCH_SIZE
+    )
+    # bulk_create 不经过 S_Grade.save()，按默认 50/50 权重直接算好总分
+    batch = []
+    for course_id in course_ids:
+        for user in users:
+            daily, final = rng.randint(40, 100), rng.randint(0, 100)
+            batch.append(S_Grade(
+                student_id=user.id, course_instance_id=course_id,
+                daily_score=daily, final_score=final, total_score=daily * 0.5 + final * 0.5
+            ))
+            if len(batch) >= GRADE_BATCH_SIZE:
+                S_Grade.objects.bulk_create(batch)
+                batch = []
+    S_Grade.objects.bulk_create(batch)
+    return course_ids, users
+
+
+def _legacy_rankings(user):
+    """
+    原先 S_GradeViewSet.my_rankings 的查询
+    """
+    grades = S_Grade.objects.filter(student=user, course_instance__is_grades_published=True)
+    subquery = S_Grade.objects.filter(
+        course_instance=OuterRef('course_instance'),
+        total_score__gt=OuterRef('total_score')
+    ).values('course_instance').annotate(
+        higher_count=Count('id')
+    ).values('higher_count')[:1]
+    return list(S_Grade.objects.filter(
+        course_instance__in=grades.values('course_instance'),
+        student=user,
+        course_instance__is_grades_published=True
+    ).annotate(
+        higher_count=Subquery(subquery, output_field=IntegerField()),
+        rank=Coalesce(F('higher_count'), Value(0)) + 1
+    ).values(
+        'course_instance__course_prototype__name',
+        'course_instance__semester__name',
+        'daily_score',
+        'final_score',
+        'total_score',
+        'rank'
+    ))
+
+
+def _timed(func, users):
+    latencies, results = [], []
+    for user in users:
+        start = time.perf_counter()
+        results.append(func(user))
+        latencies.append(time.perf_counter() - start)
+    return results, latencies
+
+
+def _report(name, latencies):
+    return (
+        f"{name:<10} calls={len(latencies):<4} "
+        f"p50={percentile(latencies, 50) * 1000:.1f}ms "
+        f"p99={percentile(latencies, 99) * 1000:.1f}ms "
+        f"total={sum(latencies):.3f}s"
+    )
+
+
+class Command(BaseCommand):
+    help = '成绩排名基准：对比关联子查询实现与窗口函数物化排名'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=10000, help='每门课程的学生数')
+        parser.add_argument('--courses', type=int, default=50, help='课程数')
+        parser.add_argument('--sample', type=int, default=20, help='抽样查询排名的学生数')
+        parser.add_argument('--seed', type=int, default=0, help='随机成绩的种子')
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            start = time.perf_counter()
+            course_ids, users = _build_fixture(options['students'], options['courses'], options['seed'])
+            self.stdout.write(
+                f"fixture    grades={len(course_ids) * len(users)} built in {time.perf_counter() - start:.1f}s"
+            )
+            sample = random.Random(options['seed']).sample(users, min(options['sample'], len(users)))
+
+            legacy, latencies = _timed(_legacy_rankings, sample)
+            self.stdout.write(_report('legacy', latencies))
+
+            start = time.perf_counter()
+            for course_id in course_ids:
+                materialize_course_ranks(course_id)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"{'publish':<10} courses={len(course_ids):<4} "
+                f"per_course={elapsed / max(len(course_ids), 1) * 1000:.1f}ms total={elapsed:.3f}s"
+            )
+
+            engine, latencies = _timed(student_rankings, sample)
+            self.stdout.write(_report('engine', latencies))
+
+            # 只有首考成绩时两种实现的名次应完全一致
+            mismatches = sum(
+                {
+                    f"{row['course_instance__course_prototype__name']} - {row['course_instance__semester__name']}": row['rank']
+                    for row in old
+                } != {row['course_instance']: row['rank'] for row in new}
+                for old, new in zip(legacy, engine)
+            )
+            if mismatches:
+                self.stdout.write(self.style.ERROR(f'{mismatches} 名学生的排名与原实现不一致'))
+            else:
+                self.stdout.write(self.style.SUCCESS('排名与原实现一致'))
@@ -0,0 +1,50 @@
+# backend/api/management/commands/explain_hot_queries.py
+
+"""
+热点查询的执行计划检查：对 viewsets 等处的高频查询（见 api/hot_queries.py）执行 EXPLAIN，
+确认每条查询都走了预期的索引。同样的检查也在 api/tests/test_hot_queries.py 中随测试运行。
+
+    python manage.py explain_hot_queries            # 在一次性的测试数据库中检查（迁移后的表结构）
+    python manage.py explain_hot_queries --live     # 直接对当前配置的数据库检查（真实数据和统计信息）
+
+任何一条查询没有用到预期索引时命令以错误结束。
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.hot_queries import disable_seqscan, hot_queries, used_indexes
+
+from ._bench import scratch_database
+
+
+class Command(BaseCommand):
+    help = '对热点查询执行 EXPLAIN，检查是否使用了预期的索引'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--live', action='store_true', help='对当前配置的数据库检查，而不是一次性的测试数据库')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        if options['live']:
+            missing = self.check_plans()
+        else:
+            with scratch_database():
+                disable_seqscan()
+                missing = self.check_plans()
+        if missing:
+            raise CommandError(f'以下查询未使用预期索引: {", ".join(missing)}')
+        self.stdout.write(self.style.SUCCESS('所有热点查询均使用了预期索引'))
+
+    def check_plans(self):
+        missing = []
+        for label, model, columns, queryset in hot_queries():
+            plan, names, used = used_indexes(model, columns, queryset)
+            if used:
+                self.stdout.write(f'{label:<20} ok    {", ".join(used)}')
+            else:
+                missing.append(label)
+                expected = ', '.join(sorted(names)) or f'<{model._meta.db_table}({", ".join(columns)}) 上没有索引>'
+                self.stdout.write(self.style.ERROR(f'{label:<20} MISS  预期 {expected}'))
+            if self.verbosity > 1:
+                self.stdout.write('    ' + plan.replace('\n', '\n    '))
+        return missing
@@ -0,0 +1,28 @@
+# backend/api/management/commands/resume_jobs.py
+
+"""
+重新执行进程重启前遗留的等待中后台任务，在部署后或定时运行：
+
+    python manage.py resume_jobs --older-than 300
+
+命令等待认领的任务全部执行完毕后退出。多个进程同时运行时（PostgreSQL）各自认领不同的任务。
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from api.jobs import get_executor, resume_pending_jobs
+
+
+class Command(BaseCommand):
+    help = '重新执行遗留的等待中后台任务'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=300, help='只认领创建超过该秒数的任务')
+        parser.add_argument('--limit', type=int, default=100, help='最多认领的任务数')
+
+    def handle(self, *args, **options):
+        job_ids = resume_pending_jobs(timedelta(seconds=options['older_than']), options['limit'])
+        self.stdout.write(f'认领 {len(job_ids)} 个任务')
+        get_executor().shutdown(wait=True)
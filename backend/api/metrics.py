@@ -0,0 +1,362 @@
+# backend/api/metrics.py
+
+"""
+接口性能指标
+
+RequestMetricsMiddleware 按接口（请求方法 + URL 名称，视图集的 action 已包含在 URL 名称中）记录：
+
+    queries         SQL 查询次数（每个数据库连接上的 execute_wrapper 计数，不依赖 DEBUG）
+    db_seconds      SQL 执行耗时
+    render_seconds  响应序列化（渲染器）耗时
+    seconds         请求总耗时
+    response_bytes  响应体大小
+
+并累计到进程内的直方图，由 /api/_metrics/ 以 JSON 或 Prometheus 文本格式（?format=prometheus）导出，
+同时导出数据库连接池的统计（见 db_pool.py）。
+多进程部署时每个进程各自统计。中间件同时支持同步和异步请求：当前请求的统计对象放在 contextvar 中，
+异步 ORM 在线程池中执行查询时也能记到发起查询的请求上。
+
+查询预算：settings.QUERY_BUDGETS 按 URL 名称给出单个请求允许的最大查询次数，视图也可以用
+query_budget 属性声明（整数，或 {action: 整数}）。超出时记录警告；QUERY_BUDGET_RAISE 开启时
+（测试中）抛出 QueryBudgetExceeded，测试客户端会把它作为失败暴露出来。
+"""
+
+import bisect
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+logger = logging.getLogger(__name__)
+
+# 各指标的直方图桶上界
+BUCKETS = {
+    'queries': (1, 2, 5, 10, 20, 50, 100, 200, 500),
+    'db_seconds': (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+    'render_seconds': (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+    'seconds': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    'response_bytes': (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+}
+
+DESCRIPTIONS = {
+    'queries': 'SQL queries per request',
+    'db_seconds': 'Time spent executing SQL per request',
+    'render_seconds': 'Time spent rendering the response body',
+    'seconds': 'Total request duration',
+    'response_bytes': 'Response body size',
+}
+
+# 连接池指标：名称 -> (类型, 说明, pool_stats() 中的键, 换算系数)
+POOL_METRICS = {
+    'size': ('gauge', 'Open connections', 'pool_size', 1),
+    'available': ('gauge', 'Idle connections', 'pool_available', 1),
+    'in_use': ('gauge', 'Connections checked out', 'in_use', 1),
+    'max_size': ('gauge', 'Configured maximum connections', 'pool_max', 1),
+    'saturation': ('gauge', 'Connections in use divided by maximum size', 'saturation', 1),
+    'requests_waiting': ('gauge', 'Requests waiting for a connection', 'requests_waiting', 1),
+    'requests_total': ('counter', 'Connection requests', 'requests_num', 1),
+    'requests_queued_total': ('counter', 'Connection requests that had to wait', 'requests_queued', 1),
+    'wait_seconds_total': ('counter', 'Time spent waiting for a connection', 'requests_wait_ms', 0.001),
+    'requests_errors_total': ('counter', 'Connection requests that timed out or were rejected', 'requests_errors', 1),
+    'connections_total': ('counter', 'Connections opened', 'connections_num', 1),
+    'connections_errors_total': ('counter', 'Failed connection attempts', 'connections_errors', 1),
+    'connections_lost_total': ('counter', 'Connections found broken by health checks', 'connections_lost', 1),
+}
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class Histogram:
+    __slots__ = ('bounds', 'counts', 'count', 'sum', 'max')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # 最后一个桶为 +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """
+        按桶上界估计分位数，落在 +Inf 桶时取观测到的最大值
+        """
+        if not self.count:
+            return 0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.bounds, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6) if self.count else 0,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'max': self.max,
+        }
+
+
+class Registry:
+    """
+    进程内的按接口指标汇总
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._budget_exceeded = {}
+
+    def record(self, endpoint, values, over_budget=False):
+        with self._lock:
+            histograms = self._endpoints.get(endpoint)
+            if histograms is None:
+                histograms = self._endpoints[endpoint] = {name: Histogram(bounds) for name, bounds in BUCKETS.items()}
+            for name, value in values.items():
+                histograms[name].observe(value)
+            if over_budget:
+                self._budget_exceeded[endpoint] = self._budget_exceeded.get(endpoint, 0) + 1
+
+    def snapshot(self):
+        """
+        [(接口, {指标: 直方图副本}, 超出预算次数)]，按接口名排序
+        """
+        with self._lock:
+            rows = []
+            for endpoint in sorted(self._endpoints):
+                copies = {}
+                for name, histogram in self._endpoints[endpoint].items():
+                    copy = Histogram(histogram.bounds)
+                    copy.counts, copy.count, copy.sum, copy.max = (
+                        list(histogram.counts), histogram.count, histogram.sum, histogram.max
+                    )
+                    copies[name] = copy
+                rows.append((endpoint, copies, self._budget_exceeded.get(endpoint, 0)))
+            return rows
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self._budget_exceeded.clear()
+
+
+registry = Registry()
+
+
+class RequestMetrics:
+    __slots__ = ('queries', 'db_seconds', 'render_seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.render_seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_seconds += time.perf_counter() - start
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    装在每个数据库连接上的 execute_wrapper（见 signal.py），把查询记到当前请求上
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def endpoint_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    return f'{request.method} {match.view_name}'
+
+
+def query_budget(request):
+    """
+    请求所在接口的查询预算；视图属性优先于 settings.QUERY_BUDGETS，都没有时为 None
+    """
+    match = request.resolver_match
+    view_class = getattr(match.func, 'cls', None) or getattr(match.func, 'view_class', None)
+    budget = getattr(view_class, 'query_budget', None)
+    if isinstance(budget, dict):
+        actions = getattr(match.func, 'actions', None) or {}
+        budget = budget.get(actions.get(request.method.lower()))
+    if budget is None:
+        budget = settings.QUERY_BUDGETS.get(match.view_name)
+    return budget
+
+
+def _response_size(response):
+    if response.streaming:
+        length = response.get('Content-Length')
+        return int(length) if length and length.isdigit() else 0
+    return len(response.content)
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.record(request, response, metrics, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.record(request, response, metrics, time.perf_counter() - start)
+
+    def record(self, request, response, metrics, elapsed):
+        endpoint = endpoint_name(request)
+        if endpoint is None:
+            return response
+        budget = query_budget(request)
+        over_budget = budget is not None and metrics.queries > budget
+        registry.record(endpoint, {
+            'queries': metrics.queries,
+            'db_seconds': metrics.db_seconds,
+            'render_seconds': metrics.render_seconds,
+            'seconds': elapsed,
+            'response_bytes': _response_size(response),
+        }, over_budget)
+        if over_budget:
+            message = f'{endpoint} 执行了 {metrics.queries} 次查询，超出预算 {budget}'
+            if settings.QUERY_BUDGET_RAISE:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """
+    记录渲染耗时的 JSONRenderer
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        start = time.perf_counter()
+        try:
+            return super().render(data, accepted_media_type, renderer_context)
+        finally:
+            metrics = _current.get()
+            if metrics is not None:
+                metrics.render_seconds += time.perf_counter() - start
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _pool_lines(pools):
+    """
+    db_pool.pool_stats() 的结果：计数以 _total 结尾，等待时间换算为秒
+    """
+    lines = []
+    for name, (kind, help_text, key, scale) in POOL_METRICS.items():
+        metric = f'api_db_pool_{name}'
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} {kind}')
+        for alias, stats in pools.items():
+            lines.append(f'{metric}{{alias="{_label(alias)}"}} {_number(stats[key] * scale)}')
+    return lines
+
+
+def prometheus_text(rows, pools=None):
+    """
+    按 Prometheus 文本格式（0.0.4）导出 snapshot() 的结果和连接池统计
+    """
+    lines = []
+    for name, bounds in BUCKETS.items():
+        metric = f'api_request_{name}'
+        lines.append(f'# HELP {metric} {DESCRIPTIONS[name]}')
+        lines.append(f'# TYPE {metric} histogram')
+        for endpoint, histograms, _ in rows:
+            histogram = histograms[name]
+            label = f'endpoint="{_label(endpoint)}"'
+            cumulative = 0
+            for bound, n in zip(bounds, histogram.counts):
+                cumulative += n
+                lines.append(f'{metric}_bucket{{{label},le="{_number(bound)}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{{label},le="+Inf"}} {histogram.count}')
+            lines.append(f'{metric}_sum{{{label}}} {_number(histogram.sum)}')
+            lines.append(f'{metric}_count{{{label}}} {histogram.count}')
+    lines.append('# HELP api_query_budget_exceeded_total Requests that exceeded their query budget')
+    lines.append('# TYPE api_query_budget_exceeded_total counter')
+    for endpoint, _, exceeded in rows:
+        lines.append(f'api_query_budget_exceeded_total{{endpoint="{_label(endpoint)}"}} {exceeded}')
+    if pools:
+        lines.extend(_pool_lines(pools))
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_summary(rows):
+    return {
+        endpoint: {
+            'requests': histograms['seconds'].count,
+            'budget_exceeded': exceeded,
+            **{name: histogram.summary() for name, histogram in histograms.items()},
+        }
+        for endpoint, histograms, exceeded in rows
+    }
+
+
+class PrometheusRenderer(BaseRenderer):
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # 数据为 {'endpoints': snapshot() 的结果, 'db_pools': 连接池统计}；出错时（如未认证）按纯文本输出错误信息
+        if isinstance(data, dict) and 'endpoints' in data:
+            return prometheus_text(data['endpoints'], data['db_pools'])
+        return str(data.get('detail', data) if isinstance(data, dict) else data)
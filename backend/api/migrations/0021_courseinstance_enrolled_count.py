@@ -0,0 +1,27 @@
+# Generated by Django 5.1.4 on 2026-10-18 20:20
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_enrolled_count(apps, schema_editor):
+    CourseInstance = apps.get_model("api", "CourseInstance")
+    counts = CourseInstance.objects.annotate(n=Count("selected_students")).values_list("id", "n")
+    for course_id, n in counts:
+        CourseInstance.objects.filter(id=course_id).update(enrolled_count=n)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0020_alter_student_gender"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="courseinstance",
+            name="enrolled_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_enrolled_count, migrations.RunPython.noop),
+    ]
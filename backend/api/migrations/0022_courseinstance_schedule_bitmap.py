@@ -0,0 +1,42 @@
+# Generated by Django 5.1.4 on 2026-10-18 20:41
+
+from django.db import migrations, models
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+PERIODS = [1, 2, 3, 4, 5]
+
+
+def backfill_schedule_bitmap(apps, schema_editor):
+    # 与 api.schedule_index 的位布局保持一致；迁移中不能调用模型上的方法，这里内联展开
+    CourseInstance = apps.get_model("api", "CourseInstance")
+    CourseSchedule = apps.get_model("api", "CourseSchedule")
+    slots_per_week = len(DAYS) * len(PERIODS)
+    bitmaps = {}
+    total_weeks = dict(CourseInstance.objects.values_list("id", "semester__total_weeks"))
+    for s in CourseSchedule.objects.all():
+        if s.day not in DAYS or s.period not in PERIODS:
+            continue
+        bits = bitmaps.get(s.course_instance_id, 0)
+        for week in range(max(s.start_week, 1), min(s.end_week, total_weeks[s.course_instance_id]) + 1):
+            if (week - s.start_week) % s.frequency != 0 or week in s.exceptions:
+                continue
+            bits |= 1 << ((week - 1) * slots_per_week + DAYS.index(s.day) * len(PERIODS) + (s.period - 1))
+        bitmaps[s.course_instance_id] = bits
+    for course_id, bits in bitmaps.items():
+        CourseInstance.objects.filter(id=course_id).update(schedule_bitmap=format(bits, "x") if bits else "")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0021_courseinstance_enrolled_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="courseinstance",
+            name="schedule_bitmap",
+            field=models.TextField(blank=True, default="", editable=False),
+        ),
+        migrations.RunPython(backfill_schedule_bitmap, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.4 on 2026-10-18 20:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0022_courseinstance_schedule_bitmap'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradeRank',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempt', models.PositiveSmallIntegerField(default=1)),
+                ('rank', models.PositiveIntegerField()),
+                ('course_instance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grade_ranks', to='api.courseinstance')),
+                ('grade', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rank_entry', to='api.s_grade')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grade_ranks', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['student', 'course_instance'], name='api_gradera_student_f40ee0_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.4 on 2026-10-18 21:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def keep_single_current_semester(apps, schema_editor):
+    # 唯一约束建立前，多个当前学期只保留 ID 最大的一个
+    Semester = apps.get_model("api", "Semester")
+    latest = Semester.objects.filter(is_current=True).order_by("-id").values_list("id", flat=True).first()
+    if latest is not None:
+        Semester.objects.filter(is_current=True).exclude(id=latest).update(is_current=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0024_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='courseinstance',
+            index=models.Index(fields=['semester', 'is_finalized'], name='ci_semester_final_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='courseinstance',
+            index=models.Index(fields=['selection_batch', 'selection_deadline'], name='ci_batch_deadline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='s_grade',
+            index=models.Index(fields=['course_instance', 'attempt', '-total_score'], name='sgrade_course_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='selectionbatch',
+            index=models.Index(fields=['start_selection_date', 'end_selection_date'], name='batch_window_idx'),
+        ),
+        migrations.RunPython(keep_single_current_semester, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='semester',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_current', True)), fields=('is_current',), name='unique_current_semester'),
+        ),
+    ]
@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.db.models.signals import post_save
@@ -83,9 +85,19 @@ class Semester(models.Model):
     total_weeks = models.PositiveIntegerField(default=20, help_text="学期总周数")
     is_current = models.BooleanField(default=False)  # 新增字段，用于标识当前学期
 
+    class Meta:
+        constraints = [
+            # 至多一个当前学期；Semester.objects.get(is_current=True) 走这个部分索引
+            models.UniqueConstraint(fields=['is_current'], condition=models.Q(is_current=True), name='unique_current_semester'),
+        ]
+
     def __str__(self):
         return self.name
     
+    def validate_constraints(self, exclude=None):
+        # save() 会先取消其他学期的当前标记，表单校验时不按唯一约束拒绝
+        super().validate_constraints(exclude={*(exclude or ()), 'is_current'})
+
     def save(self, *args, **kwargs):
         if self.is_current:
             # 将其他学期的 is_current 设为 False
@@ -98,6 +110,10 @@ class SelectionBatch(models.Model):
     end_selection_date = models.DateTimeField()
     semester = models.ForeignKey(Semester, on_delete=models.CASCADE, related_name='selection_batches')
 
+    class Meta:
+        # 查找当前选课批次：start_selection_date <= now <= end_selection_date
+        indexes = [models.Index(fields=['start_selection_date', 'end_selection_date'], name='batch_window_idx')]
+
     def __str__(self):
         return f"{self.name} ({self.semester.name})"
 
@@ -115,10 +131,22 @@ class CourseInstance(models.Model):
     eligible_grades = models.ManyToManyField(Grade, related_name='eligible_course_instances')
     eligible_classes = models.ManyToManyField(Class, related_name='eligible_course_instances')
     selected_students = models.ManyToManyField(User, related_name='selected_courses', blank=True)
+    # 冗余的已选人数计数器，由 api.enrollment 原子维护，避免每次选课都对中间表 COUNT
+    enrolled_count = models.PositiveIntegerField(default=0, editable=False)
+    # 排课占用位图（十六进制），由 api.schedule_index 在排课变化时物化
+    schedule_bitmap = models.TextField(default='', blank=True, editable=False)
     teacher = models.ForeignKey(Teacher, on_delete=models.SET_NULL, null=True, blank=True, related_name='course_instances')
     is_finalized = models.BooleanField(default=False)
     selection_batch = models.ForeignKey(SelectionBatch, on_delete=models.CASCADE, related_name='course_instances', null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # 学期内的课程（课表、排课位图重建），以及学生已选且未最终化课程的位图之并
+            models.Index(fields=['semester', 'is_finalized'], name='ci_semester_final_idx'),
+            # 选课批次内的课程及其截止时间（剩余座位快照、批次可选课程）
+            models.Index(fields=['selection_batch', 'selection_deadline'], name='ci_batch_deadline_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         # 当保存课程实例时，同步选课批次的时间
         if self.selection_batch:
@@ -127,8 +155,30 @@ class CourseInstance(models.Model):
             # self.selection_start_date = self.selection_batch.start_selection_date
         if self.daily_weight + self.final_weight != 100:
             raise ValueError("平时分和期末分的总和必须为100%")
+        # enrolled_count 只允许通过条件 UPDATE 修改，schedule_bitmap 由上课时间派生（schedule_index），
+        # 普通保存不能用内存中的旧值覆盖它们
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in ('enrolled_count', 'schedule_bitmap')
+            ]
         super().save(*args, **kwargs)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 记录加载时的成绩占比，保存后据此判断是否需要重算成绩总分
+        instance._loaded_weights = (
+            instance.__dict__.get('daily_weight'),
+            instance.__dict__.get('final_weight'),
+        )
+        # 学期和最终化状态决定课程是否计入学生的已选课程位图之并
+        instance._loaded_placement = (
+            instance.__dict__.get('semester_id'),
+            instance.__dict__.get('is_finalized'),
+        )
+        return instance
+
     def __str__(self):
         return f"{self.course_prototype.name} - {self.semester}"
 
@@ -209,6 +259,10 @@ class S_Grade(models.Model):
     class Meta:
         unique_together = ('student', 'course_instance', 'attempt')  
         # 这样可以确保 (学生, 课程, 考试轮次) 的唯一性
+        indexes = [
+            # 按课程取成绩并按考试轮次、总分排名（见 rankings.ranked_grades）
+            models.Index(fields=['course_instance', 'attempt', '-total_score'], name='sgrade_course_score_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         # 自动计算 total_score
@@ -227,6 +281,24 @@ class S_Grade(models.Model):
         )
 
 
+class GradeRank(models.Model):
+    """
+    成绩排名物化表。发布成绩时按课程用一次窗口函数计算并写入，
+    成绩变动或撤回发布时删除，读取排名时按学生走索引查询。
+    """
+    grade = models.OneToOneField(S_Grade, on_delete=models.CASCADE, related_name='rank_entry')
+    course_instance = models.ForeignKey(CourseInstance, on_delete=models.CASCADE, related_name='grade_ranks')
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='grade_ranks')
+    attempt = models.PositiveSmallIntegerField(default=1)
+    rank = models.PositiveIntegerField()  # 同一课程同一考试轮次内按总分从高到低的名次
+
+    class Meta:
+        indexes = [models.Index(fields=['student', 'course_instance'])]
+
+    def __str__(self):
+        return f"{self.grade} - 第{self.rank}名"
+
+
 class PunishmentRecord(models.Model):
     PUNISHMENT_TYPES = (
         ('DISCIPLINE', '纪律处分'),
@@ -255,3 +327,41 @@ class RewardRecord(models.Model):
         return f"{self.student.user.get_full_name()} - {self.get_type_display()}"
 
 
+class Job(models.Model):
+    """
+    后台任务（大批量导入、报表生成），由 api.jobs 的线程池执行，结果文件保存在 JOB_RESULT_DIR 下
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+    STATUS_CHOICES = (
+        (PENDING, '等待中'),
+        (RUNNING, '执行中'),
+        (SUCCEEDED, '已完成'),
+        (FAILED, '失败'),
+        (CANCELLED, '已取消'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=50)  # 任务类型，对应 api.jobs.register_job 注册的处理函数
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='jobs')
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    progress = models.PositiveIntegerField(default=0)  # 已处理的行数
+    cancel_requested = models.BooleanField(default=False)
+    result = models.JSONField(null=True, blank=True)
+    result_file = models.CharField(max_length=255, blank=True)
+    result_filename = models.CharField(max_length=255, blank=True)
+    result_content_type = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.kind} ({self.get_status_display()})"
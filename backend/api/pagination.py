@@ -0,0 +1,134 @@
+# backend/api/pagination.py
+
+"""
+分页
+
+默认仍是页码分页（PageNumberPagination + PAGE_SIZE），前端现有的 count / results 用法不变。
+大列表可以改用游标（keyset）分页：按有索引的键排序，下一页用 WHERE 键 > 上一页最后一条 取出，
+不需要 OFFSET，也不执行 COUNT(*)。选择方式：
+
+    - 请求参数 ?pagination=cursor，或请求中已带 ?cursor=（翻页链接）
+    - 视图设置 pagination_mode = 'cursor'
+
+游标分页的排序取 ?ordering=（OrderingFilter），否则取视图的 cursor_ordering，默认按主键。
+最后一个排序字段不唯一时追加同方向的主键，保证排序唯一，翻页时不会重复或漏掉行。
+需要总数的客户端可以传 ?count=1，返回按查询缓存 APPROX_COUNT_TIMEOUT 秒的近似总数。
+
+查询集带窗口函数注解（如成绩排名）时，游标条件会改变窗口的计算范围，这种情况仍使用页码分页。
+"""
+
+import hashlib
+
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination, CursorPagination, PageNumberPagination
+
+APPROX_COUNT_TIMEOUT = 60
+MAX_CURSOR_PAGE_SIZE = 100
+
+
+def has_window_annotations(queryset):
+    return any(getattr(annotation, 'contains_over_clause', False) for annotation in queryset.query.annotations.values())
+
+
+def unique_ordering(ordering, model):
+    """
+    最后一个排序字段不唯一时追加主键作为决胜字段，方向与之相同
+    """
+    last = ordering[-1]
+    name = last.lstrip('-')
+    if name != 'pk':
+        try:
+            unique = model._meta.get_field(name).unique
+        except FieldDoesNotExist:
+            # 跨关联的字段（a__b）或注解
+            unique = False
+        if not unique:
+            return ordering + ('-pk' if last.startswith('-') else 'pk',)
+    return ordering
+
+
+def approximate_count(queryset):
+    """
+    查询集的总数，按 SQL 缓存 APPROX_COUNT_TIMEOUT 秒
+    """
+    sql, params = queryset.query.sql_with_params()
+    key = 'approx_count:' + hashlib.sha256(repr((sql, params)).encode()).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, APPROX_COUNT_TIMEOUT)
+    return count
+
+
+class KeysetPagination(CursorPagination):
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_CURSOR_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        for backend in getattr(view, 'filter_backends', []):
+            if issubclass(backend, OrderingFilter) and backend.ordering_param in request.query_params:
+                ordering = backend().get_ordering(request, queryset, view)
+                if ordering:
+                    return unique_ordering(tuple(ordering), queryset.model)
+        ordering = getattr(view, 'cursor_ordering', self.ordering)
+        ordering = (ordering,) if isinstance(ordering, str) else tuple(ordering)
+        return unique_ordering(ordering, queryset.model)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = approximate_count(queryset) if request.query_params.get('count') in ('1', 'true') else None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.count is not None:
+            response.data['count'] = self.count
+        return response
+
+
+class AdaptivePagination(BasePagination):
+    """
+    按请求或视图选择页码分页 / 游标分页，其余行为委托给选中的分页器
+    """
+    mode_query_param = 'pagination'
+
+    def __init__(self):
+        self.paginator = PageNumberPagination()
+
+    def use_cursor(self, queryset, request, view):
+        if has_window_annotations(queryset):
+            return False
+        return (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or KeysetPagination.cursor_query_param in request.query_params
+            or getattr(view, 'pagination_mode', None) == 'cursor'
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_cursor(queryset, request, view):
+            self.paginator = KeysetPagination()
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.paginator.get_paginated_response_schema(schema)
+
+    def get_schema_fields(self, view):
+        return self.paginator.get_schema_fields(view)
+
+    def get_schema_operation_parameters(self, view):
+        return self.paginator.get_schema_operation_parameters(view)
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+    def get_results(self, data):
+        return self.paginator.get_results(data)
+
+    @property
+    def display_page_controls(self):
+        return getattr(self.paginator, 'display_page_controls', False)
@@ -2,6 +2,7 @@
 
 from rest_framework import permissions
 from .models import CourseInstance
+from .roles import get_roles
 class IsAdminUser(permissions.BasePermission):
     """
     仅允许管理员用户访问
@@ -15,7 +16,7 @@ class IsTeacherUser(permissions.BasePermission):
     假设教师属于 'Teacher' 组
     """
     def has_permission(self, request, view):
-        return bool(request.user and request.user.groups.filter(name='Teacher').exists())
+        return bool(request.user and get_roles(request.user).is_teacher)
 
 class IsAdminOrTeacher(permissions.BasePermission):
     """
@@ -27,7 +28,7 @@ class IsAdminOrTeacher(permissions.BasePermission):
         return bool(
             user and (
                 user.is_staff or  # 管理员
-                user.groups.filter(name='Teacher').exists()  # 教师
+                get_roles(user).is_teacher  # 教师
             )
         )
 
@@ -37,7 +38,7 @@ class IsStudentUser(permissions.BasePermission):
     假设学生属于 'Student' 组
     """
     def has_permission(self, request, view):
-        return bool(request.user and request.user.groups.filter(name='Student').exists())
+        return bool(request.user and get_roles(request.user).is_student)
 
 class IsTeacherOfCourse(permissions.BasePermission):
     """
@@ -49,7 +50,8 @@ class IsTeacherOfCourse(permissions.BasePermission):
         if not isinstance(obj, CourseInstance):
             return False
         # 检查请求用户是否为该课程实例的教师
-        return obj.teacher == request.user.teacher_profile
+        teacher_id = get_roles(request.user).teacher_id
+        return teacher_id is not None and obj.teacher_id == teacher_id
 
 class IsOwnerStudent(permissions.BasePermission):
     """
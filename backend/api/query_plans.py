@@ -0,0 +1,168 @@
+# backend/api/query_plans.py
+
+"""
+根据序列化器的字段树推导 select_related / prefetch_related 查询计划。
+
+    queryset = plan_queryset(CourseInstance.objects.all(), CourseInstanceSerializer)
+
+嵌套的单值序列化器、StringRelatedField 以及带点号的 source 走 select_related；
+many=True 的嵌套序列化器和关联字段走 Prefetch，并对 Prefetch 的查询集递归规划。
+SerializerMethodField 无法自动推断，序列化器可在 Meta.related_hints 中声明它访问的关联路径。
+这样列表接口的查询次数与返回行数无关。
+"""
+
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, RelatedField
+
+# 模型 __str__ 中访问到的关联路径，StringRelatedField 序列化时会触发这些查询
+STR_RELATED = {
+    'api.Grade': ['department'],
+    'api.CourseInstance': ['course_prototype', 'semester'],
+    'api.SelectionBatch': ['semester'],
+    'api.Teacher': ['user'],
+    'api.Student': ['user'],
+    'api.UserProfile': ['user'],
+    'api.PunishmentRecord': ['student__user'],
+    'api.RewardRecord': ['student__user'],
+    'api.S_Grade': ['student', 'course_instance__course_prototype', 'course_instance__semester'],
+}
+
+
+def _str_related(model):
+    return STR_RELATED.get(model._meta.label, [])
+
+
+def _relation(model, name):
+    """
+    返回 (关联字段, 关联模型, 是否多值)，不是关联字段时返回 None
+    """
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+    if not field.is_relation or field.related_model is None:
+        return None
+    return field, field.related_model, field.many_to_many or field.one_to_many
+
+
+def _add_path(plan, model, path, with_str=True):
+    """
+    把一条关联路径（Django 查询语法）并入计划：全是单值关联时 select_related，
+    否则在第一个多值关联处切成 Prefetch，剩余部分并入 Prefetch 的子计划。
+    with_str 为真时一并加载路径末端模型 __str__ 需要的关联。
+    """
+    select, prefetch = plan
+    parts = path.split('__')
+    current = model
+    for i, name in enumerate(parts):
+        relation = _relation(current, name)
+        if relation is None:
+            # 到达普通字段，之前的部分已是完整的单值关联路径
+            if i:
+                select.add('__'.join(parts[:i]))
+            return
+        _, related_model, many = relation
+        if many:
+            lookup = '__'.join(parts[:i + 1])
+            if i:
+                select.add('__'.join(parts[:i]))
+            entry = prefetch.setdefault(lookup, [related_model, (set(), {}), True])
+            sub_plan = entry[1]
+            # 只需要主键时（如 PrimaryKeyRelatedField(many=True)）Prefetch 只取 id 列
+            entry[2] = entry[2] and not with_str and i + 1 == len(parts)
+            if i + 1 < len(parts):
+                _add_path(sub_plan, related_model, '__'.join(parts[i + 1:]), with_str)
+            elif with_str:
+                for rel_path in _str_related(related_model):
+                    _add_path(sub_plan, related_model, rel_path)
+            return
+        current = related_model
+    select.add(path)
+    if with_str:
+        for rel_path in _str_related(current):
+            _add_path(plan, model, f'{path}__{rel_path}')
+
+
+def _merge_nested(plan, model, prefix, nested_plan):
+    """
+    把嵌套单值序列化器（相对 prefix 的模型）的计划并入父计划
+    """
+    select, prefetch = plan
+    nested_select, nested_prefetch = nested_plan
+    select.add(prefix)
+    for path in nested_select:
+        select.add(f'{prefix}__{path}')
+    for lookup, entry in nested_prefetch.items():
+        prefetch[f'{prefix}__{lookup}'] = entry
+
+
+def _plan_serializer(serializer, model):
+    plan = (set(), {})
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+        attrs = field.source.split('.')
+        path = '__'.join(attrs)
+
+        if isinstance(field, serializers.ListSerializer):
+            relation = _relation(model, attrs[0])
+            if relation is None:
+                continue
+            _, related_model, _ = relation
+            child_plan = _plan_serializer(field.child, related_model)
+            plan[1][path] = [related_model, child_plan, False]
+        elif isinstance(field, serializers.BaseSerializer):
+            relation = _relation(model, attrs[0])
+            if relation is None:
+                continue
+            _, related_model, _ = relation
+            _merge_nested(plan, model, path, _plan_serializer(field, related_model))
+        elif isinstance(field, ManyRelatedField):
+            relation = _relation(model, attrs[0])
+            if relation is None:
+                continue
+            _add_path(plan, model, path, isinstance(field.child_relation, serializers.StringRelatedField))
+        elif isinstance(field, RelatedField):
+            if isinstance(field, serializers.StringRelatedField) or len(attrs) > 1:
+                _add_path(plan, model, path)
+        elif len(attrs) > 1:
+            _add_path(plan, model, path)
+
+    for hint in getattr(getattr(serializer, 'Meta', None), 'related_hints', ()):
+        _add_path(plan, model, hint)
+    return plan
+
+
+@lru_cache(maxsize=None)
+def get_plan(serializer_class, model):
+    """
+    计算并缓存某个序列化器在给定模型上的查询计划：
+    (select 路径集合, {prefetch 路径: [关联模型, 子计划, 是否只取主键]})
+    """
+    return _plan_serializer(serializer_class(), model)
+
+
+def _apply_plan(queryset, plan):
+    select, prefetch = plan
+    if select:
+        queryset = queryset.select_related(*sorted(select))
+    lookups = []
+    for lookup, (related_model, sub_plan, pk_only) in sorted(prefetch.items()):
+        related_queryset = related_model._default_manager.all()
+        if pk_only:
+            related_queryset = related_queryset.only('pk')
+        lookups.append(Prefetch(lookup, queryset=_apply_plan(related_queryset, sub_plan)))
+    if lookups:
+        queryset = queryset.prefetch_related(*lookups)
+    return queryset
+
+
+def plan_queryset(queryset, serializer_class):
+    """
+    按序列化器为查询集加上 select_related / prefetch_related
+    """
+    return _apply_plan(queryset, get_plan(serializer_class, queryset.model))
@@ -0,0 +1,130 @@
+# backend/api/rankings.py
+
+"""
+成绩排名引擎
+
+发布成绩时对整门课程执行一次窗口函数：
+
+    RANK() OVER (PARTITION BY attempt ORDER BY total_score DESC)
+
+结果物化到 GradeRank 表。名次与原先“总分更高的人数 + 1”的定义一致，
+但按考试轮次分别排名，首考和补考的成绩不再混在一起。
+成绩修改、删除或撤回发布时删除该课程的物化排名，下次读取时按需重新计算，
+读取某个学生的排名只是一次按 student 索引的查询。
+物化和删除都先对 CourseInstance 行加 select_for_update 锁：删除要等正在进行的
+物化提交后才执行，物化则在拿到锁之后才读取成绩，因此不会把旧成绩算出的名次
+写在一次失效之后。
+astudent_rankings 是供异步视图使用的版本，只有需要补算排名时才离开事件循环。
+"""
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
+from django.db.models import F, Window
+from django.db.models.functions import Rank
+
+from .models import CourseInstance, GradeRank, S_Grade
+
+RANK_BATCH_SIZE = 1000
+
+
+def ranked_grades(course_instance_id):
+    """
+    返回课程所有成绩的 (成绩 ID, 学生 ID, 考试轮次, 名次)，一次查询完成
+    """
+    return S_Grade.objects.filter(course_instance_id=course_instance_id).annotate(
+        rank=Window(
+            expression=Rank(),
+            partition_by=[F('attempt')],
+            order_by=F('total_score').desc()
+        )
+    ).values_list('id', 'student_id', 'attempt', 'rank')
+
+
+def _lock_course(course_instance_id):
+    # 物化与失效在同一课程上串行执行
+    list(CourseInstance.objects.select_for_update().filter(id=course_instance_id).values_list('id', flat=True))
+
+
+def materialize_course_ranks(course_instance_id):
+    """
+    重新计算并物化一门课程的排名，返回 {成绩 ID: 名次}
+    """
+    ranks = []
+    try:
+        with transaction.atomic():
+            _lock_course(course_instance_id)
+            ranks = [
+                GradeRank(
+                    grade_id=grade_id,
+                    course_instance_id=course_instance_id,
+                    student_id=student_id,
+                    attempt=attempt,
+                    rank=rank
+                )
+                for grade_id, student_id, attempt, rank in ranked_grades(course_instance_id)
+            ]
+            GradeRank.objects.filter(course_instance_id=course_instance_id).delete()
+            GradeRank.objects.bulk_create(ranks, batch_size=RANK_BATCH_SIZE)
+    except IntegrityError:
+        # 并发请求已经物化了同一门课程，结果相同
+        pass
+    return {entry.grade_id: entry.rank for entry in ranks}
+
+
+def invalidate_course_ranks(course_instance_id):
+    """
+    删除课程的物化排名；正在物化的请求提交后才删除，它写入的名次不会残留
+    """
+    with transaction.atomic():
+        _lock_course(course_instance_id)
+        GradeRank.objects.filter(course_instance_id=course_instance_id).delete()
+
+
+def _published_grades(user):
+    return S_Grade.objects.filter(
+        student=user,
+        course_instance__is_grades_published=True
+    ).select_related(
+        'course_instance__course_prototype',
+        'course_instance__semester',
+        'rank_entry'
+    ).order_by('course_instance__semester__start_date')
+
+
+def _missing_ranks(grades):
+    return {grade.course_instance_id for grade in grades if not hasattr(grade, 'rank_entry')}
+
+
+def _ranking_rows(grades, ranks):
+    rankings = []
+    for grade in grades:
+        course_instance = grade.course_instance
+        rankings.append({
+            'course_instance': f"{course_instance.course_prototype.name} - {course_instance.semester.name}",
+            'attempt': grade.attempt,
+            'daily_score': grade.daily_score,
+            'final_score': grade.final_score,
+            'total_score': grade.total_score,
+            'rank': grade.rank_entry.rank if hasattr(grade, 'rank_entry') else ranks.get(grade.id),
+        })
+    return rankings
+
+
+def student_rankings(user):
+    """
+    学生所有已发布成绩及其在课程内（同一考试轮次）的名次，
+    物化排名缺失的课程在这里补算
+    """
+    grades = list(_published_grades(user))
+    ranks = {}
+    for course_instance_id in _missing_ranks(grades):
+        ranks.update(materialize_course_ranks(course_instance_id))
+    return _ranking_rows(grades, ranks)
+
+
+async def astudent_rankings(user):
+    grades = [grade async for grade in _published_grades(user)]
+    ranks = {}
+    for course_instance_id in _missing_ranks(grades):
+        ranks.update(await sync_to_async(materialize_course_ranks)(course_instance_id))
+    return _ranking_rows(grades, ranks)
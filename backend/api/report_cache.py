@@ -0,0 +1,179 @@
+# backend/api/report_cache.py
+
+"""
+报表磁盘缓存
+
+成绩单和教师课程报表按 (报表类型, 对象 ID, 数据版本号) 缓存生成好的 PDF，文件名取键的 SHA-256。
+数据变化时只需使对应版本号失效，旧文件不再被命中，最终被 LRU 淘汰：
+    - 学生成绩单依赖 report:student:<学生用户 ID>
+    - 教师课程报表依赖 report:course:<课程实例 ID>
+命中时更新文件的修改时间，写入新文件后按修改时间从旧到新删除，直到总大小不超过 REPORT_CACHE_MAX_BYTES。
+命中 / 未命中次数记在 Django 缓存中，多个进程共享。
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .caching import get_version, reset_versions
+from .models import S_Grade
+
+logger = logging.getLogger(__name__)
+
+HITS_KEY = 'report_cache:hits'
+MISSES_KEY = 'report_cache:misses'
+
+
+def student_version_name(student_id):
+    return f'report:student:{student_id}'
+
+
+def course_version_name(course_id):
+    return f'report:course:{course_id}'
+
+
+def invalidate_reports(student_ids=(), course_ids=()):
+    """
+    使相关学生成绩单和课程报表的缓存失效。
+    在事务提交后才使版本号失效，避免其他请求在提交前按新版本号缓存到旧数据
+    """
+    names = [student_version_name(pk) for pk in student_ids] + [course_version_name(pk) for pk in course_ids]
+    if names:
+        transaction.on_commit(lambda: reset_versions(names))
+
+
+def invalidate_course_reports(course_id):
+    """
+    课程信息或成绩整体变化：课程报表和该课程所有学生的成绩单都失效
+    """
+    student_ids = set(S_Grade.objects.filter(course_instance_id=course_id).values_list('student_id', flat=True))
+    invalidate_reports(student_ids=student_ids, course_ids=[course_id])
+
+
+def invalidate_courses_reports(course_instances):
+    """
+    多门课程共用的信息（课程原型名称、学期名称）变化：这些课程的报表和其学生的成绩单都失效
+    """
+    course_ids = list(course_instances.values_list('id', flat=True))
+    student_ids = set(S_Grade.objects.filter(course_instance_id__in=course_ids).values_list('student_id', flat=True))
+    invalidate_reports(student_ids=student_ids, course_ids=course_ids)
+
+
+def invalidate_student_reports(student_id):
+    """
+    学生个人信息变化：该学生的成绩单和其有成绩的课程报表都失效
+    """
+    course_ids = set(S_Grade.objects.filter(student_id=student_id).values_list('course_instance_id', flat=True))
+    invalidate_reports(student_ids=[student_id], course_ids=course_ids)
+
+
+def _count(key):
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def _path(key):
+    return os.path.join(settings.REPORT_CACHE_DIR, hashlib.sha256(key.encode()).hexdigest() + '.pdf')
+
+
+def _evict(keep):
+    """
+    按修改时间淘汰最久未使用的文件，直到总大小不超过上限；刚写入的文件不淘汰
+    """
+    entries = []
+    total = 0
+    with os.scandir(settings.REPORT_CACHE_DIR) as it:
+        for entry in it:
+            if not entry.name.endswith('.pdf'):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+    if total <= settings.REPORT_CACHE_MAX_BYTES:
+        return
+    for _, size, path in sorted(entries):
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        if total <= settings.REPORT_CACHE_MAX_BYTES:
+            break
+
+
+def open_report(report_type, subject, version_name, render):
+    """
+    返回已打开的缓存报表文件（二进制只读），未命中时先调用 render(output) 生成并写入缓存
+    """
+    key = f'{report_type}:{subject}:{get_version(version_name)}'
+    path = _path(key)
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        pass
+    else:
+        _count(HITS_KEY)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # 打开之后被其他进程淘汰，已打开的文件仍可读
+            pass
+        return f
+
+    _count(MISSES_KEY)
+    os.makedirs(settings.REPORT_CACHE_DIR, exist_ok=True)
+    # 先写临时文件再原子替换，并发请求不会读到写了一半的文件
+    fd, tmp_path = tempfile.mkstemp(dir=settings.REPORT_CACHE_DIR, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as output:
+            render(output)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    f = open(path, 'rb')
+    try:
+        _evict(keep=path)
+    except OSError:
+        logger.exception('报表缓存淘汰失败')
+    return f
+
+
+def cache_stats():
+    """
+    命中率统计和当前缓存占用
+    """
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    files = 0
+    size = 0
+    if os.path.isdir(settings.REPORT_CACHE_DIR):
+        with os.scandir(settings.REPORT_CACHE_DIR) as it:
+            for entry in it:
+                if entry.name.endswith('.pdf'):
+                    files += 1
+                    try:
+                        size += entry.stat().st_size
+                    except FileNotFoundError:
+                        files -= 1
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / (hits + misses) if hits + misses else None,
+        'files': files,
+        'size_bytes': size,
+        'max_bytes': settings.REPORT_CACHE_MAX_BYTES,
+    }
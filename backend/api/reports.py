@@ -0,0 +1,268 @@
+# backend/api/reports.py
+
+"""
+PDF 报表
+
+build_report 负责权限和参数校验，返回 (文件名, render)，render(output) 把 PDF 写入任意文件对象。
+同步请求时先写入临时文件再以 FileResponse 分块流式返回，后台任务中直接写入结果文件。
+学生成绩单和教师课程报表经 report_cache 缓存，数据未变化时直接返回已生成的文件。
+
+全量报表按 values_list(...).iterator(chunk_size) 分块读取所需的列，不构造模型实例、不缓存整个查询集，
+关联字段在同一条 JOIN 查询中取出，PostgreSQL 上使用服务端游标（见 _stream_rows）。reportlab 只在 save() 时一次性输出整个文档，
+无法按页向客户端推送，因此内存中只保留压缩后的页面内容，响应体本身不再驻留内存。
+"""
+
+import os
+import shutil
+import tempfile
+
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from reportlab.rl_config import TTFSearchPath
+from django.db import connections, transaction
+from django.http import FileResponse
+from rest_framework import status
+
+from .jobs import register_job
+from .models import CourseInstance, S_Grade, Student, Teacher
+from .report_cache import course_version_name, open_report, student_version_name
+from .roles import get_roles
+
+# 全量报表每次从数据库取出的行数
+REPORT_CHUNK_SIZE = 2000
+
+# 注册中文字体
+font_path = os.path.join(os.path.dirname(__file__), 'fonts', 'SimSun.ttf')  # 确保字体文件路径正确
+pdfmetrics.registerFont(TTFont('SimSun', font_path))
+TTFSearchPath.append(os.path.join(os.path.dirname(__file__), 'fonts'))
+
+
+class ReportError(Exception):
+    """
+    报表无法生成，detail 和 status_code 直接用于构造 Response
+    """
+
+    def __init__(self, detail, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+def _draw_lines(output, title, lines, title_y=800, first_y=760):
+    """
+    逐行绘制，满一页换页并重绘标题
+    """
+    p = canvas.Canvas(output, pageCompression=1)
+    p.setFont("SimSun", 16)
+    p.drawString(100, title_y, title)
+
+    y = first_y
+    p.setFont("SimSun", 12)
+    for line in lines:
+        p.drawString(100, y, line)
+        y -= 20
+        if y < 50:
+            p.showPage()
+            # 重新绘制标题
+            p.setFont("SimSun", 16)
+            p.drawString(100, title_y, title)
+            y = first_y
+            p.setFont("SimSun", 12)
+
+    p.showPage()
+    p.save()
+
+
+def _cached(report_type, subject, version_name, render):
+    """
+    用报表缓存包装 render；report_response 通过 render.open() 直接流式返回缓存文件
+    """
+    def open_cached():
+        return open_report(report_type, subject, version_name, render)
+
+    def cached_render(output):
+        with open_cached() as f:
+            shutil.copyfileobj(f, output)
+
+    cached_render.open = open_cached
+    return cached_render
+
+
+def my_transcript(user):
+    """
+    学生生成自己的成绩单
+    """
+    # 查找该 user 对应的 Student
+    try:
+        student = user.student_profile
+    except Student.DoesNotExist:
+        raise ReportError('未找到该学生', status.HTTP_404_NOT_FOUND)
+
+    def render(output):
+        # 获取此学生所有已发布的成绩
+        grades = S_Grade.objects.filter(
+            student=user,
+            course_instance__is_grades_published=True
+        ).select_related('course_instance__course_prototype', 'course_instance__semester')
+        _draw_lines(output, f"{student.user.get_full_name()} 的成绩单", (
+            f"课程: {g.course_instance.course_prototype.name}, 学期: {g.course_instance.semester.name}, 平时分: {g.daily_score}, 期末分: {g.final_score}, 总分: {g.total_score}"
+            for g in grades
+        ))
+
+    return f"{user.username}_transcript.pdf", _cached('my_transcript', user.id, student_version_name(user.id), render)
+
+
+def teacher_course_report(user, course_id):
+    """
+    教师生成所授课程报表（如学生名单+成绩信息 等）
+    """
+    # 获取该 user 对应的 Teacher
+    try:
+        teacher = user.teacher_profile
+    except Teacher.DoesNotExist:
+        raise ReportError('未找到该教师', status.HTTP_404_NOT_FOUND)
+
+    # 拿到指定课程
+    try:
+        course = CourseInstance.objects.select_related('course_prototype', 'semester').get(id=course_id, teacher=teacher)
+    except CourseInstance.DoesNotExist:
+        raise ReportError('您没有权限或该课程不存在', status.HTTP_404_NOT_FOUND)
+
+    def render(output):
+        # 取出此课程所有已选学生 + 成绩
+        grades = S_Grade.objects.filter(course_instance=course).select_related('student')
+        _draw_lines(output, f"课程报表: {course.course_prototype.name}({course.semester.name})", (
+            f"学生: {g.student.get_full_name() if g.student.first_name else g.student.username}, 平时分: {g.daily_score}, 期末分: {g.final_score}, 总分: {g.total_score}"
+            for g in grades
+        ))
+
+    return f"{course.course_prototype.name}_report.pdf", _cached(
+        'teacher_course', course.id, course_version_name(course.id), render
+    )
+
+
+def _stream_rows(queryset):
+    """
+    按 REPORT_CHUNK_SIZE 分块读取。PostgreSQL 上 iterator() 使用服务端游标，事务外的游标需要 WITH HOLD，
+    服务器会在提交时先把整个结果集物化；这里在事务中逐块读取，游标随事务结束关闭
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql' or connection.settings_dict['DISABLE_SERVER_SIDE_CURSORS']:
+        yield from queryset.iterator(chunk_size=REPORT_CHUNK_SIZE)
+        return
+    with transaction.atomic(using=queryset.db):
+        yield from queryset.iterator(chunk_size=REPORT_CHUNK_SIZE)
+
+
+def _full_name(first_name, last_name):
+    # 与 User.get_full_name() 相同
+    return f"{first_name} {last_name}".strip()
+
+
+def student_report():
+    genders = dict(Student.GENDER_CHOICES)
+
+    def render(output):
+        students = _stream_rows(Student.objects.order_by('id').values_list(
+            'user__first_name', 'user__last_name', 'department__name', 'age', 'gender', 'id_number'
+        ))
+        _draw_lines(output, "学生信息报表", (
+            f"姓名: {_full_name(first_name, last_name)}, 单位: {department or 'N/A'}, 年龄: {age}, 性别: {genders.get(gender, gender)}, 身份证号码: {id_number}"
+            for first_name, last_name, department, age, gender, id_number in students
+        ), first_y=750)
+
+    return 'student_report.pdf', render
+
+
+def grades_report():
+    def render(output):
+        grades = _stream_rows(S_Grade.objects.filter(course_instance__is_finalized=True).order_by('id').values_list(
+            'student__first_name', 'student__last_name', 'course_instance__course_prototype__name',
+            'daily_score', 'final_score', 'total_score'
+        ))
+        _draw_lines(output, "成绩报表", (
+            f"学生: {_full_name(first_name, last_name)}, 课程: {course_name}, 平时分: {daily_score}, 期末分: {final_score}, 总分: {total_score}"
+            for first_name, last_name, course_name, daily_score, final_score, total_score in grades
+        ), first_y=750)
+
+    return 'grades_report.pdf', render
+
+
+def courses_report():
+    def render(output):
+        # 已选人数直接取 enrolled_count 计数器，不再逐门课程 COUNT
+        courses = _stream_rows(CourseInstance.objects.order_by('id').values_list(
+            'course_prototype__name', 'semester__name', 'teacher_id',
+            'teacher__user__first_name', 'teacher__user__last_name',
+            'enrolled_count', 'capacity', 'is_finalized'
+        ))
+        _draw_lines(output, "课程报表", (
+            f"课程: {name}, 学期: {semester}, 教师: {_full_name(first_name, last_name) if teacher_id else 'N/A'}, 已选人数: {enrolled_count}/{capacity}, 是否最终化: {'是' if is_finalized else '否'}"
+            for name, semester, teacher_id, first_name, last_name, enrolled_count, capacity, is_finalized in courses
+        ), first_y=750)
+
+    return 'courses_report.pdf', render
+
+
+def report_response(filename, render):
+    """
+    把报表写入临时文件（或直接取缓存文件）后以 FileResponse 分块流式返回
+    """
+    if hasattr(render, 'open'):
+        return FileResponse(render.open(), as_attachment=True, filename=filename, content_type='application/pdf')
+    output = tempfile.TemporaryFile()
+    try:
+        render(output)
+    except BaseException:
+        output.close()
+        raise
+    output.seek(0)
+    return FileResponse(output, as_attachment=True, filename=filename, content_type='application/pdf')
+
+
+def build_report(user, report_type, course_id=None):
+    """
+    校验报表类型和权限，返回 (文件名, render)
+    """
+    if not report_type:
+        raise ReportError('请指定报表类型')
+
+    if report_type == 'my_transcript':
+        # 只允许学生
+        if not get_roles(user).is_student:
+            raise ReportError('只有学生可以生成个人成绩单报表', status.HTTP_403_FORBIDDEN)
+        return my_transcript(user)
+
+    elif report_type == 'teacher_course':
+        # 只允许教师
+        if not get_roles(user).is_teacher:
+            raise ReportError('只有教师可以生成所授课程报表', status.HTTP_403_FORBIDDEN)
+        # 前端传课程ID进来
+        if not course_id:
+            raise ReportError('缺少 course_id 参数')
+        return teacher_course_report(user, course_id)
+
+    elif report_type == 'students':
+        if not user.is_staff:
+            raise ReportError('只有管理员可以生成学生信息报表', status.HTTP_403_FORBIDDEN)
+        return student_report()
+
+    elif report_type == 'grades':
+        if not user.is_staff:
+            raise ReportError('只有管理员可以生成全部成绩报表', status.HTTP_403_FORBIDDEN)
+        return grades_report()
+
+    elif report_type == 'courses':
+        if not user.is_staff:
+            raise ReportError('只有管理员可以生成课程报表', status.HTTP_403_FORBIDDEN)
+        return courses_report()
+
+    raise ReportError(f'未知的报表类型: {report_type}')
+
+
+@register_job('report')
+def run_report_job(context, report_type, course_id=None):
+    filename, render = build_report(context.owner, report_type, course_id)
+    with context.open_result(filename, 'application/pdf') as output:
+        render(output)
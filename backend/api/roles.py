@@ -0,0 +1,110 @@
+# backend/api/roles.py
+
+"""
+请求级角色解析
+
+权限类和视图原先各自执行 user.groups.filter(name=...).exists() 和 user.teacher_profile，
+一个请求里同样的查询会重复 3~6 次。get_roles(user) 用一条查询取出用户所在的组、
+教师 / 学生档案 ID、学生班级和所属院系，结果挂在 user 对象上：
+DRF 在一个请求内复用同一个 request.user，所以同一请求中只查询一次。
+"""
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+
+TEACHER_GROUP = 'Teacher'
+STUDENT_GROUP = 'Student'
+
+_ROLES_ATTR = '_roles'
+
+
+class Roles:
+    """
+    当前用户的角色和档案 ID
+    """
+
+    __slots__ = (
+        'user_id', 'is_staff', 'groups', 'teacher_id', 'teacher_department_ids',
+        'student_id', 'student_class_id', 'student_department_id',
+    )
+
+    def __init__(self, user_id=None, is_staff=False, groups=(), teacher_id=None, teacher_department_ids=(),
+                 student_id=None, student_class_id=None, student_department_id=None):
+        self.user_id = user_id
+        self.is_staff = is_staff
+        self.groups = frozenset(groups)
+        self.teacher_id = teacher_id
+        self.teacher_department_ids = frozenset(teacher_department_ids)
+        self.student_id = student_id
+        self.student_class_id = student_class_id
+        self.student_department_id = student_department_id
+
+    @property
+    def is_teacher(self):
+        return TEACHER_GROUP in self.groups
+
+    @property
+    def is_student(self):
+        return STUDENT_GROUP in self.groups
+
+
+ANONYMOUS = Roles()
+
+
+def load_roles(user):
+    """
+    一条查询加载用户的角色；组和教师院系都是一对多，结果行数为二者之积，通常只有一两行
+    """
+    rows = User.objects.filter(id=user.pk).values_list(
+        'groups__name',
+        'teacher_profile__id', 'teacher_profile__departments__id',
+        'student_profile__id', 'student_profile__student_class_id', 'student_profile__department_id',
+    )
+    groups = set()
+    department_ids = set()
+    teacher_id = student_id = student_class_id = student_department_id = None
+    for group, teacher_id, department_id, student_id, student_class_id, student_department_id in rows:
+        if group is not None:
+            groups.add(group)
+        if department_id is not None:
+            department_ids.add(department_id)
+    return Roles(
+        user_id=user.pk,
+        is_staff=user.is_staff,
+        groups=groups,
+        teacher_id=teacher_id,
+        teacher_department_ids=department_ids,
+        student_id=student_id,
+        student_class_id=student_class_id,
+        student_department_id=student_department_id,
+    )
+
+
+def get_roles(user):
+    """
+    返回用户的角色，同一个 user 对象只加载一次
+    """
+    if user is None or not user.is_authenticated:
+        return ANONYMOUS
+    roles = getattr(user, _ROLES_ATTR, None)
+    if roles is None:
+        roles = load_roles(user)
+        setattr(user, _ROLES_ATTR, roles)
+    return roles
+
+
+async def aget_roles(user):
+    """
+    异步视图中使用：角色已挂在用户上（来自令牌声明）时不离开事件循环
+    """
+    roles = getattr(user, _ROLES_ATTR, None)
+    if roles is not None:
+        return roles
+    return await sync_to_async(get_roles)(user)
+
+
+def attach_roles(user, roles):
+    """
+    直接挂上已知的角色（例如从访问令牌的声明中还原），之后 get_roles 不再查询
+    """
+    setattr(user, _ROLES_ATTR, roles)
@@ -0,0 +1,140 @@
+# backend/api/schedule_index.py
+
+"""
+课程时间占用位图
+
+每门课程实例的所有排课按 周 × 星期 × 节次 展开成一个整数位图，保存在
+CourseInstance.schedule_bitmap（十六进制字符串）中，排课变化时重新物化。
+第 week 周星期 day 第 period 节对应的位序号为：
+
+    (week - 1) * 每周槽位数 + 星期序号 * 每天节数 + (period - 1)
+
+时间冲突检查即候选课程位图与学生已选课程位图之并做按位与，
+与 CourseSchedule.is_active_in_week 的判断完全一致（起止周、单双周、例外周）。
+"""
+
+from collections import defaultdict
+
+from django.core.cache import cache
+
+from .caching import bump_version, get_version
+from .models import CourseInstance, CourseSchedule
+
+DAYS = [day for day, _ in CourseSchedule.DAY_PERIOD_CHOICES]
+PERIODS = [period for period, _ in CourseSchedule.PERIOD_CHOICES]
+SLOTS_PER_WEEK = len(DAYS) * len(PERIODS)
+
+UNION_CACHE_TIMEOUT = 60 * 60
+
+
+def slot_index(week, day, period):
+    """
+    返回某周某天某节对应的位序号
+    """
+    return (week - 1) * SLOTS_PER_WEEK + DAYS.index(day) * len(PERIODS) + (period - 1)
+
+
+def schedule_bits(schedule, total_weeks):
+    """
+    单条排课在 1..total_weeks 周内的占用位图
+    """
+    if schedule.day not in DAYS or schedule.period not in PERIODS:
+        return 0
+    bits = 0
+    for week in range(max(schedule.start_week, 1), min(schedule.end_week, total_weeks) + 1):
+        if schedule.is_active_in_week(week):
+            bits |= 1 << slot_index(week, schedule.day, schedule.period)
+    return bits
+
+
+def build_bitmap(schedules, total_weeks):
+    bits = 0
+    for schedule in schedules:
+        bits |= schedule_bits(schedule, total_weeks)
+    return bits
+
+
+def encode(bits):
+    return format(bits, 'x') if bits else ''
+
+
+def decode(value):
+    return int(value, 16) if value else 0
+
+
+def refresh_course_bitmap(course_instance_id):
+    """
+    重新物化一门课程实例的占用位图，位图变化时使该学期的位图之并缓存失效，返回位图是否变化
+    """
+    try:
+        course_instance = CourseInstance.objects.select_related('semester').get(id=course_instance_id)
+    except CourseInstance.DoesNotExist:
+        return False
+    bits = build_bitmap(course_instance.schedules.all(), course_instance.semester.total_weeks)
+    value = encode(bits)
+    if value == course_instance.schedule_bitmap:
+        return False
+    CourseInstance.objects.filter(id=course_instance_id).update(schedule_bitmap=value)
+    invalidate_semester_unions(course_instance.semester_id)
+    return True
+
+
+def refresh_semester_bitmaps(semester):
+    """
+    重新物化一个学期所有课程实例的占用位图（学期总周数变化时）
+    """
+    bitmaps = defaultdict(int)
+    for schedule in CourseSchedule.objects.filter(course_instance__semester=semester):
+        bitmaps[schedule.course_instance_id] |= schedule_bits(schedule, semester.total_weeks)
+    for course_id, current in CourseInstance.objects.filter(semester=semester).values_list('id', 'schedule_bitmap'):
+        value = encode(bitmaps[course_id])
+        if value != current:
+            CourseInstance.objects.filter(id=course_id).update(schedule_bitmap=value)
+    invalidate_semester_unions(semester.id)
+
+
+def semester_schedule_version(semester_id):
+    """
+    学期排课数据的版本号：课程排课、最终化状态、选课关系变化时递增
+    """
+    return get_version(f'schedule_union:{semester_id}')
+
+
+def _union_key(user_id, semester_id):
+    return f'schedule_union:{semester_id}:{semester_schedule_version(semester_id)}:{user_id}'
+
+
+def student_union_bitmap(user, semester):
+    """
+    学生在该学期已选且未最终化课程的占用位图之并，带缓存
+    """
+    key = _union_key(user.id, semester.id)
+    bits = cache.get(key)
+    if bits is None:
+        bits = 0
+        for value in CourseInstance.objects.filter(
+            selected_students=user,
+            is_finalized=False,
+            semester=semester
+        ).values_list('schedule_bitmap', flat=True):
+            bits |= decode(value)
+        cache.set(key, bits, UNION_CACHE_TIMEOUT)
+    return bits
+
+
+def invalidate_student_union(user_id, semester_id):
+    cache.delete(_union_key(user_id, semester_id))
+
+
+def invalidate_semester_unions(semester_id):
+    """
+    使某学期所有学生的位图之并失效（课程排课、最终化状态等变化时）
+    """
+    bump_version(f'schedule_union:{semester_id}')
+
+
+def has_schedule_conflict(user, course_instance, semester):
+    """
+    检查课程时间是否与该学生本学期已选且未最终化的课程冲突
+    """
+    return bool(decode(course_instance.schedule_bitmap) & student_union_bitmap(user, semester))
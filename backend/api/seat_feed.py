@@ -0,0 +1,228 @@
+# backend/api/seat_feed.py
+
+"""
+选课余量实时推送（Server-Sent Events）
+
+选课引擎和 selected_students 的 m2m_changed 同步逻辑在座位数变化后发出 seats_changed 信号，
+这里把变化按选课批次广播给订阅者。每个订阅者只保留每门课程最新的剩余座位数，
+一个合并窗口内的多次变化只推送一次。
+
+广播器可通过 settings.SEAT_FEED_BROKER 替换（如基于 Redis 的实现），
+默认的 InProcessSeatBroker 只在当前进程内广播，便于开发和测试。
+
+持续推送需要通过 ASGI 部署（backend/asgi.py）：异步迭代器不占用线程，一个连接可以保持
+MAX_STREAM_SECONDS。WSGI 下每个连接都要占住一个工作线程，因此退化为长轮询：推送快照后最多
+等待 LONG_POLL_SECONDS 内的一批变化就结束响应，EventSource 按 retry 字段自动重连并重新拿到快照。
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils.module_loading import import_string
+from rest_framework.renderers import BaseRenderer
+
+from .models import CourseInstance
+
+# 一次推送前等待更多变化的时间，把抢课高峰的大量变化合并成少量事件
+COALESCE_SECONDS = 0.5
+# 没有变化时发送心跳注释，防止代理断开空闲连接
+HEARTBEAT_SECONDS = 15
+# 单个连接的最长时间，到期后由 EventSource 自动重连
+MAX_STREAM_SECONDS = 5 * 60
+# WSGI 下一次长轮询等待变化的最长时间，以及结束后 EventSource 的重连间隔（毫秒）
+LONG_POLL_SECONDS = 5
+LONG_POLL_RETRY_MS = 1000
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    让 DRF 的内容协商接受 Accept: text/event-stream，实际响应由 StreamingHttpResponse 输出
+    """
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data).encode() if data is not None else b''
+
+
+class Subscription:
+    """
+    一个订阅者的待推送变化 {课程实例 ID: 剩余座位数}，同时支持线程和 asyncio 等待
+    """
+
+    def __init__(self, selection_batch_id):
+        self.selection_batch_id = selection_batch_id
+        self._condition = threading.Condition()
+        self._pending = {}
+        self._loop = None
+        self._event = None
+
+    def push(self, course_id, seats_left):
+        with self._condition:
+            self._pending[course_id] = seats_left
+            self._condition.notify_all()
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._event.set)
+
+    def _take(self):
+        with self._condition:
+            pending, self._pending = self._pending, {}
+            if self._event is not None:
+                self._event.clear()
+            return pending
+
+    def wait(self, timeout):
+        """
+        阻塞等待变化，超时返回空字典
+        """
+        with self._condition:
+            if not self._pending:
+                self._condition.wait(timeout)
+        if self._pending:
+            time.sleep(COALESCE_SECONDS)
+        return self._take()
+
+    async def await_changes(self, timeout):
+        """
+        在事件循环中等待变化，超时返回空字典
+        """
+        if self._loop is None:
+            with self._condition:
+                self._event = asyncio.Event()
+                self._loop = asyncio.get_running_loop()
+                if self._pending:
+                    self._event.set()
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return {}
+        await asyncio.sleep(COALESCE_SECONDS)
+        return self._take()
+
+
+class InProcessSeatBroker:
+    """
+    进程内广播器
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+
+    def has_subscribers(self):
+        return bool(self._subscriptions)
+
+    def subscribe(self, selection_batch_id):
+        subscription = Subscription(selection_batch_id)
+        with self._lock:
+            self._subscriptions.setdefault(selection_batch_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.selection_batch_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.selection_batch_id, None)
+
+    def publish(self, selection_batch_id, course_id, seats_left):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(selection_batch_id, ()))
+        for subscription in subscriptions:
+            subscription.push(course_id, seats_left)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                broker_class = getattr(settings, 'SEAT_FEED_BROKER', 'api.seat_feed.InProcessSeatBroker')
+                _broker = import_string(broker_class)()
+    return _broker
+
+
+def publish_seat_changes(course_ids):
+    """
+    在当前事务提交后读取课程最新的剩余座位数并广播，回滚的选课不会推送；没有订阅者时不产生查询
+    """
+    if get_broker().has_subscribers():
+        course_ids = list(course_ids)
+        transaction.on_commit(lambda: _publish(course_ids))
+
+
+def _publish(course_ids):
+    broker = get_broker()
+    if not broker.has_subscribers():
+        return
+    rows = CourseInstance.objects.filter(
+        id__in=course_ids,
+        selection_batch__isnull=False
+    ).values_list('id', 'selection_batch_id', 'capacity', 'enrolled_count')
+    for course_id, selection_batch_id, capacity, enrolled_count in rows:
+        broker.publish(selection_batch_id, course_id, max(capacity - enrolled_count, 0))
+
+
+def seat_snapshot(selection_batch_id):
+    return {
+        course_id: max(capacity - enrolled_count, 0)
+        for course_id, capacity, enrolled_count in CourseInstance.objects.filter(
+            selection_batch_id=selection_batch_id
+        ).values_list('id', 'capacity', 'enrolled_count')
+    }
+
+
+def _event(name, data):
+    return f'event: {name}\ndata: {json.dumps(data)}\n\n'
+
+
+def _sync_stream(subscription, snapshot):
+    # 长轮询：工作线程最多被占用 LONG_POLL_SECONDS
+    broker = get_broker()
+    try:
+        yield f'retry: {LONG_POLL_RETRY_MS}\n' + _event('snapshot', snapshot)
+        changes = subscription.wait(LONG_POLL_SECONDS)
+        if changes:
+            yield _event('seats', changes)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+async def _async_stream(subscription, snapshot):
+    broker = get_broker()
+    try:
+        yield _event('snapshot', snapshot)
+        deadline = time.monotonic() + MAX_STREAM_SECONDS
+        while time.monotonic() < deadline:
+            changes = await subscription.await_changes(HEARTBEAT_SECONDS)
+            yield _event('seats', changes) if changes else ': keepalive\n\n'
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def seat_stream_response(request, selection_batch_id):
+    """
+    构造推送某选课批次余量变化的 text/event-stream 响应。
+    通过 backend/asgi.py 部署时使用异步迭代器持续推送，不为每个连接占用一个线程；WSGI 下为长轮询。
+    """
+    subscription = get_broker().subscribe(selection_batch_id)
+    snapshot = seat_snapshot(selection_batch_id)
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        stream = _async_stream(subscription, snapshot)
+    else:
+        stream = _sync_stream(subscription, snapshot)
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -4,10 +4,14 @@ from rest_framework import serializers
 from django.contrib.auth.models import User
 from .models import (
     Department, Grade, Class, CoursePrototype, CourseInstance, Student,
-    CourseSchedule, Teacher, S_Grade, Semester, PunishmentRecord, RewardRecord, SelectionBatch
+    CourseSchedule, Teacher, S_Grade, Semester, PunishmentRecord, RewardRecord, SelectionBatch, Job
 
 )
+from .roles import get_roles
 from django.db import transaction
+from rest_framework.reverse import reverse
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from .tokens import RoleRefreshToken
 #from django.contrib.auth import get_user_model
 
 #User = get_user_model()
@@ -68,6 +72,8 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'groups', 'teacher_id', 'student_id']
         read_only_fields = ['id', 'username', 'groups', 'teacher_id', 'student_id']
+        # get_teacher_id / get_student_id 访问的关联，供 api.query_plans 预加载
+        related_hints = ['teacher_profile', 'student_profile']
 
     def update(self, instance, validated_data):
         # 更新用户的基本信息
@@ -175,6 +181,38 @@ class CourseInstanceSerializer(serializers.ModelSerializer):
         model = CourseInstance
         fields = '__all__'
 
+class CourseInstanceCatalogSerializer(serializers.ModelSerializer):
+    """
+    选课页面使用的精简课程表示（?view=catalog）
+    只返回剩余座位数而不是已选学生 ID 列表，排课压缩为
+    [day, period, start_week, end_week, frequency, exceptions] 的扁平数组
+    """
+    name = serializers.CharField(source='course_prototype.name', read_only=True)
+    credits = serializers.IntegerField(source='course_prototype.credits', read_only=True)
+    teacher_name = serializers.SerializerMethodField()
+    seats_left = serializers.SerializerMethodField()
+    slots = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CourseInstance
+        fields = [
+            'id', 'name', 'credits', 'teacher_name', 'location',
+            'capacity', 'enrolled_count', 'seats_left', 'slots', 'selection_deadline',
+        ]
+        related_hints = ['teacher__user', 'schedules']
+
+    def get_teacher_name(self, obj):
+        return obj.teacher.user.get_full_name() if obj.teacher else None
+
+    def get_seats_left(self, obj):
+        return max(obj.capacity - obj.enrolled_count, 0)
+
+    def get_slots(self, obj):
+        return [
+            [s.day, s.period, s.start_week, s.end_week, s.frequency, s.exceptions]
+            for s in obj.schedules.all()
+        ]
+
 class CourseInstanceCreateUpdateSerializer(serializers.ModelSerializer):
     schedules = CourseScheduleSerializer(many=True)
     selected_students = serializers.PrimaryKeyRelatedField(
@@ -303,6 +341,7 @@ class S_GradeSerializer(serializers.ModelSerializer):
             'attempt', 'is_published', 'ranking', 'semester',
         ]
         read_only_fields = ['id', 'student', 'course_instance', 'total_score']
+        related_hints = ['course_instance']
 
     def validate(self, data):
         # 在这里，你可以做一下限制：只能修改你自己授课的课程，等等
@@ -310,10 +349,11 @@ class S_GradeSerializer(serializers.ModelSerializer):
         course_instance = data.get('course_instance')
 
         # 判断是不是教师，并且是不是此课程的老师
-        if not hasattr(user, 'teacher_profile'):
+        teacher_id = get_roles(user).teacher_id
+        if teacher_id is None:
             raise serializers.ValidationError("用户没有教师配置文件。")
 
-        if course_instance and course_instance.teacher != user.teacher_profile:
+        if course_instance and course_instance.teacher_id != teacher_id:
             raise serializers.ValidationError("您无权给该课程实例打分。")
 
         return data
@@ -322,6 +362,23 @@ class S_GradeSerializer(serializers.ModelSerializer):
         return obj.course_instance.is_grades_published
 
 
+class JobSerializer(serializers.ModelSerializer):
+    result_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'kind', 'status', 'progress', 'result', 'error', 'result_url',
+            'created_at', 'started_at', 'finished_at',
+        ]
+        read_only_fields = fields
+
+    def get_result_url(self, obj):
+        if obj.status != Job.SUCCEEDED:
+            return None
+        return reverse('job-result', args=[obj.id], request=self.context.get('request'))
+
+
 class UserWithStudentSerializer(serializers.ModelSerializer):
     student = StudentSerializer(read_only=True)
     groups = serializers.StringRelatedField(many=True, read_only=True)
@@ -329,3 +386,17 @@ class UserWithStudentSerializer(serializers.ModelSerializer):
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'student', 'groups']
 # backend/api/serializers.py
+
+
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    登录时签发带角色声明的令牌
+    """
+    token_class = RoleRefreshToken
+
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    刷新时按最新角色重写访问令牌的声明
+    """
+    token_class = RoleRefreshToken
@@ -1,9 +1,28 @@
 # backend/api/signals.py
 
-from django.db.models.signals import post_save
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
 from django.dispatch import receiver
-from django.contrib.auth.models import Group
-from .models import Student
+from django.contrib.auth.models import Group, User
+from .models import (
+    Student, Teacher, CourseInstance, CourseSchedule, CoursePrototype, Class, Department, Grade, Semester,
+    SelectionBatch, S_Grade, Job
+)
+from .enrollment import recount_enrolled, seats_changed
+from .schedule_index import refresh_course_bitmap, refresh_semester_bitmaps, invalidate_semester_unions
+from .timetable import invalidate_course_timetables, invalidate_semester_timetables
+from .eligibility import invalidate_eligibility
+from .seat_feed import publish_seat_changes
+from .rankings import invalidate_course_ranks
+from .grading import recompute_total_scores
+from .jobs import remove_job_files
+from .report_cache import (
+    invalidate_course_reports, invalidate_courses_reports, invalidate_reports, invalidate_student_reports
+)
+from .tokens import invalidate_role_versions
+from .current_term import invalidate_current_semester, invalidate_selection_batches
+from .conditional import model_changed
+from .metrics import install_query_recorder
 import logging
 logger = logging.getLogger(__name__)
 @receiver(post_save, sender=Student)
@@ -15,4 +34,234 @@ def add_user_to_student_group(sender, instance, created, **kwargs):
             instance.user.save()
             logger.debug(f"用户 '{instance.user.username}' 通过信号加入 'Student' 组。")
         except Group.DoesNotExist:
-            logger.error("组 'Student' 不存在，请先创建。")
\ No newline at end of file
+            logger.error("组 'Student' 不存在，请先创建。")
+
+@receiver(m2m_changed, sender=CourseInstance.selected_students.through)
+def sync_enrolled_count(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    admin、序列化器的 set()/clear() 等路径绕过了选课引擎，需要重新统计已选人数
+    """
+    if action == 'pre_clear' and reverse:
+        # 从 User 一侧 clear() 时 post_clear 拿不到课程 ID，先记下来
+        instance._cleared_course_ids = list(instance.selected_courses.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        course_ids = [instance.pk]
+    elif action == 'post_clear':
+        course_ids = getattr(instance, '_cleared_course_ids', [])
+    else:
+        course_ids = pk_set
+    recount_enrolled(course_ids)
+    seats_changed.send(sender=CourseInstance, course_ids=list(course_ids))
+    semester_ids = CourseInstance.objects.filter(id__in=course_ids).values_list('semester_id', flat=True).distinct()
+    for semester_id in semester_ids:
+        invalidate_semester_unions(semester_id)
+
+@receiver(post_save, sender=CourseSchedule)
+@receiver(post_delete, sender=CourseSchedule)
+def refresh_bitmap_on_schedule_change(sender, instance, **kwargs):
+    refresh_course_bitmap(instance.course_instance_id)
+    # 位图相同的排课修改（如改起止周写法）也会改变 iCalendar 中的重复规则
+    invalidate_course_timetables(CourseInstance.objects.filter(id=instance.course_instance_id))
+
+@receiver(post_save, sender=CourseInstance)
+def refresh_bitmap_on_course_change(sender, instance, created, **kwargs):
+    # 学期变化会改变总周数，最终化状态变化会改变学生已选课程位图之并；
+    # 只改容量、地点等字段时位图之并不变，不应清掉整个学期的缓存
+    placement = (instance.semester_id, instance.is_finalized)
+    loaded = getattr(instance, '_loaded_placement', None)
+    instance._loaded_placement = placement
+    # 地点、授课教师等任何字段都可能出现在课表中，课表版本每次保存都递增
+    invalidate_semester_timetables([instance.semester_id, loaded[0] if loaded else None])
+    if created:
+        return
+    refresh_course_bitmap(instance.id)
+    if loaded != placement:
+        invalidate_semester_unions(instance.semester_id)
+        if loaded is not None and loaded[0] != instance.semester_id:
+            invalidate_semester_unions(loaded[0])
+
+@receiver(post_delete, sender=CourseInstance)
+def invalidate_timetables_on_course_delete(sender, instance, **kwargs):
+    invalidate_semester_timetables([instance.semester_id])
+
+@receiver(post_save, sender=CoursePrototype)
+def invalidate_timetables_on_prototype_change(sender, instance, created, **kwargs):
+    # 课表中的课程名称来自课程原型
+    if not created:
+        invalidate_course_timetables(CourseInstance.objects.filter(course_prototype_id=instance.id))
+
+@receiver(post_save, sender=Teacher)
+@receiver(pre_delete, sender=Teacher)
+def invalidate_timetables_on_teacher_change(sender, instance, **kwargs):
+    # 删除时课程的 teacher 会被置空，需要在删除前找到这些课程
+    invalidate_course_timetables(CourseInstance.objects.filter(teacher_id=instance.id))
+
+@receiver(post_save, sender=User)
+def invalidate_timetables_on_teacher_name_change(sender, instance, created, update_fields, **kwargs):
+    # 登录只更新 last_login，不影响课表中的教师姓名
+    if created or (update_fields is not None and not {'first_name', 'last_name'} & set(update_fields)):
+        return
+    invalidate_course_timetables(CourseInstance.objects.filter(teacher__user_id=instance.id))
+
+@receiver(post_save, sender=Semester)
+def invalidate_timetables_on_semester_change(sender, instance, created, **kwargs):
+    # iCalendar 的上课日期由学期开始日期推算
+    if not created:
+        invalidate_semester_timetables([instance.id])
+
+@receiver(post_save, sender=Semester)
+def refresh_bitmaps_on_semester_change(sender, instance, created, **kwargs):
+    if not created:
+        refresh_semester_bitmaps(instance)
+
+@receiver(post_save, sender=Semester)
+@receiver(post_delete, sender=Semester)
+def invalidate_current_semester_on_change(sender, **kwargs):
+    # Semester.save() 设置当前学期时会一并取消其他学期的标记
+    invalidate_current_semester()
+
+@receiver(post_save, sender=SelectionBatch)
+@receiver(post_delete, sender=SelectionBatch)
+def invalidate_batches_on_change(sender, **kwargs):
+    invalidate_selection_batches()
+
+@receiver(m2m_changed, sender=CourseInstance.eligible_classes.through)
+def invalidate_eligibility_on_classes_change(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_eligibility()
+
+@receiver(post_save, sender=CourseInstance)
+@receiver(post_delete, sender=CourseInstance)
+def invalidate_eligibility_on_course_change(sender, **kwargs):
+    # 选课截止时间、所属批次等变化都会影响可选课程集合
+    invalidate_eligibility()
+
+@receiver(seats_changed, sender=CourseInstance)
+def broadcast_seat_changes(sender, course_ids, **kwargs):
+    publish_seat_changes(course_ids)
+
+
+@receiver(post_save, sender=S_Grade)
+@receiver(post_delete, sender=S_Grade)
+def invalidate_ranks_on_grade_change(sender, instance, **kwargs):
+    # 物化排名在下次读取时重新计算
+    invalidate_course_ranks(instance.course_instance_id)
+
+@receiver(post_save, sender=CourseInstance)
+def recompute_scores_on_weight_change(sender, instance, created, **kwargs):
+    """
+    set_grade_weights、序列化器、admin 修改成绩占比后，已有成绩的 total_score 需要按新占比重算
+    """
+    weights = (instance.daily_weight, instance.final_weight)
+    if not created and getattr(instance, '_loaded_weights', None) != weights:
+        recompute_total_scores(instance)
+    instance._loaded_weights = weights
+
+@receiver(post_delete, sender=Job)
+def remove_files_on_job_delete(sender, instance, **kwargs):
+    remove_job_files(instance.id)
+
+@receiver(post_save, sender=S_Grade)
+@receiver(post_delete, sender=S_Grade)
+def invalidate_reports_on_grade_change(sender, instance, **kwargs):
+    invalidate_reports(student_ids=[instance.student_id], course_ids=[instance.course_instance_id])
+
+@receiver(post_save, sender=CourseInstance)
+def invalidate_reports_on_course_change(sender, instance, created, **kwargs):
+    # 发布/撤回成绩、修改成绩占比等都通过 save() 完成
+    if not created:
+        invalidate_course_reports(instance.id)
+
+@receiver(post_save, sender=CoursePrototype)
+def invalidate_reports_on_prototype_change(sender, instance, created, **kwargs):
+    # 成绩单和课程报表中的课程名称来自课程原型
+    if not created:
+        invalidate_courses_reports(CourseInstance.objects.filter(course_prototype_id=instance.id))
+
+@receiver(post_save, sender=Semester)
+def invalidate_reports_on_semester_change(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_courses_reports(CourseInstance.objects.filter(semester_id=instance.id))
+
+@receiver(post_save, sender=User)
+def invalidate_reports_on_user_change(sender, instance, created, update_fields=None, **kwargs):
+    # 登录只更新 last_login，不影响报表内容
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    invalidate_student_reports(instance.id)
+
+@receiver(post_save, sender=Student)
+def invalidate_reports_on_student_change(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_student_reports(instance.user_id)
+
+@receiver(post_save, sender=User)
+def invalidate_roles_on_user_change(sender, instance, created, update_fields=None, **kwargs):
+    # is_staff、is_active、用户名都在令牌声明中
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    invalidate_role_versions([instance.pk])
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_roles_on_groups_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # 从 Group 一侧 clear() 时 post_clear 拿不到用户 ID，先记下来
+        instance._cleared_user_ids = list(instance.user_set.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        user_ids = [instance.pk]
+    elif action == 'post_clear':
+        user_ids = getattr(instance, '_cleared_user_ids', [])
+    else:
+        user_ids = pk_set
+    invalidate_role_versions(user_ids)
+
+@receiver(post_save, sender=Teacher)
+@receiver(post_delete, sender=Teacher)
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def invalidate_roles_on_profile_change(sender, instance, **kwargs):
+    invalidate_role_versions([instance.user_id])
+
+@receiver(m2m_changed, sender=Teacher.departments.through)
+def invalidate_roles_on_teacher_departments_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        instance._cleared_teacher_user_ids = list(instance.teachers.values_list('user_id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        user_ids = [instance.user_id]
+    elif action == 'post_clear':
+        user_ids = getattr(instance, '_cleared_teacher_user_ids', [])
+    else:
+        user_ids = Teacher.objects.filter(id__in=pk_set).values_list('user_id', flat=True)
+    invalidate_role_versions(list(user_ids))
+
+# 基础数据接口的 ETag 依赖各模型的变更版本号，见 conditional.py
+REFERENCE_MODELS = (Department, Grade, Class, CoursePrototype, Semester)
+M2M_OWNERS = {
+    field.remote_field.through: model
+    for model in REFERENCE_MODELS for field in model._meta.many_to_many
+}
+
+def bump_reference_version(sender, **kwargs):
+    model_changed(sender)
+
+def bump_reference_version_on_m2m(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        model_changed(M2M_OWNERS[sender])
+
+for model in REFERENCE_MODELS:
+    post_save.connect(bump_reference_version, sender=model)
+    post_delete.connect(bump_reference_version, sender=model)
+for through in M2M_OWNERS:
+    m2m_changed.connect(bump_reference_version_on_m2m, sender=through)
+
+# 请求指标中的查询计数，见 metrics.py
+connection_created.connect(install_query_recorder)
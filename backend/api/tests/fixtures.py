@@ -0,0 +1,90 @@
+# backend/api/tests/fixtures.py
+
+"""
+测试用的基础数据：一个学院、一个班级、当前学期和正在进行的选课批次
+"""
+
+from datetime import date, timedelta
+
+from django.contrib.auth.models import Group, User
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.models import (
+    Class, CourseInstance, CoursePrototype, CourseSchedule, Department, Grade, SelectionBatch, Semester, Student,
+    Teacher
+)
+from api.roles import STUDENT_GROUP, TEACHER_GROUP
+from api.schedule_index import DAYS, PERIODS
+
+
+class Campus:
+    """
+    按需创建学生和课程的测试数据
+    """
+
+    def __init__(self):
+        self.department = Department.objects.create(name='测试学院')
+        self.grade = Grade.objects.create(name='测试级', department=self.department)
+        self.student_class = Class.objects.create(name='测试班', grade=self.grade, department=self.department)
+        self.semester = Semester.objects.create(
+            name='测试学期', start_date=date.today(), end_date=date.today() + timedelta(weeks=20), is_current=True
+        )
+        now = timezone.now()
+        self.batch = SelectionBatch.objects.create(
+            name='测试批次', semester=self.semester,
+            start_selection_date=now - timedelta(days=1), end_selection_date=now + timedelta(days=7)
+        )
+        self.prototype = CoursePrototype.objects.create(name='测试课程', description='', department=self.department)
+        teacher_user = User.objects.create_user('teacher', password='!')
+        teacher_user.groups.add(Group.objects.get_or_create(name=TEACHER_GROUP)[0])
+        self.teacher = Teacher.objects.create(user=teacher_user)
+        self.teacher.departments.add(self.department)
+        self.students = []
+        self.courses = []
+
+    def add_students(self, count):
+        group = Group.objects.get_or_create(name=STUDENT_GROUP)[0]
+        users = []
+        for _ in range(count):
+            index = len(self.students)
+            user = User.objects.create_user(f'student{index}', password='!')
+            user.groups.add(group)
+            Student.objects.create(
+                user=user, department=self.department, student_class=self.student_class, grade=self.grade,
+                age=20, gender='Other', id_number=f'T{index:017d}'
+            )
+            self.students.append(user)
+            users.append(user)
+        return users
+
+    def add_courses(self, count, selected_by=()):
+        courses = []
+        for _ in range(count):
+            index = len(self.courses)
+            course = CourseInstance.objects.create(
+                course_prototype=self.prototype, semester=self.semester, location=f'A{index}', capacity=100,
+                selection_deadline=self.batch.end_selection_date, department=self.department,
+                teacher=self.teacher, selection_batch=self.batch
+            )
+            course.eligible_classes.add(self.student_class)
+            course.eligible_departments.add(self.department)
+            course.eligible_grades.add(self.grade)
+            CourseSchedule.objects.create(
+                course_instance=course, day=DAYS[index // len(PERIODS) % len(DAYS)],
+                period=PERIODS[index % len(PERIODS)], start_week=1, end_week=16
+            )
+            if selected_by:
+                course.selected_students.add(*selected_by)
+            self.courses.append(course)
+            courses.append(course)
+        return courses
+
+
+def api_client(user):
+    """
+    以 user 身份认证的客户端，每次取新的 User 对象，和真实请求一样不共享请求级缓存
+    """
+    client = APIClient()
+    client.force_authenticate(User.objects.get(pk=user.pk))
+    return client
@@ -0,0 +1,59 @@
+# backend/api/tests/test_calendar_feed.py
+
+"""
+日历订阅令牌：签发、过期、停用和修改密码后吊销
+"""
+
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api import calendar_feed
+
+from .fixtures import Campus, api_client
+
+CALENDAR_URL = '/api/timetable/calendar.ics'
+
+
+class FeedTokenTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.campus = Campus()
+        self.student, = self.campus.add_students(1)
+        self.campus.add_courses(1, selected_by=[self.student])
+
+    def subscribe(self, token):
+        return APIClient().get(CALENDAR_URL, {'token': token})
+
+    def test_link_issues_working_token(self):
+        response = api_client(self.student).get('/api/timetable/calendar-link/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('expires_at', response.data)
+        token = response.data['url'].split('token=', 1)[1]
+        response = self.subscribe(token)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'BEGIN:VCALENDAR', response.content)
+
+    def test_password_change_revokes_token(self):
+        token = calendar_feed.feed_token(self.student)
+        self.student.set_password('changed')
+        self.student.save()
+        self.assertEqual(self.subscribe(token).status_code, 401)
+        self.assertEqual(self.subscribe(calendar_feed.feed_token(self.student)).status_code, 200)
+
+    def test_inactive_user_rejected(self):
+        token = calendar_feed.feed_token(self.student)
+        self.student.is_active = False
+        self.student.save()
+        self.assertEqual(self.subscribe(token).status_code, 401)
+
+    def test_expired_token_rejected(self):
+        token = calendar_feed.feed_token(self.student)
+        with mock.patch.object(calendar_feed, 'FEED_TOKEN_MAX_AGE', -1):
+            self.assertEqual(self.subscribe(token).status_code, 401)
+
+    def test_tampered_token_rejected(self):
+        token = calendar_feed.feed_token(self.student)
+        self.assertEqual(self.subscribe(token[:-1] + ('A' if token[-1] != 'A' else 'B')).status_code, 401)
@@ -0,0 +1,60 @@
+# backend/api/tests/test_conditional.py
+
+"""
+基础数据接口的条件请求（api/conditional.py）：ETag 未变时返回 304，依赖的模型变化后 ETag 随之变化
+"""
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from .fixtures import Campus, api_client
+
+DEPARTMENTS_URL = '/api/departments/'
+CLASSES_URL = '/api/classes/'
+
+
+class ConditionalRequestTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.campus = Campus()
+        self.client = api_client(self.campus.teacher.user)
+
+    def get(self, url, **headers):
+        return self.client.get(url, **headers)
+
+    def test_matching_etag_returns_304_without_queries(self):
+        response = self.get(DEPARTMENTS_URL)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.get(DEPARTMENTS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_vary_and_cache_control_headers(self):
+        response = self.get(DEPARTMENTS_URL)
+        self.assertIn('Authorization', response['Vary'])
+        self.assertIn('s-maxage=300', response['Cache-Control'])
+        self.assertIn('Last-Modified', response)
+
+    def test_model_change_updates_etag(self):
+        etag = self.get(DEPARTMENTS_URL)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.campus.department.name = '改名学院'
+            self.campus.department.save()
+        response = self.get(DEPARTMENTS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['results'][0]['name'], '改名学院')
+
+    def test_related_model_change_updates_etag(self):
+        # 班级列表中显示年级名称，年级变化也要使班级列表的 ETag 变化
+        etag = self.get(CLASSES_URL)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.campus.grade.name = '改名年级'
+            self.campus.grade.save()
+        self.assertEqual(self.get(CLASSES_URL, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_query_string_is_part_of_etag(self):
+        etag = self.get(DEPARTMENTS_URL)['ETag']
+        self.assertEqual(self.get(f'{DEPARTMENTS_URL}?page=1', HTTP_IF_NONE_MATCH=etag).status_code, 200)
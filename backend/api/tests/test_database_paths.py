@@ -0,0 +1,142 @@
+# backend/api/tests/test_database_paths.py
+
+"""
+PostgreSQL 快速路径（user-024）：报表的事务内服务端游标、导入的 COPY、任务恢复的 SKIP LOCKED。
+与数据库无关的测试在两种数据库上都运行，只对 PostgreSQL 生效的测试按 connection.vendor 跳过，
+运行方式见 api/tests/__init__.py。
+"""
+
+import threading
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import User
+from django.db import connection, connections, transaction
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from api import importers, jobs, reports
+from api.models import CourseSchedule, Job, Student
+
+from .fixtures import Campus
+
+postgresql_only = skipUnless(connection.vendor == 'postgresql', '只在 PostgreSQL 上运行')
+
+
+class StreamRowsTests(TestCase):
+    def setUp(self):
+        self.campus = Campus()
+        self.campus.add_students(5)
+
+    def stream(self):
+        depths = []
+        rows = []
+        for row in reports._stream_rows(Student.objects.order_by('id').values_list('id', flat=True)):
+            depths.append(len(connection.atomic_blocks))
+            rows.append(row)
+        return rows, depths
+
+    @mock.patch.object(reports, 'REPORT_CHUNK_SIZE', 2)
+    def test_streams_all_rows_in_chunks(self):
+        rows, _ = self.stream()
+        self.assertEqual(rows, list(Student.objects.order_by('id').values_list('id', flat=True)))
+
+    @postgresql_only
+    @mock.patch.object(reports, 'REPORT_CHUNK_SIZE', 2)
+    def test_server_side_cursor_read_inside_transaction(self):
+        outer = len(connection.atomic_blocks)
+        rows, depths = self.stream()
+        self.assertEqual(len(rows), 5)
+        # 整个读取过程都在 _stream_rows 自己的事务（保存点）中，读完后退出
+        self.assertEqual(set(depths), {outer + 1})
+        self.assertEqual(len(connection.atomic_blocks), outer)
+
+    @postgresql_only
+    def test_no_transaction_without_server_side_cursors(self):
+        outer = len(connection.atomic_blocks)
+        with mock.patch.dict(connection.settings_dict, {'DISABLE_SERVER_SIDE_CURSORS': True}):
+            _, depths = self.stream()
+        self.assertEqual(set(depths), {outer})
+
+
+class InsertRowsTests(TestCase):
+    def setUp(self):
+        self.campus = Campus()
+        self.course, = self.campus.add_courses(1)
+
+    def insert_schedules(self):
+        importers._insert_rows(
+            CourseSchedule,
+            ['course_instance', 'day', 'period', 'start_week', 'end_week', 'frequency', 'exceptions'],
+            [(self.course.id, 'Tuesday', 2, 1, 16, 1, [3, 4]), (self.course.id, 'Friday', 5, 2, 8, 2, [])]
+        )
+        return list(
+            CourseSchedule.objects.filter(course_instance=self.course).exclude(day='Monday').order_by('day')
+            .values_list('day', 'period', 'start_week', 'end_week', 'frequency', 'exceptions')
+        )
+
+    def test_inserts_rows(self):
+        self.assertEqual(self.insert_schedules(), [
+            ('Friday', 5, 2, 8, 2, []),
+            ('Tuesday', 2, 1, 16, 1, [3, 4]),
+        ])
+
+    @postgresql_only
+    def test_postgresql_uses_copy(self):
+        with mock.patch.object(importers, '_copy_rows', wraps=importers._copy_rows) as copy_rows:
+            rows = self.insert_schedules()
+        copy_rows.assert_called_once()
+        self.assertEqual(len(rows), 2)
+
+    def test_copy_text_escapes(self):
+        # psycopg2 没有 write_row，COPY 文本格式由 _copy_text 转义
+        self.assertEqual(importers._copy_text('a\tb\\c\nd', type(None)), 'a\\tb\\\\c\\nd')
+        self.assertEqual(importers._copy_text(None, type(None)), '\\N')
+        self.assertEqual(importers._copy_text(True, type(None)), 't')
+
+
+class ResumePendingJobsTests(TransactionTestCase):
+    def setUp(self):
+        owner = User.objects.create_user('owner', password='!')
+        self.old_ids = [Job.objects.create(kind='test', owner=owner).id for _ in range(4)]
+        Job.objects.filter(id__in=self.old_ids).update(created_at=timezone.now() - timedelta(hours=1))
+        self.fresh_id = Job.objects.create(kind='test', owner=owner).id
+        patcher = mock.patch.object(jobs, 'get_executor')
+        self.executor = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def test_claims_only_old_pending_jobs(self):
+        claimed = jobs.resume_pending_jobs(timedelta(minutes=5))
+        self.assertEqual(set(claimed), set(self.old_ids))
+        self.assertEqual(self.executor.submit.call_count, 4)
+        self.assertEqual(Job.objects.get(id=self.fresh_id).status, Job.PENDING)
+        self.assertFalse(Job.objects.filter(id__in=self.old_ids).exclude(status=Job.RUNNING).exists())
+        # 已认领的任务不会被再次认领
+        self.assertEqual(jobs.resume_pending_jobs(timedelta(minutes=5)), [])
+
+    @postgresql_only
+    def test_skip_locked_leaves_rows_locked_by_another_worker(self):
+        locked = threading.Event()
+        release = threading.Event()
+        locked_ids = self.old_ids[:2]
+
+        def other_worker():
+            try:
+                with transaction.atomic():
+                    list(Job.objects.select_for_update().filter(id__in=locked_ids))
+                    locked.set()
+                    release.wait(10)
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=other_worker)
+        thread.start()
+        try:
+            self.assertTrue(locked.wait(10))
+            claimed = jobs.resume_pending_jobs(timedelta(minutes=5))
+        finally:
+            release.set()
+            thread.join()
+        self.assertEqual(set(claimed), set(self.old_ids[2:]))
+        self.assertEqual(set(Job.objects.filter(status=Job.PENDING).values_list('id', flat=True)),
+                         {*locked_ids, self.fresh_id})
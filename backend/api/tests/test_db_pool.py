@@ -0,0 +1,118 @@
+# backend/api/tests/test_db_pool.py
+
+"""
+连接池统计和连接池耗尽时的 503 响应（api/db_pool.py、utils.custom_exception_handler）
+"""
+
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection
+from django.test import SimpleTestCase, TestCase
+
+from api import db_pool
+from api.utils import custom_exception_handler
+
+from .fixtures import api_client
+
+try:
+    from psycopg_pool import PoolTimeout, TooManyRequests
+except ImportError:
+    PoolTimeout = TooManyRequests = None
+
+requires_psycopg_pool = skipUnless(PoolTimeout is not None, '需要安装 psycopg_pool')
+
+
+class FakePool:
+    def __init__(self, stats):
+        self.stats = stats
+        self.popped = False
+
+    def get_stats(self):
+        return dict(self.stats)
+
+    def pop_stats(self):
+        self.popped = True
+        return self.get_stats()
+
+
+def pool_error(cause):
+    # Django 把取连接时的异常包装成 OperationalError，原始异常在 __cause__ 中
+    error = OperationalError('couldn\'t get a connection')
+    error.__cause__ = cause
+    return error
+
+
+class PoolStatsTests(SimpleTestCase):
+    def test_shape_and_derived_values(self):
+        pool = FakePool({
+            'pool_min': 2, 'pool_max': 8, 'pool_size': 6, 'pool_available': 2,
+            'requests_num': 4, 'requests_wait_ms': 100,
+        })
+        with mock.patch.object(db_pool, '_pools', return_value=[('default', pool)]):
+            stats = db_pool.pool_stats()
+        self.assertEqual(list(stats), ['default'])
+        values = stats['default']
+        self.assertEqual(set(values), {*db_pool.GAUGES, *db_pool.COUNTERS, 'in_use', 'saturation', 'wait_ms_avg'})
+        # get_stats() 省略的计数补 0
+        self.assertEqual(values['requests_errors'], 0)
+        self.assertEqual(values['in_use'], 4)
+        self.assertEqual(values['saturation'], 0.5)
+        self.assertEqual(values['wait_ms_avg'], 25.0)
+
+    def test_empty_pool_has_no_division_by_zero(self):
+        with mock.patch.object(db_pool, '_pools', return_value=[('default', FakePool({}))]):
+            values = db_pool.pool_stats()['default']
+        self.assertEqual((values['in_use'], values['saturation'], values['wait_ms_avg']), (0, 0.0, 0.0))
+
+    def test_reset_pops_stats(self):
+        pool = FakePool({})
+        with mock.patch.object(db_pool, '_pools', return_value=[('default', pool)]):
+            db_pool.reset_pool_stats()
+        self.assertTrue(pool.popped)
+
+
+class PoolExhaustedTests(SimpleTestCase):
+    @requires_psycopg_pool
+    def test_wrapped_pool_errors(self):
+        self.assertTrue(db_pool.is_pool_exhausted(pool_error(PoolTimeout('timeout'))))
+        self.assertTrue(db_pool.is_pool_exhausted(pool_error(TooManyRequests('queue full'))))
+
+    def test_other_database_errors(self):
+        self.assertFalse(db_pool.is_pool_exhausted(OperationalError('connection refused')))
+        self.assertFalse(db_pool.is_pool_exhausted(pool_error(ValueError('x'))))
+
+    @requires_psycopg_pool
+    def test_handler_maps_to_503_with_retry_after(self):
+        response = custom_exception_handler(pool_error(PoolTimeout('timeout')), {})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(response.data['error']['code'], 503)
+
+    def test_handler_keeps_500_for_other_errors(self):
+        response = custom_exception_handler(OperationalError('connection refused'), {})
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(response.has_header('Retry-After'))
+
+
+class PoolEndpointTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', password='!', is_staff=True)
+
+    @requires_psycopg_pool
+    def test_exhausted_pool_returns_503(self):
+        with mock.patch('api.viewsets.pool_stats', side_effect=pool_error(PoolTimeout('timeout'))):
+            response = api_client(self.admin).get('/api/_metrics/')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+    def test_metrics_export_real_pool_stats(self):
+        # 不能在导入时判断：访问 connection.pool 会用切换到测试库之前的配置创建连接池
+        if getattr(connection, 'pool', None) is None:
+            self.skipTest('需要 DB_POOL=1（PostgreSQL）')
+        response = api_client(self.admin).get('/api/_metrics/')
+        self.assertEqual(response.status_code, 200)
+        stats = response.data['db_pools']['default']
+        # 测试事务正占用一个连接
+        self.assertGreaterEqual(stats['in_use'], 1)
+        self.assertLessEqual(stats['in_use'], stats['pool_max'])
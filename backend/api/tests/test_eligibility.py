@@ -0,0 +1,41 @@
+# backend/api/tests/test_eligibility.py
+
+"""
+可选课程缓存的失效（api/eligibility.py）
+"""
+
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase
+
+from api import eligibility
+from api.eligibility import eligible_courses
+
+from .fixtures import Campus
+
+
+class EligibilityInvalidationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.campus = Campus()
+        self.course, = self.campus.add_courses(1)
+
+    def eligible(self):
+        return set(eligible_courses(self.campus.student_class.id, self.campus.batch.id))
+
+    def test_class_removal_invalidates(self):
+        self.assertEqual(self.eligible(), {self.course.id})
+        self.course.eligible_classes.clear()
+        self.assertEqual(self.eligible(), set())
+
+    def test_entry_cached_before_commit_is_discarded_after_commit(self):
+        before = {self.course.id: self.course.selection_deadline}
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.course.eligible_classes.clear()
+                # 另一个连接在提交前读到旧数据，并写入了新版本的缓存
+                with mock.patch.object(eligibility, '_eligible_queryset', return_value=before.items()):
+                    self.assertEqual(self.eligible(), {self.course.id})
+        self.assertEqual(self.eligible(), set())
@@ -0,0 +1,77 @@
+# backend/api/tests/test_enrollment.py
+
+"""
+选课引擎：容量、重复选课、退课计数、资格和时间冲突（api/enrollment.py）
+"""
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from api.enrollment import EnrollmentError, drop_student, enroll_student
+from api.models import CourseInstance, CourseSchedule, Student
+
+from .fixtures import Campus, api_client
+
+
+class EnrollmentTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.campus = Campus()
+        self.students = self.campus.add_students(3)
+        self.course, self.other = self.campus.add_courses(2)
+
+    def enroll(self, user, course):
+        student = Student.objects.get(user=user)
+        return enroll_student(user, student, CourseInstance.objects.get(id=course.id), self.campus.semester)
+
+    def enrolled_count(self, course):
+        return CourseInstance.objects.get(id=course.id).enrolled_count
+
+    def test_capacity_never_exceeded(self):
+        CourseInstance.objects.filter(id=self.course.id).update(capacity=2)
+        # 读取时名额未满的旧对象也不能越过条件 UPDATE
+        stale = CourseInstance.objects.get(id=self.course.id)
+        for user in self.students[:2]:
+            self.assertTrue(self.enroll(user, self.course))
+        third = self.students[2]
+        with self.assertRaisesMessage(EnrollmentError, '课程容量已满'):
+            enroll_student(third, Student.objects.get(user=third), stale, self.campus.semester)
+        self.assertEqual(self.enrolled_count(self.course), 2)
+        self.assertEqual(CourseInstance.objects.get(id=self.course.id).selected_students.count(), 2)
+
+    def test_duplicate_enroll_is_rejected_as_conflict(self):
+        user = self.students[0]
+        self.assertTrue(self.enroll(user, self.course))
+        response = api_client(user).post(f'/api/course-instances/{self.course.id}/enroll/')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['detail'], '课程时间与已选课程冲突')
+        self.assertEqual(self.enrolled_count(self.course), 1)
+
+    def test_drop_decrements_enrolled_count(self):
+        user = self.students[0]
+        self.enroll(user, self.course)
+        self.enroll(self.students[1], self.course)
+        drop_student(user, CourseInstance.objects.get(id=self.course.id))
+        self.assertEqual(self.enrolled_count(self.course), 1)
+        self.assertFalse(CourseInstance.objects.filter(id=self.course.id, selected_students=user).exists())
+        with self.assertRaisesMessage(EnrollmentError, '您未选此课程'):
+            drop_student(user, CourseInstance.objects.get(id=self.course.id))
+        self.assertEqual(self.enrolled_count(self.course), 1)
+
+    def test_ineligible_class_rejected(self):
+        self.course.eligible_classes.clear()
+        with self.assertRaises(EnrollmentError) as context:
+            self.enroll(self.students[0], self.course)
+        self.assertEqual(context.exception.status_code, 403)
+        self.assertEqual(self.enrolled_count(self.course), 0)
+
+    def test_conflicting_course_rejected(self):
+        user = self.students[0]
+        self.enroll(user, self.course)
+        first = self.course.schedules.get()
+        CourseSchedule.objects.create(
+            course_instance=self.other, day=first.day, period=first.period, start_week=5, end_week=6
+        )
+        with self.assertRaisesMessage(EnrollmentError, '课程时间与已选课程冲突'):
+            self.enroll(user, self.other)
+        self.assertEqual(self.enrolled_count(self.other), 0)
@@ -0,0 +1,40 @@
+# backend/api/tests/test_grade_permissions.py
+
+"""
+批量录入成绩只允许课程的授课教师操作
+"""
+
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.test import TestCase
+
+from api.models import CourseInstance, S_Grade
+from api.roles import TEACHER_GROUP
+
+from .fixtures import Campus, api_client
+
+BULK_UPDATE_URL = '/api/s-grades/bulk_update_grades/'
+
+
+class BulkUpdateGradesPermissionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.campus = Campus()
+        self.student, = self.campus.add_students(1)
+        self.course, = self.campus.add_courses(1, selected_by=[self.student])
+        self.payload = [{'student_id': self.student.id, 'daily_score': 90, 'final_score': 80}]
+
+    def post(self, user):
+        return api_client(user).post(f'{BULK_UPDATE_URL}?course_instance_id={self.course.id}', self.payload, format='json')
+
+    def test_teacher_without_profile_cannot_grade_course_without_teacher(self):
+        CourseInstance.objects.filter(id=self.course.id).update(teacher=None)
+        user = User.objects.create_user('no_profile', password='!')
+        user.groups.add(Group.objects.get_or_create(name=TEACHER_GROUP)[0])
+        self.assertEqual(self.post(user).status_code, 403)
+        self.assertFalse(S_Grade.objects.exists())
+
+    def test_course_teacher_can_grade(self):
+        response = self.post(self.campus.teacher.user)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertTrue(S_Grade.objects.filter(student=self.student, course_instance=self.course).exists())
@@ -0,0 +1,80 @@
+# backend/api/tests/test_grading.py
+
+"""
+批量录入成绩：一条 upsert 插入或更新，按考试轮次分别存储（api/grading.py）
+"""
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from api.grading import bulk_upsert_grades
+from api.models import S_Grade
+
+from .fixtures import Campus, api_client
+
+BULK_UPDATE_URL = '/api/s-grades/bulk_update_grades/'
+
+
+class BulkUpsertGradesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.campus = Campus()
+        self.first, self.second = self.campus.add_students(2)
+        self.course, = self.campus.add_courses(1, selected_by=[self.first, self.second])
+
+    def test_insert_then_update_keeps_one_row(self):
+        grades, errors = bulk_upsert_grades(self.course, [{'student_id': self.first.id, 'daily_score': 60, 'final_score': 80}])
+        self.assertEqual(errors, [])
+        grade = S_Grade.objects.get(student=self.first, course_instance=self.course)
+        self.assertEqual(grade.total_score, 70)
+
+        grades, errors = bulk_upsert_grades(self.course, [{'student_id': self.first.id, 'daily_score': 100, 'final_score': 90}])
+        self.assertEqual(errors, [])
+        self.assertEqual(S_Grade.objects.filter(student=self.first, course_instance=self.course).count(), 1)
+        grade.refresh_from_db()
+        self.assertEqual((grade.daily_score, grade.final_score, grade.total_score), (100, 90, 95))
+
+    def test_updated_rows_return_existing_ids(self):
+        existing = S_Grade.objects.create(student=self.first, course_instance=self.course, daily_score=10, final_score=10)
+        grades, errors = bulk_upsert_grades(self.course, [
+            {'student_id': self.first.id, 'daily_score': 90, 'final_score': 90},
+            {'student_id': self.second.id, 'daily_score': 80, 'final_score': 80},
+        ])
+        self.assertEqual(errors, [])
+        ids = {grade.student_id: grade.id for grade in grades}
+        self.assertEqual(ids[self.first.id], existing.id)
+        self.assertEqual(ids[self.second.id], S_Grade.objects.get(student=self.second).id)
+
+    def test_attempts_are_stored_separately(self):
+        bulk_upsert_grades(self.course, [
+            {'student_id': self.first.id, 'daily_score': 40, 'final_score': 40},
+            {'student_id': self.first.id, 'daily_score': 70, 'final_score': 70, 'attempt': 2},
+        ])
+        scores = dict(S_Grade.objects.filter(student=self.first).values_list('attempt', 'total_score'))
+        self.assertEqual(scores, {1: 40, 2: 70})
+
+    def test_last_entry_for_same_attempt_wins(self):
+        bulk_upsert_grades(self.course, [
+            {'student_id': self.first.id, 'daily_score': 40, 'final_score': 40},
+            {'student_id': self.first.id, 'daily_score': 50, 'final_score': 50},
+        ])
+        self.assertEqual(S_Grade.objects.get(student=self.first).total_score, 50)
+
+    def test_partial_failure_returns_207_with_errors(self):
+        response = api_client(self.campus.teacher.user).post(
+            f'{BULK_UPDATE_URL}?course_instance_id={self.course.id}',
+            [
+                {'student_id': self.first.id, 'daily_score': 90, 'final_score': 90},
+                {'student_id': self.second.id, 'daily_score': 'abc', 'final_score': 90},
+                {'student_id': self.campus.teacher.user.id, 'daily_score': 90, 'final_score': 90},
+                {'student_id': self.second.id, 'daily_score': 90, 'final_score': 90, 'attempt': 9},
+            ],
+            format='json'
+        )
+        self.assertEqual(response.status_code, 207, response.content)
+        self.assertEqual(len(response.data['updated_grades']), 1)
+        self.assertEqual(
+            [error['student_id'] for error in response.data['errors']],
+            [self.second.id, self.campus.teacher.user.id, self.second.id]
+        )
+        self.assertEqual(list(S_Grade.objects.values_list('student_id', flat=True)), [self.first.id])
@@ -0,0 +1,19 @@
+# backend/api/tests/test_hot_queries.py
+
+"""
+热点查询在迁移后的表结构上使用预期索引（与 explain_hot_queries 命令相同的检查）
+"""
+
+from django.test import TestCase
+
+from api.hot_queries import disable_seqscan, hot_queries, used_indexes
+
+
+class HotQueryIndexTests(TestCase):
+    def test_hot_queries_use_expected_indexes(self):
+        disable_seqscan()
+        for label, model, columns, queryset in hot_queries():
+            with self.subTest(label):
+                plan, names, used = used_indexes(model, columns, queryset)
+                self.assertTrue(names, f'{model._meta.db_table}({", ".join(columns)}) 上没有索引')
+                self.assertTrue(used, f'预期 {", ".join(sorted(names))}，实际计划:\n{plan}')
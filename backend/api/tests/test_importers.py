@@ -0,0 +1,80 @@
+# backend/api/tests/test_importers.py
+
+"""
+课程实例 CSV 导入（api/importers.py）：出错的批次只把出错的行记为失败，导入后相关缓存失效
+"""
+
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.test import TestCase
+
+from api import importers
+from api.caching import get_version
+from api.models import CourseInstance, CourseSchedule
+
+from .fixtures import Campus
+
+
+class ImportCourseInstancesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.campus = Campus()
+
+    def rows(self, locations):
+        campus = self.campus
+        for line, location in enumerate(locations, start=2):
+            yield line, {
+                'course_prototype_id': str(campus.prototype.id),
+                'semester_id': str(campus.semester.id),
+                'teacher_id': str(campus.teacher.id),
+                'location': location,
+                'capacity': '30',
+                'selection_deadline': '2030-01-01 10:00:00',
+                'department_id': str(campus.department.id),
+                'daily_weight': '40',
+                'final_weight': '60',
+                'eligible_classes': str(campus.student_class.id),
+                'schedules': 'Monday-1|Friday-3',
+            }
+
+    def test_imports_rows_with_links_and_schedules(self):
+        result = importers.import_course_instances(self.rows(['R1', 'R2']))
+        self.assertEqual(result.as_dict(), {'created': 2, 'errors': [], 'error_count': 0})
+        for course in CourseInstance.objects.all():
+            self.assertEqual(list(course.eligible_classes.all()), [self.campus.student_class])
+            self.assertEqual(
+                sorted(course.schedules.values_list('day', 'period')), [('Friday', 3), ('Monday', 1)]
+            )
+            self.assertNotEqual(course.schedule_bitmap, '')
+
+    def test_database_error_fails_only_offending_row(self):
+        insert_instances = importers._insert_instances
+
+        def failing_insert(model, instances):
+            # 主键已写回后才失败，重试时不能沿用回滚掉的主键
+            insert_instances(model, instances)
+            if any(instance.location == 'BAD' for instance in instances):
+                raise IntegrityError('bad row')
+
+        locations = [f'R{index}' for index in range(7)]
+        locations[4] = 'BAD'
+        with mock.patch.object(importers, '_insert_instances', failing_insert):
+            result = importers.import_course_instances(self.rows(locations))
+        self.assertEqual(result.created, 6)
+        self.assertEqual([error['line'] for error in result.errors], [6])
+        self.assertEqual(
+            sorted(CourseInstance.objects.values_list('location', flat=True)),
+            sorted(location for location in locations if location != 'BAD')
+        )
+        self.assertEqual(CourseSchedule.objects.count(), 12)
+
+    def test_import_invalidates_semester_caches(self):
+        semester_id = self.campus.semester.id
+        keys = [f'schedule_union:{semester_id}', f'timetable:{semester_id}', 'eligibility']
+        before = [get_version(key) for key in keys]
+        importers.import_course_instances(self.rows(['R1']))
+        after = [get_version(key) for key in keys]
+        for key, old, new in zip(keys, before, after):
+            self.assertNotEqual(old, new, key)
@@ -0,0 +1,53 @@
+# backend/api/tests/test_pagination.py
+
+"""
+游标分页（api/pagination.py）：按视图的 cursor_ordering 翻页，排序字段不唯一时以主键决胜
+"""
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from api.models import PunishmentRecord, Student
+from api.pagination import unique_ordering
+
+from .fixtures import Campus, api_client
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.campus = Campus()
+        self.campus.add_students(5)
+        self.client = api_client(User.objects.create_user('admin', password='!', is_staff=True))
+
+    def walk(self, url):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertNotIn('count', response.data)
+            pages.append([item['id'] for item in response.data['results']])
+            url = response.data['next']
+        return pages
+
+    def test_students_walk_two_cursor_pages(self):
+        pages = self.walk('/api/students/?page_size=3')
+        self.assertEqual([len(page) for page in pages], [3, 2])
+        self.assertEqual(sum(pages, []), list(Student.objects.order_by('id').values_list('id', flat=True)))
+
+    def test_records_with_same_date_are_ordered_by_pk(self):
+        # 所有记录同一天创建，只靠主键区分先后
+        for student in Student.objects.all():
+            PunishmentRecord.objects.create(student=student, type='OTHER', description='')
+        pages = self.walk('/api/punishment-record/?page_size=2')
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual(
+            sum(pages, []), list(PunishmentRecord.objects.order_by('-id').values_list('id', flat=True))
+        )
+
+    def test_unique_ordering_appends_pk(self):
+        self.assertEqual(unique_ordering(('-date',), PunishmentRecord), ('-date', '-pk'))
+        self.assertEqual(unique_ordering(('student__user__username',), Student), ('student__user__username', 'pk'))
+        self.assertEqual(unique_ordering(('id',), Student), ('id',))
+        self.assertEqual(unique_ordering(('-pk',), Student), ('-pk',))
@@ -0,0 +1,62 @@
+# backend/api/tests/test_query_counts.py
+
+"""
+列表接口的查询次数不随返回行数增长（query_plans.plan_queryset 和序列化器的 related_hints）
+"""
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from .fixtures import Campus, api_client
+
+
+class QueryCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.campus = Campus()
+        self.student, self.classmate = self.campus.add_students(2)
+
+    def query_count(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = api_client(self.student).get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(context), response
+
+    def assertConstantQueries(self, url, key=None, selected=True):
+        """
+        先后在 3 行和 8 行数据下请求 url，两次的查询次数必须相同（每次先请求一遍，预热当前学期、选课资格等缓存）
+        """
+        selected_by = [self.student, self.classmate] if selected else [self.classmate]
+        self.campus.add_courses(3, selected_by=selected_by)
+        self.query_count(url)
+        few, response = self.query_count(url)
+        rows = response.json()[key] if key else response.json()
+        self.assertEqual(len(rows), 3)
+
+        self.campus.add_courses(5, selected_by=selected_by)
+        self.query_count(url)
+        with self.assertNumQueries(few):
+            response = api_client(self.student).get(url)
+        rows = response.json()[key] if key else response.json()
+        self.assertEqual(len(rows), 8)
+
+    def test_course_instance_list(self):
+        self.assertConstantQueries('/api/course-instances/', 'results')
+
+    def test_available_courses(self):
+        self.assertConstantQueries(
+            f'/api/selection-batches/{self.campus.batch.id}/available_courses/', 'available_courses', selected=False
+        )
+
+    def test_selected_courses(self):
+        self.assertConstantQueries(
+            f'/api/selection-batches/{self.campus.batch.id}/selected_courses/', 'selected_courses'
+        )
+
+    def test_list_selected_courses(self):
+        self.assertConstantQueries('/api/course-instances/list_selected_courses/')
+
+    def test_list_selected_courses_by_current_semester(self):
+        self.assertConstantQueries('/api/course-instances/list_selected_courses_by_current_semester/')
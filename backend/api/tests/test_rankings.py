@@ -0,0 +1,51 @@
+# backend/api/tests/test_rankings.py
+
+"""
+修改成绩后读取到的名次随之变化（api/rankings.py）
+"""
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from api.models import GradeRank, S_Grade
+from api.rankings import materialize_course_ranks
+
+from .fixtures import Campus, api_client
+
+
+class RankingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.campus = Campus()
+        self.first, self.second = self.campus.add_students(2)
+        self.course, = self.campus.add_courses(1)
+        self.course.is_grades_published = True
+        self.course.save()
+        self.grades = [
+            S_Grade.objects.create(student=user, course_instance=self.course, daily_score=score, final_score=score)
+            for user, score in ((self.first, 90), (self.second, 80))
+        ]
+        materialize_course_ranks(self.course.id)
+
+    def rank_of(self, user):
+        response = api_client(user).get('/api/s-grades/my_rankings/')
+        self.assertEqual(response.status_code, 200)
+        return response.data[0]['rank']
+
+    def test_grade_edit_changes_reported_rank(self):
+        self.assertEqual(self.rank_of(self.first), 1)
+        self.assertEqual(self.rank_of(self.second), 2)
+
+        grade = self.grades[1]
+        grade.daily_score = grade.final_score = 95
+        grade.save()
+
+        self.assertEqual(self.rank_of(self.first), 2)
+        self.assertEqual(self.rank_of(self.second), 1)
+
+    def test_grade_edit_removes_materialized_ranks(self):
+        self.assertEqual(GradeRank.objects.filter(course_instance=self.course).count(), 2)
+        grade = self.grades[0]
+        grade.final_score = 10
+        grade.save()
+        self.assertFalse(GradeRank.objects.filter(course_instance=self.course).exists())
@@ -0,0 +1,44 @@
+# backend/api/tests/test_report_cache.py
+
+"""
+成绩单和课程报表缓存在课程名称、学期名称变化后失效（api/report_cache.py）
+"""
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from api.caching import get_version
+from api.models import S_Grade
+from api.report_cache import course_version_name, student_version_name
+
+from .fixtures import Campus
+
+
+class ReportCacheInvalidationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.campus = Campus()
+        self.student, = self.campus.add_students(1)
+        self.course, = self.campus.add_courses(1, selected_by=[self.student])
+        S_Grade.objects.create(student=self.student, course_instance=self.course, daily_score=80, final_score=90)
+        self.names = [student_version_name(self.student.id), course_version_name(self.course.id)]
+
+    def assert_invalidated(self, rename):
+        before = [get_version(name) for name in self.names]
+        with self.captureOnCommitCallbacks(execute=True):
+            rename()
+        after = [get_version(name) for name in self.names]
+        for name, old, new in zip(self.names, before, after):
+            self.assertNotEqual(old, new, name)
+
+    def test_prototype_rename_invalidates_reports(self):
+        def rename():
+            self.campus.prototype.name = '新课程名'
+            self.campus.prototype.save()
+        self.assert_invalidated(rename)
+
+    def test_semester_rename_invalidates_reports(self):
+        def rename():
+            self.campus.semester.name = '新学期名'
+            self.campus.semester.save()
+        self.assert_invalidated(rename)
@@ -0,0 +1,76 @@
+# backend/api/tests/test_schedule_index.py
+
+"""
+基于占用位图的时间冲突检查与 CourseSchedule.is_active_in_week 完全一致（api/schedule_index.py）
+"""
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from api.models import CourseInstance, CourseSchedule
+from api.schedule_index import has_schedule_conflict
+
+from .fixtures import Campus
+
+
+class ScheduleConflictTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.campus = Campus()
+        self.student, = self.campus.add_students(1)
+
+    def course(self, *schedules, selected=False):
+        course, = self.campus.add_courses(1, selected_by=[self.student] if selected else ())
+        course.schedules.all().delete()
+        for schedule in schedules:
+            CourseSchedule.objects.create(course_instance=course, **{'day': 'Monday', 'period': 1, **schedule})
+        return CourseInstance.objects.get(id=course.id)
+
+    def conflicts(self, selected, candidate):
+        self.course(*selected, selected=True)
+        return has_schedule_conflict(self.student, self.course(*candidate), self.campus.semester)
+
+    def test_alternate_weeks_do_not_conflict(self):
+        self.assertFalse(self.conflicts(
+            [{'start_week': 1, 'end_week': 16, 'frequency': 2}],
+            [{'start_week': 2, 'end_week': 16, 'frequency': 2}],
+        ))
+
+    def test_disjoint_week_ranges_do_not_conflict(self):
+        self.assertFalse(self.conflicts(
+            [{'start_week': 1, 'end_week': 8}],
+            [{'start_week': 9, 'end_week': 16}],
+        ))
+
+    def test_different_slots_do_not_conflict(self):
+        self.assertFalse(self.conflicts(
+            [{'start_week': 1, 'end_week': 16}],
+            [{'start_week': 1, 'end_week': 16, 'period': 2}, {'start_week': 1, 'end_week': 16, 'day': 'Tuesday'}],
+        ))
+
+    def test_exception_weeks_are_honoured(self):
+        self.assertFalse(self.conflicts(
+            [{'start_week': 1, 'end_week': 4, 'exceptions': [3]}],
+            [{'start_week': 3, 'end_week': 3}],
+        ))
+
+    def test_same_week_conflicts(self):
+        self.assertTrue(self.conflicts(
+            [{'start_week': 1, 'end_week': 4}],
+            [{'start_week': 3, 'end_week': 3}],
+        ))
+
+    def test_overlapping_frequencies_conflict(self):
+        # 第 1、3、5… 周与第 1、4、7… 周在第 1 周重合
+        self.assertTrue(self.conflicts(
+            [{'start_week': 1, 'end_week': 16, 'frequency': 2}],
+            [{'start_week': 1, 'end_week': 16, 'frequency': 3}],
+        ))
+
+    def test_finalized_courses_are_ignored(self):
+        self.course({'start_week': 1, 'end_week': 16}, selected=True)
+        CourseInstance.objects.filter(selected_students=self.student).update(is_finalized=True)
+        for course in CourseInstance.objects.filter(selected_students=self.student):
+            course.save()
+        candidate = self.course({'start_week': 1, 'end_week': 16})
+        self.assertFalse(has_schedule_conflict(self.student, candidate, self.campus.semester))
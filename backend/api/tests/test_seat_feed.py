@@ -0,0 +1,48 @@
+# backend/api/tests/test_seat_feed.py
+
+"""
+选课余量推送只在事务提交后发出（api/seat_feed.py）
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase
+
+from api.enrollment import enroll_student
+from api.models import Student
+from api.seat_feed import get_broker
+
+from .fixtures import Campus
+
+
+class Rollback(Exception):
+    pass
+
+
+class SeatFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.campus = Campus()
+        self.user, = self.campus.add_students(1)
+        self.course, = self.campus.add_courses(1)
+        self.subscription = get_broker().subscribe(self.campus.batch.id)
+        self.addCleanup(get_broker().unsubscribe, self.subscription)
+
+    def enroll(self):
+        enroll_student(self.user, Student.objects.get(user=self.user), self.course, self.campus.semester)
+
+    def test_committed_enrollment_is_published(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.enroll()
+            self.assertEqual(self.subscription._take(), {})
+        self.assertEqual(self.subscription._take(), {self.course.id: self.course.capacity - 1})
+
+    def test_rolled_back_enrollment_is_not_published(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.enroll()
+                    raise Rollback
+            except Rollback:
+                pass
+        self.assertEqual(self.subscription._take(), {})
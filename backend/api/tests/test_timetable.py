@@ -0,0 +1,56 @@
+# backend/api/tests/test_timetable.py
+
+"""
+课表缓存随课表内容失效（api/timetable.py 和 signal.py 中的失效接收器）
+"""
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from api.models import CourseInstance
+from api.schedule_index import semester_schedule_version
+
+from .fixtures import Campus, api_client
+
+
+class TimetableInvalidationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.campus = Campus()
+        self.student, = self.campus.add_students(1)
+        self.course, = self.campus.add_courses(1, selected_by=[self.student])
+
+    def fetch(self, user=None):
+        response = api_client(user or self.student).get('/api/timetable/')
+        self.assertEqual(response.status_code, 200, response.content)
+        return {course['id']: course for course in response.data['courses']}[self.course.id]
+
+    def test_location_edit_visible_on_next_fetch(self):
+        self.assertEqual(self.fetch()['location'], self.course.location)
+        course = CourseInstance.objects.get(id=self.course.id)
+        course.location = 'B202'
+        course.save()
+        self.assertEqual(self.fetch()['location'], 'B202')
+
+    def test_prototype_rename_visible_on_next_fetch(self):
+        self.fetch()
+        prototype = self.campus.prototype
+        prototype.name = '改名后的课程'
+        prototype.save()
+        self.assertEqual(self.fetch()['name'], '改名后的课程')
+
+    def test_teacher_name_change_visible_on_next_fetch(self):
+        teacher_user = self.campus.teacher.user
+        self.fetch()
+        self.fetch(teacher_user)
+        teacher_user.first_name, teacher_user.last_name = '张', '老师'
+        teacher_user.save()
+        self.assertEqual(self.fetch()['teacher'], '张 老师')
+        self.assertEqual(self.fetch(teacher_user)['teacher'], '张 老师')
+
+    def test_capacity_edit_keeps_selection_union_cache(self):
+        version = semester_schedule_version(self.campus.semester.id)
+        course = CourseInstance.objects.get(id=self.course.id)
+        course.capacity += 10
+        course.save()
+        self.assertEqual(semester_schedule_version(self.campus.semester.id), version)
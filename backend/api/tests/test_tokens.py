@@ -0,0 +1,55 @@
+# backend/api/tests/test_tokens.py
+
+"""
+带角色声明的访问令牌（api/tokens.py、api/authentication.py）：
+角色变化后旧令牌作废，JWT_STATELESS_AUTH 下认证不查询用户
+"""
+
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api.authentication import ClaimsJWTAuthentication
+from api.roles import STUDENT_GROUP, get_roles
+from api.tokens import RoleRefreshToken
+
+from .fixtures import Campus
+
+GRADES_URL = '/api/s-grades/my_all_grades/'
+
+
+def bearer(token):
+    return {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+
+class RoleTokenTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.campus = Campus()
+        self.user, = self.campus.add_students(1)
+        self.refresh = RoleRefreshToken.for_user(self.user)
+        self.access = str(self.refresh.access_token)
+
+    def test_role_change_rejects_outstanding_access_token(self):
+        client = APIClient()
+        self.assertEqual(client.get(GRADES_URL, **bearer(self.access)).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.remove(Group.objects.get(name=STUDENT_GROUP))
+
+        self.assertEqual(client.get(GRADES_URL, **bearer(self.access)).status_code, 401)
+        # 刷新后按最新角色签发，新令牌可以认证，声明中已没有学生组
+        renewed = self.refresh.access_token
+        self.assertEqual(renewed['groups'], [])
+        self.assertEqual(client.get(GRADES_URL, **bearer(renewed)).status_code, 200)
+
+    @override_settings(JWT_STATELESS_AUTH=True)
+    def test_stateless_auth_does_not_query_user(self):
+        request = APIRequestFactory().get(GRADES_URL, **bearer(self.access))
+        with self.assertNumQueries(0):
+            user, _ = ClaimsJWTAuthentication().authenticate(request)
+            roles = get_roles(user)
+        self.assertEqual((user.id, user.username), (self.user.id, self.user.username))
+        self.assertIn(STUDENT_GROUP, roles.groups)
+        self.assertEqual(roles.student_class_id, self.campus.student_class.id)
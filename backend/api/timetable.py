@@ -0,0 +1,142 @@
+# backend/api/timetable.py
+
+"""
+课表
+
+每个用户每个学期的课表物化为 (课程信息, 课程 ID -> 占用位图)，缓存在 timetable:grid:<学期>:<版本>:<用户>。
+位图直接取自 CourseInstance.schedule_bitmap（见 schedule_index），第 N 周的课表就是各门课程位图中
+第 N 周对应的那一段，不需要再逐条排课判断 is_active_in_week。
+
+缓存键带两个学期版本号：学生已选课程位图之并的版本（排课位图、学期、最终化状态、选课关系变化时递增，
+见 schedule_index），以及课表版本（课表内容中出现的课程名称、地点、授课教师、排课、学期日期变化时递增，
+见 signal.py）。选课 / 退课时直接删除该学生的缓存项。
+"""
+
+from django.core.cache import cache
+from django.db.models import Q
+
+from .caching import bump_version, get_version
+from .models import CourseInstance
+from .schedule_index import DAYS, PERIODS, SLOTS_PER_WEEK, UNION_CACHE_TIMEOUT, decode, semester_schedule_version
+
+WEEK_MASK = (1 << SLOTS_PER_WEEK) - 1
+
+
+# 同一份课表数据的不同物化形式（网格、iCalendar）共用失效规则
+TIMETABLE_KINDS = ('grid', 'ics')
+
+
+def _timetable_key(user_id, semester_id, kind):
+    versions = f'{semester_schedule_version(semester_id)}:{get_version(f"timetable:{semester_id}")}'
+    return f'timetable:{kind}:{semester_id}:{versions}:{user_id}'
+
+
+def invalidate_semester_timetables(semester_ids):
+    """
+    使这些学期所有用户的课表失效（课程名称、地点、教师等课表内容变化时）
+    """
+    for semester_id in set(semester_ids):
+        if semester_id is not None:
+            bump_version(f'timetable:{semester_id}')
+
+
+def invalidate_course_timetables(course_instances):
+    """
+    使这些课程实例所在学期的课表失效
+    """
+    invalidate_semester_timetables(course_instances.values_list('semester_id', flat=True).distinct())
+
+
+def invalidate_timetable(user_id, semester_id):
+    cache.delete_many([_timetable_key(user_id, semester_id, kind) for kind in TIMETABLE_KINDS])
+
+
+def cached_timetable(roles, semester, kind, build):
+    """
+    取缓存中的课表物化结果，没有时调用 build(roles, semester) 生成
+    """
+    key = _timetable_key(roles.user_id, semester.id, kind)
+    value = cache.get(key)
+    if value is None:
+        value = build(roles, semester)
+        cache.set(key, value, UNION_CACHE_TIMEOUT)
+    return value
+
+
+def user_courses(roles, semester):
+    """
+    用户在该学期所授 / 所选的课程实例
+    """
+    condition = Q()
+    if roles.teacher_id is not None:
+        condition |= Q(teacher_id=roles.teacher_id)
+    if roles.is_student:
+        condition |= Q(selected_students=roles.user_id)
+    if not condition:
+        return CourseInstance.objects.none()
+    return CourseInstance.objects.filter(condition, semester=semester).distinct()
+
+
+def materialize_timetable(roles, semester):
+    """
+    返回 {'courses': [...], 'bitmaps': {课程 ID: 位图}}
+    """
+    rows = user_courses(roles, semester).values_list(
+        'id', 'course_prototype__name', 'location', 'teacher__user__first_name', 'teacher__user__last_name',
+        'is_finalized', 'schedule_bitmap'
+    ).order_by('id')
+    courses = []
+    bitmaps = {}
+    for course_id, name, location, first_name, last_name, is_finalized, bitmap in rows:
+        courses.append({
+            'id': course_id,
+            'name': name,
+            'location': location,
+            'teacher': f'{first_name or ""} {last_name or ""}'.strip() or None,
+            'is_finalized': is_finalized,
+        })
+        bitmaps[course_id] = decode(bitmap)
+    return {'courses': courses, 'bitmaps': bitmaps}
+
+
+def get_timetable(roles, semester):
+    return cached_timetable(roles, semester, 'grid', materialize_timetable)
+
+
+def _week_slots(bitmaps, week):
+    """
+    逐个取出第 week 周被占用的槽位，产出 (星期下标, 节次下标, 课程 ID)
+    """
+    shift = (week - 1) * SLOTS_PER_WEEK
+    for course_id, bits in bitmaps.items():
+        week_bits = (bits >> shift) & WEEK_MASK
+        while week_bits:
+            low = week_bits & -week_bits
+            index = low.bit_length() - 1
+            yield index // len(PERIODS), index % len(PERIODS), course_id
+            week_bits ^= low
+
+
+def week_grid(timetable, week):
+    """
+    第 week 周的课表：{星期: [每节课的课程 ID 列表]}
+    """
+    grid = [[[] for _ in PERIODS] for _ in DAYS]
+    for day, period, course_id in _week_slots(timetable['bitmaps'], week):
+        grid[day][period].append(course_id)
+    return dict(zip(DAYS, grid))
+
+
+def semester_weeks(timetable, total_weeks):
+    """
+    整个学期的课表：每个有课的周一项，slots 为 [星期, 节次, 课程 ID]
+    """
+    weeks = []
+    for week in range(1, total_weeks + 1):
+        slots = sorted(_week_slots(timetable['bitmaps'], week))
+        if slots:
+            weeks.append({
+                'week': week,
+                'slots': [[DAYS[day], PERIODS[period], course_id] for day, period, course_id in slots]
+            })
+    return weeks
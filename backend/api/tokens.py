@@ -0,0 +1,125 @@
+# backend/api/tokens.py
+
+"""
+带角色声明的 JWT
+
+签发令牌时把 get_roles 的结果（组、教师 / 学生档案 ID、班级、院系）写进令牌，
+认证时直接从声明还原角色，不再查询组和档案（见 authentication.ClaimsJWTAuthentication）。
+
+令牌中的 rv 声明是这些角色声明的指纹。当前指纹缓存在 roles:fingerprint:<用户 ID>，
+组、档案、is_staff 等变化时删除缓存，下次认证时从数据库重新计算；
+指纹不一致说明令牌签发后角色已变，访问令牌作废，刷新时按最新角色重新签发。
+缓存项带 JWT_ROLE_CHECK_TTL 过期时间，使用进程内缓存部署多进程时，角色变化最迟在该时间后生效。
+"""
+
+import hashlib
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .roles import Roles, get_roles
+
+ROLE_VERSION_CLAIM = 'rv'
+
+
+def role_claims(user):
+    roles = get_roles(user)
+    return {
+        'username': user.username,
+        'is_staff': user.is_staff,
+        'is_superuser': user.is_superuser,
+        'groups': sorted(roles.groups),
+        'teacher_id': roles.teacher_id,
+        'department_ids': sorted(roles.teacher_department_ids),
+        'student_id': roles.student_id,
+        'student_class_id': roles.student_class_id,
+        'student_department_id': roles.student_department_id,
+    }
+
+
+def roles_from_claims(token):
+    return Roles(
+        user_id=token[api_settings.USER_ID_CLAIM],
+        is_staff=token.get('is_staff', False),
+        groups=token.get('groups', ()),
+        teacher_id=token.get('teacher_id'),
+        teacher_department_ids=token.get('department_ids', ()),
+        student_id=token.get('student_id'),
+        student_class_id=token.get('student_class_id'),
+        student_department_id=token.get('student_department_id'),
+    )
+
+
+def role_fingerprint(claims):
+    return hashlib.sha256(json.dumps(claims, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _fingerprint_key(user_id):
+    return f'roles:fingerprint:{user_id}'
+
+
+def current_role_version(user_id):
+    """
+    用户当前角色的指纹；用户不存在或已停用时为空字符串，任何令牌都不再匹配
+    """
+    key = _fingerprint_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        user = User.objects.filter(id=user_id, is_active=True).first()
+        version = role_fingerprint(role_claims(user)) if user else ''
+        cache.set(key, version, timeout=settings.JWT_ROLE_CHECK_TTL)
+    return version
+
+
+async def acurrent_role_version(user_id):
+    version = await cache.aget(_fingerprint_key(user_id))
+    if version is None:
+        version = await sync_to_async(current_role_version)(user_id)
+    return version
+
+
+def invalidate_role_versions(user_ids):
+    """
+    用户的组、档案或权限变化后使已签发的访问令牌失效（事务提交后生效）
+    """
+    keys = [_fingerprint_key(pk) for pk in user_ids]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def _add_role_claims(token, user):
+    claims = role_claims(user)
+    for name, value in claims.items():
+        token[name] = value
+    token[ROLE_VERSION_CLAIM] = role_fingerprint(claims)
+
+
+class RoleRefreshToken(RefreshToken):
+    """
+    签发时写入角色声明；换取访问令牌时若角色已变，按数据库中的最新角色重写声明
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        _add_role_claims(token, user)
+        cache.set(_fingerprint_key(user.pk), token[ROLE_VERSION_CLAIM], timeout=settings.JWT_ROLE_CHECK_TTL)
+        return token
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        user_id = access[api_settings.USER_ID_CLAIM]
+        if access.get(ROLE_VERSION_CLAIM) != current_role_version(user_id):
+            user = User.objects.filter(id=user_id, is_active=True).first()
+            if user is None:
+                raise InvalidToken('用户不存在或已停用')
+            _add_role_claims(access, user)
+        return access
@@ -7,8 +7,8 @@ from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
-from .viewsets import BulkImportViewSet, GenerateReportView,ChangePasswordView,PunishmentRecordViewSet, RewardRecordViewSet, SelectionBatchViewSet, SemesterViewSet
-from .viewsets import StudentViewSet
+from .viewsets import BulkImportViewSet, GenerateReportView, ReportCacheStatsView, MetricsView, TimetableView, TimetableCalendarView, TimetableCalendarLinkView,ChangePasswordView,PunishmentRecordViewSet, RewardRecordViewSet, SelectionBatchViewSet, SemesterViewSet
+from .viewsets import StudentViewSet, JobViewSet
 router = DefaultRouter()
 router.register(r'course-prototypes', CoursePrototypeViewSet, basename='course-prototype')
 router.register(r'course-instances', CourseInstanceViewSet, basename='course-instance')
@@ -23,6 +23,7 @@ router.register(r'reward-record', RewardRecordViewSet, basename='reward-record')
 router.register(r'students', StudentViewSet, basename='student')
 router.register(r'selection-batches', SelectionBatchViewSet, basename='selection-batch')
 router.register(r'semesters', SemesterViewSet)
+router.register(r'jobs', JobViewSet, basename='job')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -35,5 +36,10 @@ urlpatterns = [
     path('old_students/current/', CurrentStudentProfileView.as_view(), name='current-student-profile'),
     
     path('generate-report/', GenerateReportView.as_view(), name='generate-report'),
+    path('generate-report/cache-stats/', ReportCacheStatsView.as_view(), name='report-cache-stats'),
+    path('timetable/', TimetableView.as_view(), name='timetable'),
+    path('timetable/calendar.ics', TimetableCalendarView.as_view(), name='timetable-calendar'),
+    path('timetable/calendar-link/', TimetableCalendarLinkView.as_view(), name='timetable-calendar-link'),
+    path('_metrics/', MetricsView.as_view(), name='metrics'),
     path('change-password/', ChangePasswordView.as_view(), name='change-password'),
 ]
@@ -4,6 +4,8 @@ from rest_framework.views import exception_handler
 from rest_framework.response import Response
 from rest_framework import status
 
+from .db_pool import is_pool_exhausted
+
 def custom_exception_handler(exc, context):
     # 调用 DRF 默认的异常处理
     response = exception_handler(exc, context)
@@ -17,5 +19,11 @@ def custom_exception_handler(exc, context):
         }
         return Response(custom_response, status=response.status_code)
 
+    # 数据库连接池已满：请客户端稍后重试，而不是当作服务器错误
+    if is_pool_exhausted(exc):
+        response = Response({'error': {'code': 503, 'message': '数据库繁忙，请稍后重试'}}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        response['Retry-After'] = '1'
+        return response
+
     # 对于未处理的异常，返回通用错误
     return Response({'error': {'code': 500, 'message': '服务器内部错误'}}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
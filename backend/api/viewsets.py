@@ -1,39 +1,78 @@
 # backend/api/viewsets.py
 
 from rest_framework import viewsets, permissions, mixins, generics
-from django.contrib.auth.models import User
 from .models import (
-    CoursePrototype, CourseInstance, Student, Grade, Teacher, S_Grade,
-    Semester, PunishmentRecord, RewardRecord, CourseSchedule, SelectionBatch
+    CoursePrototype, CourseInstance, Department, Student, Grade, Teacher, S_Grade,
+    Semester, PunishmentRecord, RewardRecord, SelectionBatch, Job
 )
 from .serializers import (
     CoursePrototypeSerializer, CourseInstanceSerializer, CourseInstanceCreateUpdateSerializer,
     UserSerializer, GradeSerializer, StudentSerializer, TeacherSerializer, S_GradeSerializer,
     SemesterSerializer, SemesterCreateUpdateSerializer,
     PunishmentRecordSerializer, RewardRecordSerializer,
-    PunishmentRecordCreateSerializer, RewardRecordCreateSerializer,SelectionBatchSerializer,CourseScheduleSerializer
+    PunishmentRecordCreateSerializer, RewardRecordCreateSerializer,SelectionBatchSerializer,CourseScheduleSerializer,
+    CourseInstanceCatalogSerializer, JobSerializer
 )
-from django.db import transaction
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.decorators import action
 from django.utils import timezone
+from datetime import timedelta
 from .permissions import IsTeacherUser, IsStudentUser, IsAdminUser, IsTeacherOfCourse, IsOwnerStudent, IsAdminOrTeacher
+from .enrollment import EnrollmentError, enroll_student, drop_student
+from .query_plans import plan_queryset
+from .eligibility import available_course_ids
+from .seat_feed import EventStreamRenderer, seat_stream_response
+from .rankings import materialize_course_ranks, invalidate_course_ranks, student_rankings
+from .grading import bulk_upsert_grades
+from .importers import iter_csv_rows, import_course_prototypes, import_course_instances, IMPORT_JOB_KINDS
+from .jobs import submit_job, cancel_job, wants_async
+from .reports import ReportError, build_report, report_response
+from .report_cache import cache_stats
+from .conditional import ConditionalViewMixin
+from .metrics import PrometheusRenderer, TimedJSONRenderer, metrics_summary, registry
+from .db_pool import pool_stats, reset_pool_stats
+from .roles import get_roles
+from .current_term import get_active_selection_batch, get_current_semester
+from .schedule_index import DAYS, PERIODS
+from .timetable import get_timetable, semester_weeks, week_grid
+from .calendar_feed import FEED_TOKEN_MAX_AGE, feed_token, get_calendar
+from .authentication import FeedTokenAuthentication
+from rest_framework.renderers import JSONRenderer
 from django.db.models import F, Window
-from django.db.models.functions import Rank
+from django.db.models.functions import DenseRank
 from django_filters.rest_framework import DjangoFilterBackend
 import csv
-import io
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
+import os
 from .permissions import IsAdminUser, IsTeacherUser, IsStudentUser, IsTeacherOfCourse, IsOwnerStudent
-class CoursePrototypeViewSet(viewsets.ModelViewSet):
+
+
+def course_instance_listing(queryset, serializer_class=CourseInstanceSerializer):
+    """
+    课程实例列表类接口共用的查询集构造：按序列化器预加载全部关联，
+    查询次数与返回的课程数无关
+    """
+    return plan_queryset(queryset, serializer_class)
+
+def course_listing_serializer_class(request):
+    """
+    ?view=catalog 时使用精简的目录表示，否则使用完整的 CourseInstanceSerializer
+    """
+    if request.query_params.get('view') == 'catalog':
+        return CourseInstanceCatalogSerializer
+    return CourseInstanceSerializer
+
+class CoursePrototypeViewSet(ConditionalViewMixin, viewsets.ModelViewSet):
     """
     课程原型的 ViewSet
     """
     queryset = CoursePrototype.objects.all()
     serializer_class = CoursePrototypeSerializer
     permission_classes = [IsAuthenticated, IsAdminUser]  # 假设只有管理员可以管理课程原型
+    # 管理员编辑时需要立即看到变化，每次都按 ETag 验证
+    etag_models = (CoursePrototype, Department)
 
 class CourseInstanceViewSet(viewsets.ModelViewSet):
     """
@@ -45,8 +84,18 @@ class CourseInstanceViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['teacher', 'semester']  # 允许通过teacher字段过滤
+    # 课程列表较大，默认使用游标分页（见 api/pagination.py）
+    pagination_mode = 'cursor'
+    cursor_ordering = 'id'
     #current_semester = Semester.objects.get(is_current=True)
 
+    def get_queryset(self):
+        queryset = CourseInstance.objects.all()
+        # 只读的列表/详情接口按序列化器预加载关联；选课、退课等接口只需要课程本身
+        if self.action in ['list', 'retrieve', 'retrieve_course_details']:
+            queryset = plan_queryset(queryset, self.get_serializer_class())
+        return queryset
+
     @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
     def schedules_by_week(self, request, pk=None):
         course_instance = self.get_object()  # 从 CourseInstanceViewSet 获取当前对象
@@ -82,6 +131,7 @@ class CourseInstanceViewSet(viewsets.ModelViewSet):
         # 如果无其他逻辑，直接发布
         course_instance.is_grades_published = True
         course_instance.save()
+        materialize_course_ranks(course_instance.id)
         return Response({'detail': '成绩已发布'}, status=status.HTTP_200_OK)
 
     #撤回成绩
@@ -92,13 +142,14 @@ class CourseInstanceViewSet(viewsets.ModelViewSet):
             return Response({'detail': '成绩未发布，无需撤回'}, status=status.HTTP_400_BAD_REQUEST)
         course_instance.is_grades_published = False
         course_instance.save()
+        invalidate_course_ranks(course_instance.id)
         return Response({'detail': '成绩已撤回'}, status=status.HTTP_200_OK)
     
 
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
             return CourseInstanceCreateUpdateSerializer
-        return CourseInstanceSerializer
+        return course_listing_serializer_class(self.request)
 
     def get_permissions(self):
         if self.action in ['enroll', 'drop', 'list_available_courses',
@@ -159,25 +210,19 @@ class CourseInstanceViewSet(viewsets.ModelViewSet):
         except Student.DoesNotExist:
             return Response({'detail': '学生信息不存在'}, status=status.HTTP_400_BAD_REQUEST)
         
-        now = timezone.now()
+        # 截止时间过滤和已选课程排除基于按班级缓存的可选课程集合在内存中完成
         available_courses = CourseInstance.objects.filter(
-            selection_deadline__gte=now,
-            #is_finalized=False,
-            #eligible_departments=student.grade.department,
-            #eligible_grades=student.grade,
-            eligible_classes=student.student_class
-        ).exclude(
-            selected_students=user
-        )
+            id__in=available_course_ids(user, student)
+        ).order_by('id')
 
-        serializer = self.get_serializer(available_courses, many=True)
+        serializer = self.get_serializer(course_instance_listing(available_courses, self.get_serializer_class()), many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
     
     @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated, IsTeacherUser])
     def enrolled_students(self, request, pk=None):
         try:
             course_instance = self.get_object()
-            enrolled_students = course_instance.selected_students.all()
+            enrolled_students = plan_queryset(course_instance.selected_students.all(), UserSerializer)
             serializer = UserSerializer(enrolled_students, many=True)
             return Response(serializer.data, status=status.HTTP_200_OK)
         except CourseInstance.DoesNotExist:
@@ -200,50 +245,14 @@ class CourseInstanceViewSet(viewsets.ModelViewSet):
         except CourseInstance.DoesNotExist:
             return Response({'detail': '课程实例不存在'}, status=status.HTTP_404_NOT_FOUND)
         
-        try:
-            current_semester = Semester.objects.get(is_current=True)
-        except Semester.DoesNotExist:
+        current_semester = get_current_semester()
+        if current_semester is None:
             return Response({'detail': '当前学期未设置'}, status=status.HTTP_400_BAD_REQUEST)
-        except Semester.MultipleObjectsReturned:
-            return Response({'detail': '存在多个当前学期，请检查数据'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        # 检查选课时间是否已过
-        if timezone.now() > course_instance.selection_deadline or course_instance.is_finalized:
-            return Response({'detail': '选课时间已截止'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # 检查课程容量
-        if course_instance.selected_students.count() >= course_instance.capacity:
-            return Response({'detail': '课程容量已满'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # 检查学生是否符合选课条件
-        #if not course_instance.eligible_departments.filter(id=student.grade.department.id).exists():
-            #return Response({'detail': '您所在学院无法选此课程'}, status=status.HTTP_403_FORBIDDEN)
-        
-        #if not course_instance.eligible_grades.filter(id=student.grade.id).exists():
-            #return Response({'detail': '您所在年级无法选此课程'}, status=status.HTTP_403_FORBIDDEN)
-        
-        if not course_instance.eligible_classes.filter(id=student.student_class.id).exists():
-            return Response({'detail': '您所在班级无法选此课程'}, status=status.HTTP_403_FORBIDDEN)
-        
-        # 检查时间冲突
-        course_schedules = course_instance.schedules.all()
-        for schedule in course_schedules:
-            conflict = CourseInstance.objects.filter(
-                selected_students=user,
-                is_finalized=False,
-                schedules__day=schedule.day,
-                schedules__period=schedule.period,
-                semester = current_semester  # 添加学期过滤
-            ).exists()
-            if conflict:
-                return Response({'detail': '课程时间与已选课程冲突'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        with transaction.atomic():
-            # 再次检查课程容量，防止并发问题
-            course_instance = CourseInstance.objects.select_for_update().get(id=course_instance.id)
-            if course_instance.selected_students.count() >= course_instance.capacity:
-                return Response({'detail': '课程容量已满'}, status=status.HTTP_400_BAD_REQUEST)
-            course_instance.selected_students.add(user)
+        try:
+            enroll_student(user, student, course_instance, current_semester)
+        except EnrollmentError as e:
+            return Response({'detail': e.detail}, status=e.status_code)
         
         return Response({'detail': '选课成功'}, status=status.HTTP_200_OK)
 
@@ -263,14 +272,10 @@ class CourseInstanceViewSet(viewsets.ModelViewSet):
         except CourseInstance.DoesNotExist:
             return Response({'detail': '课程实例不存在'}, status=status.HTTP_404_NOT_FOUND)
         
-        # 检查选课时间是否已过
-        if timezone.now() > course_instance.selection_deadline or course_instance.is_finalized:
-            return Response({'detail': '选课时间已截止，无法退课'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        if not course_instance.selected_students.filter(id=user.id).exists():
-            return Response({'detail': '您未选此课程'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        course_instance.selected_students.remove(user)
+        try:
+            drop_student(user, course_instance)
+        except EnrollmentError as e:
+            return Response({'detail': e.detail}, status=e.status_code)
         
         return Response({'detail': '退课成功'}, status=status.HTTP_200_OK)
 
@@ -278,7 +283,7 @@ class CourseInstanceViewSet(viewsets.ModelViewSet):
     def view_enrolled_students(self, request, pk=None):
         try:
             course_instance = self.get_object()
-            selected_students = course_instance.selected_students.all()  # 修正为 selected_students
+            selected_students = plan_queryset(course_instance.selected_students.all(), UserSerializer)  # 修正为 selected_students
             serializer = UserSerializer(selected_students, many=True)
             return Response(serializer.data, status=status.HTTP_200_OK)
         except CourseInstance.DoesNotExist:
@@ -350,7 +355,7 @@ class CourseInstanceViewSet(viewsets.ModelViewSet):
             #is_finalized=False  # 仅展示已最终化的选课
         )
 
-        serializer = self.get_serializer(selected_courses, many=True)
+        serializer = self.get_serializer(course_instance_listing(selected_courses, self.get_serializer_class()), many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated, IsStudentUser])
@@ -364,14 +369,17 @@ class CourseInstanceViewSet(viewsets.ModelViewSet):
         except Student.DoesNotExist:
             return Response({'detail': '学生信息不存在'}, status=status.HTTP_400_BAD_REQUEST)
         #semester = request.query_params.get('semester', None)
+        current_semester = get_current_semester()
+        if current_semester is None:
+            return Response({'detail': '当前学期未设置'}, status=status.HTTP_400_BAD_REQUEST)
 
         selected_courses = CourseInstance.objects.filter(
             selected_students=user,
-            semester = Semester.objects.get(is_current=True),
+            semester = current_semester,
             #is_finalized=False  # 仅展示已最终化的选课
         )
 
-        serializer = self.get_serializer(selected_courses, many=True)
+        serializer = self.get_serializer(course_instance_listing(selected_courses, self.get_serializer_class()), many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 # class CourseSelectionCreateView(generics.CreateAPIView):
 
@@ -380,8 +388,10 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.views import APIView
-from django.http import HttpResponse
-from reportlab.pdfgen import canvas
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.urls import reverse
+from django.utils.http import parse_etags
+from rest_framework.settings import api_settings
 
 
 
@@ -406,16 +416,6 @@ class LogoutView(APIView):
         except Exception as e:
             return Response({"detail": "Invalid token"}, status=status.HTTP_400_BAD_REQUEST)
         
-from django.db.models import OuterRef, Subquery, IntegerField
-from django.db.models.functions import Rank
-from django.db.models import Count
-from django.db.models import F
-from django.db.models import Window
-from django.db.models.functions import DenseRank
-from django.db.models import Value
-from django.db.models import F, Value, IntegerField
-from django.db.models.functions import Coalesce
-
 class SelectionBatchViewSet(viewsets.ModelViewSet):
     """
     选课批次管理的 ViewSet
@@ -426,15 +426,9 @@ class SelectionBatchViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated, IsStudentUser])
     def current_selected_courses(self, request):
-        try:
-            selection_batch = SelectionBatch.objects.filter(
-                start_selection_date__lte=timezone.now(),
-                end_selection_date__gte=timezone.now()
-            ).first()
-            if not selection_batch:
-                return Response({'detail': '当前没有选课批次'}, status=status.HTTP_404_NOT_FOUND)
-        except Exception as e:
-            return Response({'detail': f'发生错误: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        selection_batch = get_active_selection_batch()
+        if not selection_batch:
+            return Response({'detail': '当前没有选课批次'}, status=status.HTTP_404_NOT_FOUND)
         
         user = request.user
         try:
@@ -443,7 +437,8 @@ class SelectionBatchViewSet(viewsets.ModelViewSet):
             return Response({'detail': '学生信息不存在'}, status=status.HTTP_400_BAD_REQUEST)
         
         selected_courses = selection_batch.course_instances.filter(selected_students=user)
-        selected_serializer = CourseInstanceSerializer(selected_courses, many=True)
+        serializer_class = course_listing_serializer_class(request)
+        selected_serializer = serializer_class(course_instance_listing(selected_courses, serializer_class), many=True)
         
         return Response({
             'selected_courses': selected_serializer.data
@@ -453,10 +448,8 @@ class SelectionBatchViewSet(viewsets.ModelViewSet):
     def selected_courses(self, request, pk=None):
         try:
             if pk.lower() == 'current':
-                # 假设当前批次是开始和结束日期包围当前时间的批次
-                selection_batch = SelectionBatch.objects.filter(
-                    start_selection_date__lte=timezone.now(),
-                ).first()
+                # 当前批次是开始和结束日期包围当前时间的批次
+                selection_batch = get_active_selection_batch()
                 if not selection_batch:
                     return Response({'detail': '当前没有选课批次'}, status=status.HTTP_404_NOT_FOUND)
             else:
@@ -475,12 +468,24 @@ class SelectionBatchViewSet(viewsets.ModelViewSet):
         
         # 获取已选课程
         selected_courses = selection_batch.course_instances.filter(selected_students=user)
-        selected_serializer = CourseInstanceSerializer(selected_courses, many=True)
+        serializer_class = course_listing_serializer_class(request)
+        selected_serializer = serializer_class(course_instance_listing(selected_courses, serializer_class), many=True)
         
         return Response({
             'selected_courses': selected_serializer.data
         }, status=status.HTTP_200_OK)
 
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated, IsStudentUser],
+            renderer_classes=[EventStreamRenderer, JSONRenderer])
+    def seat_stream(self, request, pk=None):
+        """
+        以 Server-Sent Events 推送此批次各课程剩余座位数的变化，
+        首个事件为全量快照，之后的事件只包含发生变化的课程。
+        持续推送需要 ASGI 部署，WSGI 下为长轮询（见 seat_feed）
+        """
+        selection_batch = self.get_object()
+        return seat_stream_response(request, selection_batch.id)
+
     @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated, IsStudentUser])
     def available_courses(self, request, pk=None):
         """
@@ -497,17 +502,14 @@ class SelectionBatchViewSet(viewsets.ModelViewSet):
         except Student.DoesNotExist:
             return Response({'detail': '学生信息不存在'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # 获取可选课程
-        now = timezone.now()
-        available_courses = selection_batch.course_instances.annotate(
-            selected_count=Count('selected_students')
-        ).filter(
-            selection_deadline__gte=now,
-            selected_count__lt=F('capacity'),
-            eligible_classes=student.student_class
-        ).exclude(selected_students=user)
+        # 获取可选课程：资格集合来自缓存，余量直接比较冗余的已选人数计数器
+        available_courses = CourseInstance.objects.filter(
+            id__in=available_course_ids(user, student, selection_batch.id),
+            enrolled_count__lt=F('capacity')
+        ).order_by('id')
         
-        available_serializer = CourseInstanceSerializer(available_courses, many=True)
+        serializer_class = course_listing_serializer_class(request)
+        available_serializer = serializer_class(course_instance_listing(available_courses, serializer_class), many=True)
         
         return Response({
             'available_courses': available_serializer.data
@@ -559,47 +561,8 @@ class S_GradeViewSet(viewsets.ModelViewSet):
         except Student.DoesNotExist:
             return Response({'detail': '学生信息不存在'}, status=status.HTTP_400_BAD_REQUEST)
         
-        grades = S_Grade.objects.filter(
-            student=user,
-            course_instance__is_grades_published=True
-        ).select_related('course_instance__course_prototype', 'course_instance__semester').order_by('course_instance__semester__start_date')
-        
-        # 子查询：计算每门课程中，比当前学生总分更高的学生数量
-        subquery = S_Grade.objects.filter(
-            course_instance=OuterRef('course_instance'),
-            total_score__gt=OuterRef('total_score')
-        ).values('course_instance').annotate(
-            higher_count=Count('id')
-        ).values('higher_count')[:1]
-        
-        # 主查询：仅包含成绩已发布的课程实例，并使用Coalesce处理NULL值
-        ranked_grades = S_Grade.objects.filter(
-            course_instance__in=grades.values('course_instance'),
-            student=user,
-            course_instance__is_grades_published=True
-        ).annotate(
-            higher_count=Subquery(subquery, output_field=IntegerField()),
-            rank=Coalesce(F('higher_count'), Value(0)) + 1
-        ).values(
-            'course_instance__course_prototype__name',
-            'course_instance__semester__name',
-            'daily_score',
-            'final_score',
-            'total_score',
-            'rank'
-        )
-        
-        # 构建返回的数据格式
-        rankings = [
-            {
-                'course_instance': f"{grade['course_instance__course_prototype__name']} - {grade['course_instance__semester__name']}",
-                'daily_score': grade.get('daily_score'),
-                'final_score': grade.get('final_score'),
-                'total_score': grade['total_score'],
-                'rank': grade['rank'],
-            }
-            for grade in ranked_grades
-        ]
+        # 排名在发布成绩时物化，这里只按学生读取
+        rankings = student_rankings(user)
         return Response(rankings, status=status.HTTP_200_OK)
     
     def get_queryset(self):
@@ -630,11 +593,12 @@ class S_GradeViewSet(viewsets.ModelViewSet):
                     queryset = queryset.none()
 
             # 学生仅可看自己的成绩
-            if user.groups.filter(name='Student').exists():
+            roles = get_roles(user)
+            if roles.is_student:
                 queryset = queryset.filter(student=user)
             # 教师仅可看自己授课课程的成绩
-            elif user.groups.filter(name='Teacher').exists():
-                queryset = queryset.filter(course_instance__teacher=user.teacher_profile)
+            elif roles.is_teacher:
+                queryset = queryset.filter(course_instance__teacher_id=roles.teacher_id)
 
             return queryset
 
@@ -653,42 +617,21 @@ class S_GradeViewSet(viewsets.ModelViewSet):
             return Response({'detail': '需要提供course_instance_id查询参数。'}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            course_instance = CourseInstance.objects.get(id=course_instance_id)
+            course_instance = CourseInstance.objects.select_related('course_prototype', 'semester').get(id=course_instance_id)
         except CourseInstance.DoesNotExist:
             return Response({'detail': f'id为 {course_instance_id} 的课程实例不存在。'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # 确保教师拥有该课程实例的权限
-        if course_instance.teacher != request.user.teacher_profile:
+        # 确保教师拥有该课程实例的权限；没有教师档案的账号和没有授课教师的课程都不能匹配
+        teacher_id = get_roles(request.user).teacher_id
+        if teacher_id is None or course_instance.teacher_id != teacher_id:
             return Response({'detail': '您没有权限修改该课程实例的成绩。'}, status=status.HTTP_403_FORBIDDEN)
         
-        updated_grades = []
-        errors = []
-        
+        # 学生 ID 一次校验，所有成绩一条 upsert 写入
         try:
-            with transaction.atomic():
-                for entry in data:
-                    student_id = entry.get('student_id')
-                    daily_score = entry.get('daily_score')
-                    final_score = entry.get('final_score')
-
-                    if not all([student_id is not None, daily_score is not None, final_score is not None]):
-                        errors.append({'student_id': student_id, 'detail': '每个条目必须包含student_id、daily_score和final_score。'})
-                        continue
-                    
-                    try:
-                        student = User.objects.get(id=student_id, groups__name='Student')
-                    except User.DoesNotExist:
-                        errors.append({'student_id': student_id, 'detail': '用户不存在或不是学生。'})
-                        continue
-                    
-                    # 获取或创建 S_Grade 实例
-                    s_grade, created = S_Grade.objects.get_or_create(student=student, course_instance=course_instance)
-                    s_grade.daily_score = daily_score
-                    s_grade.final_score = final_score
-                    s_grade.save()  # 这将自动更新 total_score
-                    updated_grades.append(S_GradeSerializer(s_grade).data)
+            grades, errors = bulk_upsert_grades(course_instance, data)
         except Exception as e:
             return Response({'detail': f'发生错误: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        updated_grades = S_GradeSerializer(grades, many=True).data
         
         response_data = {
             'updated_grades': updated_grades,
@@ -709,7 +652,7 @@ class TeacherViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        if user.groups.filter(name='Teacher').exists():
+        if get_roles(user).is_teacher:
             # 仅返回当前教师的配置文件
             return Teacher.objects.filter(user=user)
         return Teacher.objects.none()
@@ -721,29 +664,39 @@ from .models import Department, Class, Grade
 from .serializers import DepartmentSerializer, ClassSerializer, GradeSerializer
 from django.http import Http404
 
-class DepartmentViewSet(viewsets.ReadOnlyModelViewSet):
+class DepartmentViewSet(ConditionalViewMixin, viewsets.ReadOnlyModelViewSet):
     """
     提供部门列表和详细信息的 API
     """
     queryset = Department.objects.all()
     serializer_class = DepartmentSerializer
     permission_classes = [IsAuthenticated]
+    etag_models = (Department,)
+    cache_max_age = 60
+    proxy_max_age = 300
 
-class ClassViewSet(viewsets.ReadOnlyModelViewSet):
+class ClassViewSet(ConditionalViewMixin, viewsets.ReadOnlyModelViewSet):
     """
     提供班级列表和详细信息的 API
     """
     queryset = Class.objects.all()
     serializer_class = ClassSerializer
     permission_classes = [IsAuthenticated]
+    # 年级、院系名称出现在序列化结果中（StringRelatedField）
+    etag_models = (Class, Grade, Department)
+    cache_max_age = 60
+    proxy_max_age = 300
 
-class GradeViewSet(viewsets.ReadOnlyModelViewSet):
+class GradeViewSet(ConditionalViewMixin, viewsets.ReadOnlyModelViewSet):
     """
     提供年级列表和详细信息的 API
     """
     queryset = Grade.objects.all()
     serializer_class = GradeSerializer
     permission_classes = [IsAuthenticated]
+    etag_models = (Grade, Department)
+    cache_max_age = 60
+    proxy_max_age = 300
 
 class CurrentStudentProfileView(generics.RetrieveUpdateAPIView):
     """
@@ -759,13 +712,17 @@ class CurrentStudentProfileView(generics.RetrieveUpdateAPIView):
             raise Http404
 
 
-class SemesterViewSet(viewsets.ModelViewSet):
+class SemesterViewSet(ConditionalViewMixin, viewsets.ModelViewSet):
     """
     学期（批次）管理的 ViewSet
     """
     queryset = Semester.objects.all()
     permission_classes = [IsAuthenticated, IsAdminUser]
     serializer_class = SemesterSerializer
+    # 前端几乎每个页面都请求 current；切换当前学期后最迟 cache_max_age 秒生效
+    etag_models = (Semester,)
+    conditional_actions = ('list', 'retrieve', 'current')
+    cache_max_age = 60
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
             return SemesterCreateUpdateSerializer
@@ -776,14 +733,11 @@ class SemesterViewSet(viewsets.ModelViewSet):
         """
         获取当前学期的信息
         """
-        try:
-            current_semester = Semester.objects.get(is_current=True)
-            serializer = self.get_serializer(current_semester)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        except Semester.DoesNotExist:
+        current_semester = get_current_semester()
+        if current_semester is None:
             return Response({'detail': '当前学期未设置'}, status=status.HTTP_404_NOT_FOUND)
-        except Semester.MultipleObjectsReturned:
-            return Response({'detail': '存在多个当前学期，请检查数据'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        serializer = self.get_serializer(current_semester)
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
 
 from rest_framework.exceptions import PermissionDenied
@@ -793,6 +747,9 @@ class PunishmentRecordViewSet(viewsets.ModelViewSet):
     serializer_class = PunishmentRecordSerializer
     # 改为允许管理员或教师
     permission_classes = [IsAuthenticated]
+    # 按日期从新到旧游标分页，同一天的记录按主键排序
+    pagination_mode = 'cursor'
+    cursor_ordering = '-date'
 
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
@@ -802,13 +759,14 @@ class PunishmentRecordViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         # 根据需求限制教师只能看自己部门的学生，或者其他逻辑
+        roles = get_roles(user)
         if user.is_staff:
             return PunishmentRecord.objects.all()
-        elif user.groups.filter(name='Teacher').exists():
+        elif roles.is_teacher:
             return PunishmentRecord.objects.filter(
-                student__department__in=user.teacher_profile.departments.all()
+                student__department_id__in=roles.teacher_department_ids
             )
-        elif user.groups.filter(name='Student').exists():
+        elif roles.is_student:
             # 学生只能查看自己的记录
             return PunishmentRecord.objects.filter(student__user=user)
         else:
@@ -818,11 +776,11 @@ class PunishmentRecordViewSet(viewsets.ModelViewSet):
         user = self.request.user
         # 如果教师想添加奖惩，需要检查一下学生是否属于自己管理范围
         # 以下仅做示例：和上面 get_queryset 的逻辑一致
-        if user.groups.filter(name='Teacher').exists():
+        roles = get_roles(user)
+        if roles.is_teacher:
             student_obj = serializer.validated_data['student']
             # 如果该学生不在教师的部门下，则拒绝
-            if not student_obj.department or \
-               student_obj.department not in user.teacher_profile.departments.all():
+            if student_obj.department_id not in roles.teacher_department_ids:
                 raise PermissionDenied("您无法为不属于您所在部门的学生添加奖惩记录。")
 
         serializer.save()  # 正常创建
@@ -844,14 +802,15 @@ class RewardRecordViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         # 根据需求限制教师只能看自己部门的学生，或者其他逻辑
+        roles = get_roles(user)
         if user.is_staff:
             return RewardRecord.objects.all()
-        elif user.groups.filter(name='Teacher').exists():
+        elif roles.is_teacher:
             # 示例：只查看同部门学生的奖惩
             return RewardRecord.objects.filter(
-                student__department__in=user.teacher_profile.departments.all()
+                student__department_id__in=roles.teacher_department_ids
             )
-        elif user.groups.filter(name='Student').exists():
+        elif roles.is_student:
             # 学生只能查看自己的记录
             return RewardRecord.objects.filter(student__user=user)
         else:
@@ -861,11 +820,11 @@ class RewardRecordViewSet(viewsets.ModelViewSet):
         user = self.request.user
         # 如果教师想添加奖惩，需要检查一下学生是否属于自己管理范围
         # 以下仅做示例：和上面 get_queryset 的逻辑一致
-        if user.groups.filter(name='Teacher').exists():
+        roles = get_roles(user)
+        if roles.is_teacher:
             student_obj = serializer.validated_data['student']
             # 如果该学生不在教师的部门下，则拒绝
-            if not student_obj.department or \
-            student_obj.department not in user.teacher_profile.departments.all():
+            if student_obj.department_id not in roles.teacher_department_ids:
                 raise PermissionDenied("您无法为不属于您所在部门的学生添加奖惩记录。")
 
         serializer.save()  # 正常创建
@@ -878,79 +837,28 @@ class BulkImportViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated, IsAdminUser]
     parser_classes = [MultiPartParser, FormParser]
 
-    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, IsAdminUser])
-    def import_course_prototypes(self, request):
+    def _import_csv(self, request, importer):
+        if wants_async(request):
+            return submit_import_job(request, importer.__name__)
+
         file = request.FILES.get('file')
         if not file:
             return Response({'detail': '未上传文件'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        decoded_file = file.read().decode('utf-8')
-        io_string = io.StringIO(decoded_file)
-        reader = csv.DictReader(io_string)
-        
-        created = 0
-        errors = []
-        for row in reader:
-            try:
-                course_prototype = CoursePrototype.objects.create(
-                    name=row['name'],
-                    description=row['description'],
-                    department_id=row['department_id'],
-                    credits=int(row['credits'])
-                )
-                created += 1
-            except Exception as e:
-                errors.append({'row': row, 'error': str(e)})
-        
-        return Response({'created': created, 'errors': errors}, status=status.HTTP_201_CREATED)
+
+        # 流式逐行读取，按批写入
+        try:
+            result = importer(iter_csv_rows(file))
+        except (UnicodeDecodeError, csv.Error) as e:
+            return Response({'detail': f'文件格式错误（需为 UTF-8 编码的 CSV）: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result.as_dict(), status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, IsAdminUser])
+    def import_course_prototypes(self, request):
+        return self._import_csv(request, import_course_prototypes)
 
     @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, IsAdminUser])
     def import_course_instances(self, request):
-        file = request.FILES.get('file')
-        if not file:
-            return Response({'detail': '未上传文件'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        decoded_file = file.read().decode('utf-8')
-        io_string = io.StringIO(decoded_file)
-        reader = csv.DictReader(io_string)
-        
-        created = 0
-        errors = []
-        for row in reader:
-            try:
-                with transaction.atomic():
-                    course_prototype = CoursePrototype.objects.get(id=row['course_prototype_id'])
-                    semester = Semester.objects.get(id=row['semester_id'])
-                    teacher = Teacher.objects.get(id=row['teacher_id']) if row.get('teacher_id') else None
-                    course_instance = CourseInstance.objects.create(
-                        course_prototype=course_prototype,
-                        semester=semester,
-                        location=row['location'],
-                        capacity=int(row['capacity']),
-                        selection_deadline=row['selection_deadline'],
-                        department_id=row['department_id'],
-                        daily_weight=int(row['daily_weight']),
-                        final_weight=int(row['final_weight']),
-                        teacher=teacher,
-                        is_finalized=row.get('is_finalized', False)
-                    )
-                    # 处理 eligible_departments, eligible_grades, eligible_classes
-                    eligible_departments = row['eligible_departments'].split(';') if row.get('eligible_departments') else []
-                    eligible_grades = row['eligible_grades'].split(';') if row.get('eligible_grades') else []
-                    eligible_classes = row['eligible_classes'].split(';') if row.get('eligible_classes') else []
-                    course_instance.eligible_departments.set(eligible_departments)
-                    course_instance.eligible_grades.set(eligible_grades)
-                    course_instance.eligible_classes.set(eligible_classes)
-                    # 处理 schedules
-                    schedules = row['schedules'].split('|') if row.get('schedules') else []
-                    for schedule in schedules:
-                        day, period = schedule.split('-')
-                        CourseSchedule.objects.create(course_instance=course_instance, day=day, period=int(period))
-                    created += 1
-            except Exception as e:
-                errors.append({'row': row, 'error': str(e)})
-        
-        return Response({'created': created, 'errors': errors}, status=status.HTTP_201_CREATED)
+        return self._import_csv(request, import_course_instances)
     
     @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, IsTeacherUser, IsTeacherOfCourse])
     def bulk_update_grades(self, request):
@@ -974,59 +882,22 @@ class BulkImportViewSet(viewsets.ViewSet):
             return Response({'detail': '需要提供 course_instance_id 查询参数。'}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            course_instance = CourseInstance.objects.get(id=course_instance_id)
+            course_instance = CourseInstance.objects.select_related('course_prototype', 'semester').get(id=course_instance_id)
         except CourseInstance.DoesNotExist:
             return Response({'detail': f'id={course_instance_id} 的课程实例不存在'}, status=status.HTTP_404_NOT_FOUND)
         
-        # 确保教师拥有该课程实例的权限
+        # 确保教师拥有该课程实例的权限；没有教师档案的账号和没有授课教师的课程都不能匹配
         user = request.user
-        if course_instance.teacher != user.teacher_profile:
+        teacher_id = get_roles(user).teacher_id
+        if teacher_id is None or course_instance.teacher_id != teacher_id:
             return Response({'detail': '您没有权限修改该课程实例的成绩。'}, status=status.HTTP_403_FORBIDDEN)
 
-        updated_grades = []
-        errors = []
-
+        # 学生 ID 一次校验，所有成绩一条 upsert 写入
         try:
-            with transaction.atomic():
-                for entry in data:
-                    student_id = entry.get('student_id')
-                    daily_score = entry.get('daily_score')
-                    final_score = entry.get('final_score')
-                    attempt = entry.get('attempt', 1)  # 若前端没传，默认为首考(1)
-
-                    if any(x is None for x in [student_id, daily_score, final_score]):
-                        errors.append({
-                            'student_id': student_id,
-                            'detail': 'student_id / daily_score / final_score 为必填字段'
-                        })
-                        continue
-
-                    # 1. 获取学生
-                    try:
-                        student_user = User.objects.get(id=student_id, groups__name='Student')
-                    except User.DoesNotExist:
-                        errors.append({
-                            'student_id': student_id,
-                            'detail': '用户不存在或不是学生'
-                        })
-                        continue
-
-                    # 2. 获取/创建 S_Grade
-                    #   注意现在 unique_together = (student, course_instance, attempt)
-                    #   因此如果本轮 attempt 已存在，就更新；否则新建
-                    s_grade, created = S_Grade.objects.get_or_create(
-                        student=student_user,
-                        course_instance=course_instance,
-                        attempt=attempt
-                    )
-                    s_grade.daily_score = daily_score
-                    s_grade.final_score = final_score
-                    s_grade.save()  # 这会自动计算 total_score
-
-                    updated_grades.append(S_GradeSerializer(s_grade).data)
-
+            grades, errors = bulk_upsert_grades(course_instance, data)
         except Exception as e:
             return Response({'detail': f'发生错误: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        updated_grades = S_GradeSerializer(grades, many=True).data
         
         response_data = {
             'updated_grades': updated_grades,
@@ -1036,21 +907,32 @@ class BulkImportViewSet(viewsets.ViewSet):
         return Response(response_data, status=status_code)
 
     # 类似的方法可以为 CoursePrototype 和 CourseInstance 实现
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.rl_config import TTFSearchPath
-import os
+def submit_report_job(request):
+    """
+    校验报表参数后提交后台任务
+    """
+    report_type = request.data.get('type')
+    course_id = request.data.get('course_id')
+    try:
+        build_report(request.user, report_type, course_id)
+    except ReportError as e:
+        return Response({'detail': e.detail}, status=e.status_code)
+    job = submit_job('report', request.user, {'report_type': report_type, 'course_id': course_id})
+    return Response(JobSerializer(job, context={'request': request}).data, status=status.HTTP_202_ACCEPTED)
 
-# 注册中文字体
-font_path = os.path.join(os.path.dirname(__file__), 'fonts', 'SimSun.ttf')  # 确保字体文件路径正确
-pdfmetrics.registerFont(TTFont('SimSun', font_path))
-TTFSearchPath.append(os.path.join(os.path.dirname(__file__), 'fonts'))
+
+def submit_import_job(request, kind):
+    file = request.FILES.get('file')
+    if not file:
+        return Response({'detail': '未上传文件'}, status=status.HTTP_400_BAD_REQUEST)
+    job = submit_job(kind, request.user, input_file=file)
+    return Response(JobSerializer(job, context={'request': request}).data, status=status.HTTP_202_ACCEPTED)
 
 
 class GenerateReportView(APIView):
     """
     扩展后的报表生成接口
-    可根据用户角色返回不同的报表
+    可根据用户角色返回不同的报表，传 async=1 时提交后台任务并立即返回任务信息
     """
     permission_classes = [IsAuthenticated]
 
@@ -1061,217 +943,194 @@ class GenerateReportView(APIView):
          - 'teacher_course': 教师的课程相关报表
          - 也可保留之前 'students'/'grades'/'courses' 等管理员用
         """
-        report_type = request.data.get('type')
-        if not report_type:
-            return Response({'detail': '请指定报表类型'}, status=status.HTTP_400_BAD_REQUEST)
+        if wants_async(request):
+            return submit_report_job(request)
 
-        user = request.user
+        try:
+            filename, render = build_report(request.user, request.data.get('type'), request.data.get('course_id'))
+        except ReportError as e:
+            return Response({'detail': e.detail}, status=e.status_code)
+        return report_response(filename, render)
 
-        if report_type == 'my_transcript':
-            # 只允许学生
-            if not user.groups.filter(name='Student').exists():
-                return Response({'detail': '只有学生可以生成个人成绩单报表'}, status=status.HTTP_403_FORBIDDEN)
-            return self.generate_my_transcript(user)
-
-        elif report_type == 'teacher_course':
-            # 只允许教师
-            if not user.groups.filter(name='Teacher').exists():
-                return Response({'detail': '只有教师可以生成所授课程报表'}, status=status.HTTP_403_FORBIDDEN)
-            # 前端传课程ID进来
-            course_id = request.data.get('course_id')
-            if not course_id:
-                return Response({'detail': '缺少 course_id 参数'}, status=status.HTTP_400_BAD_REQUEST)
-            return self.generate_teacher_course_report(user, course_id)
-
-        # 如果还想保留原先的 'students'/'grades'/'courses' 给管理员用，可以写：
-        elif report_type == 'students':
-            if not user.is_staff:
-                return Response({'detail': '只有管理员可以生成学生信息报表'}, status=status.HTTP_403_FORBIDDEN)
-            return self.generate_student_report()
-
-        elif report_type == 'grades':
-            if not user.is_staff:
-                return Response({'detail': '只有管理员可以生成全部成绩报表'}, status=status.HTTP_403_FORBIDDEN)
-            return self.generate_grades_report()
-
-        elif report_type == 'courses':
-            if not user.is_staff:
-                return Response({'detail': '只有管理员可以生成课程报表'}, status=status.HTTP_403_FORBIDDEN)
-            return self.generate_courses_report()
 
-        else:
-            return Response({'detail': f'未知的报表类型: {report_type}'}, status=status.HTTP_400_BAD_REQUEST)
+def resolve_timetable_request(request):
+    """
+    课表类接口的公共校验，返回 (角色, 学期, 错误响应)
+    """
+    roles = get_roles(request.user)
+    if not (roles.is_student or roles.teacher_id is not None):
+        return roles, None, Response({'detail': '只有学生和教师可以查看课表'}, status=status.HTTP_403_FORBIDDEN)
 
-    def generate_my_transcript(self, user):
-        """
-        学生生成自己的成绩单
-        """
-        # 查找该 user 对应的 Student
-        try:
-            student = user.student_profile
-        except Student.DoesNotExist:
-            return Response({'detail': '未找到该学生'}, status=status.HTTP_404_NOT_FOUND)
+    semester_id = request.query_params.get('semester')
+    try:
+        semester = Semester.objects.get(id=semester_id) if semester_id else get_current_semester()
+    except (Semester.DoesNotExist, ValueError):
+        semester = None
+    if semester is None:
+        return roles, None, Response({'detail': '学期不存在'}, status=status.HTTP_404_NOT_FOUND)
+    return roles, semester, None
 
-        # 获取此学生所有已发布的成绩
-        grades = S_Grade.objects.filter(
-            student=user, 
-            course_instance__is_grades_published=True
-        ).select_related('course_instance__course_prototype', 'course_instance__semester')
-
-        # 开始生成 PDF
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{user.username}_transcript.pdf"'
-
-        p = canvas.Canvas(response)
-        p.setFont("SimSun", 16)
-        p.drawString(100, 800, f"{student.user.get_full_name()} 的成绩单")
-
-        y = 760
-        p.setFont("SimSun", 12)
-        for g in grades:
-            line = f"课程: {g.course_instance.course_prototype.name}, 学期: {g.course_instance.semester.name}, 平时分: {g.daily_score}, 期末分: {g.final_score}, 总分: {g.total_score}"
-            p.drawString(100, y, line)
-            y -= 20
-            if y < 50:
-                p.showPage()
-                # 重新绘制标题
-                p.setFont("SimSun", 16)
-                p.drawString(100, 800, f"{student.user.get_full_name()} 的成绩单")
-                y = 760
-                p.setFont("SimSun", 12)
-
-        p.showPage()
-        p.save()
-        return response
 
-    def generate_teacher_course_report(self, user, course_id):
-        """
-        教师生成所授课程报表（如学生名单+成绩信息 等）
-        """
-        # 获取该 user 对应的 Teacher
-        try:
-            teacher = user.teacher_profile
-        except Teacher.DoesNotExist:
-            return Response({'detail': '未找到该教师'}, status=status.HTTP_404_NOT_FOUND)
+class TimetableView(APIView):
+    """
+    学生 / 教师的课表
+    ?week=N 返回第 N 周的 星期 × 节次 课表（默认当前周），?week=all 返回整个学期；
+    ?semester=ID 指定学期，默认当前学期
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        roles, semester, error = resolve_timetable_request(request)
+        if error:
+            return error
+
+        timetable = get_timetable(roles, semester)
+        data = {
+            'semester': {'id': semester.id, 'name': semester.name, 'total_weeks': semester.total_weeks},
+            'days': DAYS,
+            'periods': PERIODS,
+            'courses': timetable['courses'],
+        }
 
-        # 拿到指定课程
+        week = request.query_params.get('week', semester.current_week)
+        if week == 'all':
+            data['weeks'] = semester_weeks(timetable, semester.total_weeks)
+            return Response(data, status=status.HTTP_200_OK)
         try:
-            course = CourseInstance.objects.get(id=course_id, teacher=teacher)
-        except CourseInstance.DoesNotExist:
-            return Response({'detail': '您没有权限或该课程不存在'}, status=status.HTTP_404_NOT_FOUND)
-
-        # 取出此课程所有已选学生 + 成绩
-        grades = S_Grade.objects.filter(course_instance=course).select_related('student')
-
-        response = HttpResponse(content_type='application/pdf')
-        filename = f"{course.course_prototype.name}_report.pdf"
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-
-        p = canvas.Canvas(response)
-        p.setFont("SimSun", 16)
-        p.drawString(100, 800, f"课程报表: {course.course_prototype.name}({course.semester.name})")
-
-        y = 760
-        p.setFont("SimSun", 12)
-        for g in grades:
-            student_name = g.student.get_full_name() if g.student.first_name else g.student.username
-            line = f"学生: {student_name}, 平时分: {g.daily_score}, 期末分: {g.final_score}, 总分: {g.total_score}"
-            p.drawString(100, y, line)
-            y -= 20
-            if y < 50:
-                p.showPage()
-                # 重新绘制标题
-                p.setFont("SimSun", 16)
-                p.drawString(100, 800, f"课程报表: {course.course_prototype.name}({course.semester.name})")
-                y = 760
-                p.setFont("SimSun", 12)
-
-        p.showPage()
-        p.save()
-        return response
+            week = int(week)
+        except (TypeError, ValueError):
+            return Response({'detail': 'week 必须为整数或 all'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= week <= semester.total_weeks:
+            return Response({'detail': f'week 必须在 1 到 {semester.total_weeks} 之间'}, status=status.HTTP_400_BAD_REQUEST)
+        data['week'] = week
+        data['grid'] = week_grid(timetable, week)
+        return Response(data, status=status.HTTP_200_OK)
 
-    
-    def generate_student_report(self):
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="student_report.pdf"'
-
-        p = canvas.Canvas(response)
-        p.setFont("SimSun", 16)
-        p.drawString(100, 800, "学生信息报表")
-
-        students = Student.objects.all()
-        y = 750
-        p.setFont("SimSun", 12)
-        for student in students:
-            text = f"姓名: {student.user.get_full_name()}, 单位: {student.department.name if student.department else 'N/A'}, 年龄: {student.age}, 性别: {student.get_gender_display()}, 身份证号码: {student.id_number}"
-            p.drawString(100, y, text)
-            y -= 20
-            if y < 50:
-                p.showPage()
-                # 重新绘制标题
-                p.setFont("SimSun", 16)
-                p.drawString(100, 800, "学生信息报表")
-                y = 750
-                p.setFont("SimSun", 12)
-
-        p.showPage()
-        p.save()
-        return response
 
-    def generate_grades_report(self):
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="grades_report.pdf"'
-
-        p = canvas.Canvas(response)
-        p.setFont("SimSun", 16)
-        p.drawString(100, 800, "成绩报表")
-
-        grades = S_Grade.objects.filter(course_instance__is_finalized=True)
-        y = 750
-        p.setFont("SimSun", 12)
-        for grade in grades:
-            text = f"学生: {grade.student.user.get_full_name()}, 课程: {grade.course_instance.course_prototype.name}, 平时分: {grade.daily_score}, 期末分: {grade.final_score}, 总分: {grade.total_score}"
-            p.drawString(100, y, text)
-            y -= 20
-            if y < 50:
-                p.showPage()
-                # 重新绘制标题
-                p.setFont("SimSun", 16)
-                p.drawString(100, 800, "成绩报表")
-                y = 750
-                p.setFont("SimSun", 12)
-
-        p.showPage()
-        p.save()
-        return response
+class TimetableCalendarView(APIView):
+    """
+    iCalendar 格式的课表订阅（text/calendar）
+    除 JWT 外也接受 ?token=订阅令牌，供无法设置请求头的日历客户端使用；
+    内容未变化时对 If-None-Match 返回 304
+    """
+    authentication_classes = [*api_settings.DEFAULT_AUTHENTICATION_CLASSES, FeedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        roles, semester, error = resolve_timetable_request(request)
+        if error:
+            return error
 
-    def generate_courses_report(self):
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="courses_report.pdf"'
-
-        p = canvas.Canvas(response)
-        p.setFont("SimSun", 16)
-        p.drawString(100, 800, "课程报表")
-
-        courses = CourseInstance.objects.all()
-        y = 750
-        p.setFont("SimSun", 12)
-        for course in courses:
-            text = f"课程: {course.course_prototype.name}, 学期: {course.semester.name}, 教师: {course.teacher.user.get_full_name() if course.teacher else 'N/A'}, 已选人数: {course.selected_students.count()}/{course.capacity}, 是否最终化: {'是' if course.is_finalized else '否'}"
-            p.drawString(100, y, text)
-            y -= 20
-            if y < 50:
-                p.showPage()
-                # 重新绘制标题
-                p.setFont("SimSun", 16)
-                p.drawString(100, 800, "课程报表")
-                y = 750
-                p.setFont("SimSun", 12)
-
-        p.showPage()
-        p.save()
+        etag, body = get_calendar(roles, semester)
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type='text/calendar; charset=utf-8')
+            response['Content-Disposition'] = f'inline; filename="timetable-{semester.id}.ics"'
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
         return response
-    
+
+
+class TimetableCalendarLinkView(APIView):
+    """
+    返回带订阅令牌的 iCalendar 订阅地址。每次请求都签发新令牌，
+    旧地址过期（expires_at）前重新请求即可续期；修改密码会吊销所有旧地址
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        url = request.build_absolute_uri(reverse('timetable-calendar'))
+        expires_at = timezone.now() + timedelta(seconds=FEED_TOKEN_MAX_AGE)
+        return Response(
+            {'url': f'{url}?token={feed_token(request.user)}', 'expires_at': expires_at},
+            status=status.HTTP_200_OK
+        )
+
+
+class ReportCacheStatsView(APIView):
+    """
+    报表缓存命中率和占用（仅管理员）
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(cache_stats(), status=status.HTTP_200_OK)
+
+
+class MetricsView(APIView):
+    """
+    各接口的查询次数、耗时和响应大小直方图，以及数据库连接池统计（db_pools，仅管理员）；
+    ?format=prometheus 输出 Prometheus 文本格式
+    """
+    permission_classes = [IsAdminUser]
+    renderer_classes = [TimedJSONRenderer, PrometheusRenderer]
+
+    def get(self, request, *args, **kwargs):
+        rows = registry.snapshot()
+        pools = pool_stats()
+        if request.accepted_renderer.format == PrometheusRenderer.format:
+            return Response({'endpoints': rows, 'db_pools': pools}, status=status.HTTP_200_OK)
+        return Response({**metrics_summary(rows), 'db_pools': pools}, status=status.HTTP_200_OK)
+
+    def delete(self, request, *args, **kwargs):
+        registry.reset()
+        reset_pool_stats()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class JobViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    后台任务：提交、查询状态、下载结果、取消
+    """
+    serializer_class = JobSerializer
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, MultiPartParser, FormParser]
+
+    def get_queryset(self):
+        queryset = Job.objects.all()
+        # 管理员可查看所有任务，其他用户只能查看自己提交的任务
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(owner=self.request.user)
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        """
+        提交任务：kind 为 report（参数同 generate-report）或 import_course_prototypes / import_course_instances（上传 file）
+        """
+        kind = request.data.get('kind')
+        if kind == 'report':
+            return submit_report_job(request)
+        if kind in IMPORT_JOB_KINDS:
+            if not request.user.is_staff:
+                return Response({'detail': '只有管理员可以批量导入'}, status=status.HTTP_403_FORBIDDEN)
+            return submit_import_job(request, kind)
+        return Response({'detail': f'未知的任务类型: {kind}'}, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=True, methods=['get'])
+    def result(self, request, pk=None):
+        job = self.get_object()
+        if job.status != Job.SUCCEEDED:
+            return Response({'detail': '任务尚未完成', 'status': job.status}, status=status.HTTP_409_CONFLICT)
+        if job.result_file:
+            if not os.path.exists(job.result_file):
+                return Response({'detail': '结果文件已被清理'}, status=status.HTTP_410_GONE)
+            return FileResponse(
+                open(job.result_file, 'rb'),
+                as_attachment=True,
+                filename=job.result_filename,
+                content_type=job.result_content_type
+            )
+        return Response(job.result, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        job = self.get_object()
+        if not cancel_job(job):
+            return Response({'detail': '任务已结束，无法取消'}, status=status.HTTP_400_BAD_REQUEST)
+        job.refresh_from_db()
+        return Response(self.get_serializer(job).data, status=status.HTTP_200_OK)
+
 
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
@@ -1314,13 +1173,16 @@ class StudentViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Student.objects.all()
     serializer_class = StudentSerializer
     permission_classes = [IsAuthenticated, IsAdminOrTeacher]
+    pagination_mode = 'cursor'
+    cursor_ordering = 'id'
 
     def get_queryset(self):
         user = self.request.user
+        roles = get_roles(user)
         if user.is_staff:
             return Student.objects.all()
-        elif user.groups.filter(name='Teacher').exists():
+        elif roles.is_teacher:
             # 假设教师只能看到自己部门的学生
-            return Student.objects.filter(department__in=user.teacher_profile.departments.all())
+            return Student.objects.filter(department_id__in=roles.teacher_department_ids)
         else:
             return Student.objects.none()
\ No newline at end of file
@@ -5,12 +5,29 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
+
+ASGI 部署时请求按 backend/asgi_urls.py 路由，热点只读接口由 api/async_views.py 中的异步视图处理：
+
+    uvicorn backend.asgi:application --workers 4
 """
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 
-application = get_asgi_application()
+ASGI_URLCONF = "backend.asgi_urls"
+
+
+class AsyncRoutesASGIHandler(ASGIHandler):
+    def create_request(self, scope, body_file):
+        request, error_response = super().create_request(scope, body_file)
+        if request is not None:
+            request.urlconf = ASGI_URLCONF
+        return request, error_response
+
+
+django.setup(set_prefix=False)
+application = AsyncRoutesASGIHandler()
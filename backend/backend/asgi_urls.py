@@ -0,0 +1,14 @@
+# backend/asgi_urls.py
+
+"""
+ASGI 入口使用的 URLconf：先匹配 api/async_urls.py 中的异步接口，其余与 backend/urls.py 相同
+"""
+
+from django.urls import include, path
+
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('api/', include('api.async_urls')),
+    *sync_urlpatterns,
+]
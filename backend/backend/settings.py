@@ -3,6 +3,9 @@
 import os
 from pathlib import Path
 from datetime import timedelta
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from django.core.exceptions import ImproperlyConfigured
 
 # 基础目录
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -47,6 +50,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # 按接口统计查询次数、耗时和响应大小，见 api/metrics.py
+    'api.metrics.RequestMetricsMiddleware',
 ]
 
 # 允许的来源
@@ -76,12 +81,102 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'backend.wsgi.application'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+
+def _env_flag(name, default=False):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.lower() in ('1', 'true', 'yes')
+
+
+def _database_from_url(url):
+    """
+    postgres://用户:密码@主机:端口/库名?参数 -> DATABASES 条目；主机为空时可用 ?host=/套接字目录
+    """
+    parsed = urlsplit(url)
+    if parsed.scheme not in ('postgres', 'postgresql'):
+        raise ImproperlyConfigured(f'不支持的 DATABASE_URL: {parsed.scheme}')
+    options = dict(parse_qsl(parsed.query))
+    return {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': unquote(parsed.path.lstrip('/')),
+        'USER': unquote(parsed.username or ''),
+        'PASSWORD': unquote(parsed.password or ''),
+        'HOST': options.pop('host', parsed.hostname or ''),
+        'PORT': str(parsed.port or ''),
+        'OPTIONS': options,
     }
-}
+
+
+# 数据库：默认 SQLite；设置 DATABASE_URL 时使用 PostgreSQL（生产部署）
+#   DB_CONN_MAX_AGE                  持久连接的最长复用时间（秒），PostgreSQL 默认 60，SQLite 默认 0
+#   DB_CONN_HEALTH_CHECKS            复用持久连接前先检查连接是否可用，默认开启
+#   DB_DISABLE_SERVER_SIDE_CURSORS   经 PgBouncer 事务池连接时需要开启，iterator() 不再使用服务端游标
+#   DB_POOL                          使用进程内连接池（PostgreSQL），见 api/db_pool.py
+#   SQLITE_WAL                       小规模部署的 SQLite 调优：WAL 日志、忙等待、写事务立即加锁
+#   SQLITE_BUSY_TIMEOUT              SQLite 等待写锁的秒数
+if os.environ.get('DATABASE_URL'):
+    DATABASES = {'default': _database_from_url(os.environ['DATABASE_URL'])}
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = _env_flag('DB_DISABLE_SERVER_SIDE_CURSORS')
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+    if _env_flag('DB_POOL'):
+        # 连接池（需要 psycopg 3 和 psycopg-pool），各参数含义见 api/db_pool.py；连接池与持久连接不能同时使用
+        pool_size = int(os.environ.get('DB_POOL_SIZE', 4))
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': pool_size,
+            'max_size': pool_size + int(os.environ.get('DB_POOL_MAX_OVERFLOW', 8)),
+            'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', 300)),
+            'max_lifetime': float(os.environ.get('DB_POOL_MAX_LIFETIME', 1800)),
+            'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            'max_waiting': int(os.environ.get('DB_POOL_MAX_WAITING', 0)),
+        }
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+        }
+    }
+    if _env_flag('SQLITE_WAL'):
+        DATABASES['default']['OPTIONS'] = {
+            # 读写互不阻塞；synchronous=NORMAL 在 WAL 下只在检查点时 fsync，断电最多丢失最近的事务
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+            'timeout': float(os.environ.get('SQLITE_BUSY_TIMEOUT', 20)),
+            # 事务开始即取得写锁：读后再写的事务不会在升级锁时直接报 database is locked，而是按 timeout 排队
+            'transaction_mode': 'IMMEDIATE',
+        }
+DATABASES['default']['CONN_HEALTH_CHECKS'] = _env_flag('DB_CONN_HEALTH_CHECKS', True)
+
+# 缓存：默认使用进程内缓存；多进程部署时设置 REDIS_URL 让各进程共享缓存与版本号
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 50000},
+        }
+    }
+
+# 后台任务：线程池大小和结果文件目录
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+JOB_RESULT_DIR = os.environ.get('JOB_RESULT_DIR', str(BASE_DIR / 'job_results'))
+
+# 报表缓存：成绩单和课程报表的 PDF 缓存目录及总大小上限（字节）
+REPORT_CACHE_DIR = os.environ.get('REPORT_CACHE_DIR', str(BASE_DIR / 'report_cache'))
+REPORT_CACHE_MAX_BYTES = int(os.environ.get('REPORT_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+# 查询预算：URL 名称 -> 单个请求允许的最大查询次数，超出时记录警告；QUERY_BUDGET_RAISE 开启时抛出异常（测试中使用）
+QUERY_BUDGETS = {}
+QUERY_BUDGET_RAISE = os.environ.get('QUERY_BUDGET_RAISE', '').lower() in ('1', 'true', 'yes')
+
 # 密码验证
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -108,7 +203,7 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'rest_framework.schemas.coreapi.AutoSchema',
 
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -118,9 +213,14 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # 默认页码分页，?pagination=cursor 切换为游标分页，见 api/pagination.py
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.AdaptivePagination',
     'PAGE_SIZE': 10,
     'EXCEPTION_HANDLER': 'api.utils.custom_exception_handler',
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.metrics.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
 # Simple JWT 配置
@@ -131,8 +231,16 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
+    # 令牌中携带角色和档案声明，见 api/tokens.py
+    'TOKEN_OBTAIN_SERIALIZER': 'api.serializers.RoleTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'api.serializers.RoleTokenRefreshSerializer',
 }
 
+# 开启后认证不再加载 User，直接由令牌声明构造用户对象
+JWT_STATELESS_AUTH = os.environ.get('JWT_STATELESS_AUTH', '').lower() in ('1', 'true', 'yes')
+# 角色指纹的缓存时间（秒），进程内缓存部署多进程时角色变化最迟在该时间后生效
+JWT_ROLE_CHECK_TTL = int(os.environ.get('JWT_ROLE_CHECK_TTL', 300))
+
 # 自定义用户模型（如果有）
 # AUTH_USER_MODEL = 'api.CustomUser'
 DEBUG = True